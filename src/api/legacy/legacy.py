@@ -8,12 +8,28 @@ import time
 from typing import List, Optional
 
 import pandas as pd
+from src.app.repositories.player import PLAYER_ID_CACHE, cache_player_ids
 from src.core import config
-from src.database.database import DISCORD_ENGINE, EngineType
+from src.core.executors import blocking_io, cpu_bound
+from src.database.database import (
+    DISCORD_ENGINE,
+    ML_ENGINE,
+    PLUGIN_INGEST_ENGINE,
+    PLAYERDATA_ENGINE,
+    Engine,
+    EngineType,
+)
 from src.database import functions
-from src.database.functions import execute_sql, list_to_string, verify_token
+from src.database.export import ExportFormat, export_response
+from src.database.functions import (
+    execute_sql,
+    list_to_string,
+    parse_sql,
+    verify_token,
+)
+from src.database.pagination import decode_cursor, set_next_cursor
 from src.utils import logging_helpers
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlalchemy.orm.exc import NoResultFound
@@ -113,14 +129,14 @@ class DiscordVerifyInfo(BaseModel):
 """
 
 
-async def sql_get_player(player_name: str):
+async def sql_get_player(player_name: str, engine: Engine = PLAYERDATA_ENGINE):
     """Attempts to get data for a player whose names matches player_name."""
     sql_player_id = "select * from Players where normalized_name = :normalized_name"
 
     param = {"normalized_name": await to_jagex_name(player_name)}
 
     # returns a list of players
-    player = await execute_sql(sql_player_id, param=param)
+    player = await execute_sql(sql_player_id, param=param, engine=engine)
 
     try:
         player = player.rows2dict()
@@ -131,7 +147,26 @@ async def sql_get_player(player_name: str):
     return None if len(player) == 0 else player[0]
 
 
-async def sql_insert_player(player_name):
+async def sql_get_player_id(
+    player_name: str, engine: Engine = PLAYERDATA_ENGINE
+) -> Optional[int]:
+    """
+    The id of the player whose names matches player_name, None if it does not exist,
+    known ids come from PLAYER_ID_CACHE (shared with /v1/report).
+    """
+    normalized_name = await to_jagex_name(player_name)
+    player_id = PLAYER_ID_CACHE.get(normalized_name)
+    if player_id is not None:
+        return player_id
+
+    player = await sql_get_player(player_name, engine=engine)
+    if player is None:
+        return None
+    cache_player_ids({normalized_name: player["id"]})
+    return player["id"]
+
+
+async def sql_insert_player(player_name, engine: Engine = PLAYERDATA_ENGINE):
     sql_insert = "insert ignore into Players (name, normalized_name) values (:player_name, :normalized_name);"
 
     param = {
@@ -139,12 +174,45 @@ async def sql_insert_player(player_name):
         "normalized_name": await to_jagex_name(player_name),
     }
 
-    await execute_sql(sql_insert, param=param)
-    player = await sql_get_player(player_name)
+    await execute_sql(sql_insert, param=param, engine=engine)
+    player = await sql_get_player(player_name, engine=engine)
     return player
 
 
+SQL_INSERT_REPORT_COLUMNS = (
+    "reportedID",
+    "reportingID",
+    "region_id",
+    "x_coord",
+    "y_coord",
+    "z_coord",
+    "timestamp",
+    "manual_detect",
+    "on_members_world",
+    "on_pvp_world",
+    "world_number",
+    "equip_head_id",
+    "equip_amulet_id",
+    "equip_torso_id",
+    "equip_legs_id",
+    "equip_boots_id",
+    "equip_cape_id",
+    "equip_hands_id",
+    "equip_weapon_id",
+    "equip_shield_id",
+    "equip_ge_value",
+)
+# built once, execute_sql parses each distinct sql string once
+SQL_INSERT_REPORT = "insert ignore into Reports ({}) values ({});".format(
+    list_to_string(SQL_INSERT_REPORT_COLUMNS),
+    list_to_string([f":{column}" for column in SQL_INSERT_REPORT_COLUMNS]),
+)
+
+
 async def sql_insert_report(data):
+    """
+    Inserts a plugin detection, on the plugin_ingest pool like /v1/report.
+    """
     gmt = time.gmtime(data["ts"])
     human_time = time.strftime("%Y-%m-%d %H:%M:%S", gmt)
 
@@ -174,13 +242,9 @@ async def sql_insert_report(data):
         "equip_ge_value": data.get("equipment_ge"),
     }
 
-    # list of column values
-    columns = list_to_string(list(param.keys()))
-    values = list_to_string([f":{column}" for column in list(param.keys())])
-
-    sql = f"insert ignore into Reports ({columns}) values ({values});"
-
-    await execute_sql(sql, param=param, debug=False)
+    await execute_sql(
+        SQL_INSERT_REPORT, param=param, debug=False, engine=PLUGIN_INGEST_ENGINE
+    )
     return
 
 
@@ -206,7 +270,7 @@ async def sql_get_contributions(contributors: List):
 
     page = 1
     while True:
-        data = await execute_sql(query, param=param, page=page)
+        data = await execute_sql(query, param=param, page=page, readonly=True)
         data_dict = data.rows2dict()
         output.extend(data_dict)
         if len(data_dict) < 100_000:
@@ -365,7 +429,7 @@ async def sql_get_report_data_heatmap(region_id: int):
 
     param = {"region_id": region_id}
 
-    data = await execute_sql(sql, param, row_count=100_000)
+    data = await execute_sql(sql, param, row_count=100_000, readonly=True)
     return data.rows2dict() if data is not None else {}
 
 
@@ -490,23 +554,26 @@ async def custom_hiscore(detection):
     if not (0 <= int(detection["region_id"]) <= 15522):
         return 0
 
-    # get reporter & reported
-    reporter = await sql_get_player(detection["reporter"])
-    reported = await sql_get_player(detection["reported"])
+    # get reporter & reported, plugin ingest, on the plugin_ingest pool
+    engine = PLUGIN_INGEST_ENGINE
+    reporter_id = await sql_get_player_id(detection["reporter"], engine=engine)
+    reported_id = await sql_get_player_id(detection["reported"], engine=engine)
 
     create = 0
     # if reporter or reported is None (=player does not exist), create player
-    if reporter is None:
-        reporter = await sql_insert_player(detection["reporter"])
+    if reporter_id is None:
+        reporter = await sql_insert_player(detection["reporter"], engine=engine)
+        reporter_id = reporter["id"]
         create += 1
 
-    if reported is None:
-        reported = await sql_insert_player(detection["reported"])
+    if reported_id is None:
+        reported = await sql_insert_player(detection["reported"], engine=engine)
+        reported_id = reported["id"]
         create += 1
 
     # change in detection
-    detection["reported"] = int(reported.id)
-    detection["reporter"] = int(reporter.id)
+    detection["reported"] = int(reported_id)
+    detection["reporter"] = int(reporter_id)
 
     # insert into reports
     await sql_insert_report(detection)
@@ -835,6 +902,9 @@ async def get_highscores(
     ofInterest: int = None,
     row_count: Optional[int] = 100_000,
     page: Optional[int] = 1,
+    cursor: Optional[str] = None,
+    format: ExportFormat = ExportFormat.json,
+    response: Response = None,
 ):
     await verify_token(
         token,
@@ -843,6 +913,7 @@ async def get_highscores(
     )
 
     if ofInterest is None:
+        keyset = "hdl.Player_id"
         sql = """
             SELECT
                 hdl.*,
@@ -851,6 +922,7 @@ async def get_highscores(
             inner join Players pl on(hdl.Player_id=pl.id)
         """
     else:
+        keyset = "htl.Player_id"
         sql = """
             SELECT
                 htl.*,
@@ -859,8 +931,38 @@ async def get_highscores(
             INNER JOIN playersOfInterest poi ON (htl.Player_id = poi.id)
         """
 
-    data = await execute_sql(sql, row_count=row_count, page=page)
-    return data.rows2dict() if data is not None else {}
+    if format != ExportFormat.json:
+        param = {}
+        if cursor is None:
+            sql, _ = await parse_sql(sql, param, True, row_count, page)
+        else:
+            after = decode_cursor(cursor)
+            sql, _ = await parse_sql(
+                sql, param, True, row_count, page, keyset=keyset, after=after
+            )
+        return export_response(sql, format, param, engine=ML_ENGINE)
+
+    if cursor is None:
+        data = await execute_sql(
+            sql, row_count=row_count, page=page, engine=ML_ENGINE, readonly=True
+        )
+        return data.rows2dict() if data is not None else {}
+
+    # keyset pagination, the next cursor is returned in the X-Next-Cursor header
+    data = await execute_sql(
+        sql,
+        row_count=row_count,
+        keyset=keyset,
+        after=decode_cursor(cursor),
+        engine=ML_ENGINE,
+        readonly=True,
+    )
+    if data is None:
+        return {}
+
+    data = data.rows2dict()
+    set_next_cursor(response, data, key="Player_id", row_count=min(row_count, 100_000))
+    return data
 
 
 @router.get("site/players/{token}/{ofInterest}/{row_count}/{page}", tags=["Legacy"])
@@ -1295,6 +1397,11 @@ async def get_heatmap_data(token: str, region_id: RegionID, request: Request):
 
     data = await sql_get_report_data_heatmap(id)
 
+    return await aggregate_heatmap([dict(row) for row in data])
+
+
+@cpu_bound
+def aggregate_heatmap(data: List[dict]) -> List[dict]:
     df = pd.DataFrame(data)
 
     # Remove unnecessary columns
@@ -1304,9 +1411,7 @@ async def get_heatmap_data(token: str, region_id: RegionID, request: Request):
     df = df.groupby(["x_coord", "y_coord"], as_index=False).sum()
     df = df.astype({"confirmed_ban": int})
 
-    output = df.to_dict("records")
-
-    return output
+    return df.to_dict("records")
 
 
 @router.post("/discord/player_bans/{token}", tags=["Legacy"])
@@ -1436,28 +1541,15 @@ async def create_excel_export(linked_accounts, display_name):
 
     for account in linked_accounts:
         data = await get_ban_spreadsheet_data(account.name)
-        df = pd.DataFrame(data)
 
-        sheets.append(df)
+        sheets.append(data)
         names.append(account.name)
 
     if len(sheets) > 0:
-        totalSheet = pd.concat(sheets)
-        totalSheet = totalSheet.drop_duplicates(
-            inplace=False, subset=["Player_id"], keep="last"
-        )
-
         file_name = f"{display_name}_bans.xlsx"
         file_path = f"{os.getcwd()}/exports/" + file_name
 
-        writer = pd.ExcelWriter(file_path, engine="xlsxwriter")
-
-        totalSheet.to_excel(writer, sheet_name="Total")
-
-        for idx, name in enumerate(names):
-            sheets[idx].to_excel(writer, sheet_name=names[idx])
-
-        writer.save()
+        await write_excel_export(sheets, names, file_path)
 
         return file_name
 
@@ -1465,28 +1557,51 @@ async def create_excel_export(linked_accounts, display_name):
         raise NoDataAvailable
 
 
+@blocking_io
+def write_excel_export(sheets: List[list], names: List[str], file_path: str):
+    sheets = [pd.DataFrame(data) for data in sheets]
+
+    totalSheet = pd.concat(sheets)
+    totalSheet = totalSheet.drop_duplicates(
+        inplace=False, subset=["Player_id"], keep="last"
+    )
+
+    writer = pd.ExcelWriter(file_path, engine="xlsxwriter")
+
+    totalSheet.to_excel(writer, sheet_name="Total")
+
+    for idx, name in enumerate(names):
+        sheets[idx].to_excel(writer, sheet_name=names[idx])
+
+    writer.save()
+
+
 async def create_csv_export(linked_accounts, display_name):
     sheets = []
 
     for account in linked_accounts:
         data = await get_ban_spreadsheet_data(account.name)
-        df = pd.DataFrame(data)
-
-        sheets.append(df)
 
-    totalSheet = pd.concat(sheets)
-    totalSheet = totalSheet.drop_duplicates(
-        inplace=False, subset=["Player_id"], keep="last"
-    )
+        sheets.append(data)
 
     file_name = f"{display_name}_bans.csv"
     file_path = f"{os.getcwd()}/exports/" + file_name
 
-    totalSheet.to_csv(file_path, encoding="utf-8", index=False)
+    await write_csv_export(sheets, file_path)
 
     return file_name
 
 
+@blocking_io
+def write_csv_export(sheets: List[list], file_path: str):
+    totalSheet = pd.concat([pd.DataFrame(data) for data in sheets])
+    totalSheet = totalSheet.drop_duplicates(
+        inplace=False, subset=["Player_id"], keep="last"
+    )
+
+    totalSheet.to_csv(file_path, encoding="utf-8", index=False)
+
+
 async def create_random_link():
     pool = string.ascii_letters + string.digits
 
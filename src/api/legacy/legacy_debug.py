@@ -1,10 +1,11 @@
-import asyncio
 import logging
 import re
 import time
 from typing import List, Optional
-from src.core import server
+from src.core.executors import cpu_bound
+from src.core.tasks import TASKS
 import pandas as pd
+from src.database.database import PLUGIN_INGEST_ENGINE
 from src.database.functions import (
     batch_function,
     execute_sql,
@@ -19,11 +20,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-async def run_in_process(fn, *args):
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(server.app.state.executor, fn, *args)
-
-
 """DETECT ROUTE"""
 
 
@@ -72,7 +68,7 @@ async def jagexify_names_list(names: List[str]) -> List[str]:
 async def sql_select_players(names):
     sql = "SELECT * FROM Players WHERE normalized_name in :names"
     param = {"names": tuple(await jagexify_names_list(names))}
-    data = await execute_sql(sql, param)
+    data = await execute_sql(sql, param, engine=PLUGIN_INGEST_ENGINE)
 
     return [] if not data else data.rows2dict()
 
@@ -111,7 +107,7 @@ async def parse_detection(data: dict) -> dict:
 
 async def sql_insert_player(param):
     sql = "INSERT ignore INTO Players (name, normalized_name) VALUES (:name, :nname)"
-    await execute_sql(sql, param)
+    await execute_sql(sql, param, engine=PLUGIN_INGEST_ENGINE)
 
 
 async def sql_insert_report(param):
@@ -120,7 +116,7 @@ async def sql_insert_report(param):
     values = list_to_string([f":{column}" for column in params])
 
     sql = f"INSERT ignore INTO stgReports ({columns}) VALUES ({values})"
-    await execute_sql(sql, param)
+    await execute_sql(sql, param, engine=PLUGIN_INGEST_ENGINE)
 
 
 async def detect(detections: List[detection], manual_detect: int) -> None:
@@ -224,15 +220,11 @@ async def detect(detections: List[detection], manual_detect: int) -> None:
     await batch_function(sql_insert_report, param)
 
 
-async def offload_detect(detections: List[detection], manual_detect: int) -> None:
-    await run_in_process(detect, detections, manual_detect)
-
-
 @router.post("/{version}/plugin/detect/{manual_detect}", tags=["Legacy"])
 async def post_detect(
     detections: List[detection], version: str = None, manual_detect: int = 0
 ):
-    asyncio.create_task(detect(detections, manual_detect))
+    TASKS.submit(detect, detections, manual_detect)
     return {"ok": "ok"}
 
 
@@ -264,7 +256,7 @@ async def sql_get_contributions(contributors: List):
 
     page = 1
     while True:
-        data = await execute_sql(query, param=param, page=page)
+        data = await execute_sql(query, param=param, page=page, readonly=True)
         data_dict = data.rows2dict()
         output.extend(data_dict)
         if len(data_dict) < 100_000:
@@ -290,11 +282,12 @@ async def sql_get_feedback_submissions(voters: List):
     return data.rows2dict()
 
 
-async def parse_contributors(
-    contributors, version=None, add_patron_stats: bool = False
-):
-    contributions = await sql_get_contributions(contributors)
-
+@cpu_bound
+def summarize_contributions(contributions: List[dict]) -> tuple[dict, dict, list]:
+    """
+    The manual & passive report stats & the ids of the banned players,
+    the ids are None without contributions.
+    """
     df = pd.DataFrame(contributions)
 
     df.drop_duplicates(inplace=True, subset=["reported_ids", "detect"], keep="last")
@@ -308,32 +301,45 @@ async def parse_contributors(
         }
 
         passive_dict = {"reports": 0, "bans": 0, "possible_bans": 0}
+        return manual_dict, passive_dict, None
+
+    df_detect_manual = df.loc[df["detect"] == 1]
+    manual_dict = {
+        "reports": len(df_detect_manual.index),
+        "bans": int(df_detect_manual["confirmed_ban"].sum()),
+        "possible_bans": int(df_detect_manual["possible_ban"].sum()),
+        "incorrect_reports": int(df_detect_manual["confirmed_player"].sum()),
+    }
+    manual_dict["possible_bans"] = manual_dict["possible_bans"] - manual_dict["bans"]
 
-        total_dict = {"reports": 0, "bans": 0, "possible_bans": 0, "feedback": 0}
+    df_detect_passive = df.loc[df["detect"] == 0]
 
-    else:
-        df_detect_manual = df.loc[df["detect"] == 1]
-        manual_dict = {
-            "reports": len(df_detect_manual.index),
-            "bans": int(df_detect_manual["confirmed_ban"].sum()),
-            "possible_bans": int(df_detect_manual["possible_ban"].sum()),
-            "incorrect_reports": int(df_detect_manual["confirmed_player"].sum()),
-        }
-        manual_dict["possible_bans"] = (
-            manual_dict["possible_bans"] - manual_dict["bans"]
-        )
+    passive_dict = {
+        "reports": len(df_detect_passive.index),
+        "bans": int(df_detect_passive["confirmed_ban"].sum()),
+        "possible_bans": int(df_detect_passive["possible_ban"].sum()),
+    }
+    passive_dict["possible_bans"] = passive_dict["possible_bans"] - passive_dict["bans"]
 
-        df_detect_passive = df.loc[df["detect"] == 0]
+    banned_df = df[df["confirmed_ban"] == 1]
+    banned_ids = banned_df["reported_ids"].tolist()
+    return manual_dict, passive_dict, banned_ids
 
-        passive_dict = {
-            "reports": len(df_detect_passive.index),
-            "bans": int(df_detect_passive["confirmed_ban"].sum()),
-            "possible_bans": int(df_detect_passive["possible_ban"].sum()),
-        }
-        passive_dict["possible_bans"] = (
-            passive_dict["possible_bans"] - passive_dict["bans"]
-        )
 
+async def parse_contributors(
+    contributors, version=None, add_patron_stats: bool = False
+):
+    contributions = await sql_get_contributions(contributors)
+
+    # the pandas work runs in the process pool, off the event loop
+    manual_dict, passive_dict, banned_ids = await summarize_contributions(
+        [dict(row) for row in contributions]
+    )
+
+    if banned_ids is None:
+        total_dict = {"reports": 0, "bans": 0, "possible_bans": 0, "feedback": 0}
+
+    else:
         total_dict = {
             "reports": passive_dict["reports"] + manual_dict["reports"],
             "bans": passive_dict["bans"] + manual_dict["bans"],
@@ -352,13 +358,10 @@ async def parse_contributors(
 
     total_dict["total_xp_removed"] = 0
 
-    if df.empty:
+    if banned_ids is None:
         return_dict["total"] = total_dict
         return return_dict
 
-    banned_df = df[df["confirmed_ban"] == 1]
-    banned_ids = banned_df["reported_ids"].tolist()
-
     total_xp_sql = """
         SELECT
             SUM(total) as total_xp
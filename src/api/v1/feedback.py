@@ -1,5 +1,6 @@
 from typing import Optional
 
+from src.app.repositories.player import cache_player_ids, get_player_ids
 from src.database import functions
 from src.database.functions import (
     PLAYERDATA_ENGINE,
@@ -114,32 +115,33 @@ async def post_feedback(feedback: Feedback):
     name = feedback.pop("player_name")
     name = await functions.to_jagex_name(name)
 
-    sql_player: Select = select(Player)
+    sql_player: Select = select(Player.id)
     sql_player = sql_player.where(Player.name == name)
     sql_insert = Insert(PredictionsFeedback).prefix_with("ignore")
 
+    # anonymous names are not valid rsn's
+    ids = await get_player_ids([name], validate=False)
+
     async with PLAYERDATA_ENGINE.get_session() as session:
         session: AsyncSession = session
         async with session.begin():
-            player = await session.execute(sql_player)
-            player = sqlalchemy_result(player).rows2dict()
-
-            if player == []:
+            if name not in ids and name.startswith("anonymoususer "):
                 # create anonymous user if not exists
-                if name.startswith("anonymoususer "):
-                    await session.execute(Insert(Player).values(name=name))
-                    player = await session.execute(sql_player)
-                    player = sqlalchemy_result(player).rows2dict()
-            # this could be an else statement
-            try:
-                feedback["voter_id"] = player[0]["id"]
-            except IndexError:
+                await session.execute(Insert(Player).values(name=name))
+                player_id = await session.scalar(sql_player)
+                if player_id is not None:
+                    ids[name] = player_id
+
+            if name not in ids:
                 raise HTTPException(
                     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                     detail="Could not find voter in registry.",
                 )
+            feedback["voter_id"] = ids[name]
 
             sql_insert = sql_insert.values(feedback)
             await session.execute(sql_insert)
 
+    # the anonymous user is cached once it is committed
+    cache_player_ids(ids)
     return {"OK": "OK"}
@@ -1,17 +1,25 @@
 from typing import Optional
 
+from src.database.database import ML_ENGINE
 from src.database.functions import PLAYERDATA_ENGINE
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.database import EngineType
-from src.database.functions import sqlalchemy_result, verify_token
+from src.database.functions import (
+    core_result,
+    core_select,
+    sqlalchemy_result,
+    verify_token,
+)
 from src.database.models import (
     Player,
     PlayerHiscoreDataLatest,
     PlayerHiscoreDataXPChange,
     playerHiscoreData,
 )
+from src.database.export import ExportFormat, export_response
+from src.database.pagination import keyset_paginate, set_next_cursor
 from src.utils import logging_helpers
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.sql.expression import insert, select
 
@@ -194,9 +202,16 @@ async def get_latest_hiscore_data_by_player_features(
     label_id: Optional[int] = Query(None, ge=0),
     label_jagex: Optional[int] = Query(None, ge=0, le=5),
     greater_than: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = Query(
+        None, description="keyset pagination, empty for the first page"
+    ),
+    format: ExportFormat = ExportFormat.json,
+    response: Response = None,
 ):
     """
-    Select the latest hiscore data of multiple players by filtering on the player features.
+    Select the latest hiscore data of multiple players by filtering on the player features.\n
+    When a cursor is given, page is ignored & the next cursor is returned in the X-Next-Cursor header.\n
+    format=ndjson|arrow|parquet streams the rows, without X-Next-Cursor header.
     """
     # verify token
     await verify_token(
@@ -217,7 +232,7 @@ async def get_latest_hiscore_data_by_player_features(
         raise HTTPException(status_code=404, detail="No param given")
 
     # query
-    sql = select(PlayerHiscoreDataLatest)
+    sql = core_select(PlayerHiscoreDataLatest)
 
     # filters
     if not possible_ban is None:
@@ -239,19 +254,28 @@ async def get_latest_hiscore_data_by_player_features(
         sql = sql.where(Player.id >= greater_than)
 
     # paging
-    sql = sql.limit(row_count).offset(row_count * (page - 1))
+    if cursor is None:
+        sql = sql.limit(row_count).offset(row_count * (page - 1))
+    else:
+        sql = keyset_paginate(sql, PlayerHiscoreDataLatest.Player_id, cursor, row_count)
 
     # join
     sql = sql.join(Player)
 
+    if format != ExportFormat.json:
+        return export_response(sql, format, engine=ML_ENGINE)
+
     # execute query
-    async with PLAYERDATA_ENGINE.get_session() as session:
+    async with ML_ENGINE.get_session(readonly=True) as session:
         session: AsyncSession = session
         async with session.begin():
             data = await session.execute(sql)
 
-    data = sqlalchemy_result(data)
-    return data.rows2dict()
+    data = core_result(data).rows2dict()
+
+    if cursor is not None:
+        set_next_cursor(response, data, key="Player_id", row_count=row_count)
+    return data
 
 
 @router.get("/hiscore/XPChange", tags=["Hiscore"])
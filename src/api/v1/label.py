@@ -49,15 +49,15 @@ async def insert_label_into_plugin_database(token: str, label: label):
     sql_insert = sql_insert.values(label=label_name)
     sql_insert = sql_insert.prefix_with("ignore")
 
-    # select query
+    # select query, a locking read sees the row of a concurrent insert
     sql_select = select(dbLabel)
     sql_select = sql_select.where(dbLabel.label == label_name)
+    sql_select = sql_select.with_for_update(read=True)
 
     async with PLAYERDATA_ENGINE.get_session() as session:
         session: AsyncSession = session
         async with session.begin():
-            data = await session.execute(sql_insert)
-        async with session.begin():
+            await session.execute(sql_insert)
             data = await session.execute(sql_select)
 
     data = sqlalchemy_result(data)
@@ -2,13 +2,21 @@ import time
 from typing import List, Optional
 
 from src.database import functions
+from src.database.database import ML_ENGINE
 from src.database.functions import PLAYERDATA_ENGINE
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.database import Engine, EngineType
-from src.database.functions import sqlalchemy_result, verify_token
+from src.database.functions import (
+    core_result,
+    core_select,
+    sqlalchemy_result,
+    verify_token,
+)
+from src.database.export import ExportFormat, export_response
 from src.database.models import Player as dbPlayer
+from src.database.pagination import keyset_paginate, set_next_cursor
 from src.utils import logging_helpers
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.sql.expression import insert, select, update
 
@@ -81,9 +89,16 @@ async def get_bulk_player_data_from_the_plugin_database(
     label_jagex: Optional[int] = None,
     row_count: int = Query(100_000, ge=1),
     page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(
+        None, description="keyset pagination, empty for the first page"
+    ),
+    format: ExportFormat = ExportFormat.json,
+    response: Response = None,
 ):
     """
-    Selects bulk player data from the plugin database.
+    Selects bulk player data from the plugin database.\n
+    When a cursor is given, page is ignored & the next cursor is returned in the X-Next-Cursor header.\n
+    format=ndjson|arrow|parquet streams the rows, without X-Next-Cursor header.
     """
     await verify_token(
         token,
@@ -103,7 +118,7 @@ async def get_bulk_player_data_from_the_plugin_database(
         raise HTTPException(status_code=404, detail="No param given")
 
     # create query
-    sql = select(dbPlayer)
+    sql = core_select(dbPlayer)
 
     # filters
     # filters
@@ -123,16 +138,25 @@ async def get_bulk_player_data_from_the_plugin_database(
         sql = sql.where(dbPlayer.label_jagex == label_jagex)
 
     # query pagination
-    sql = sql.limit(row_count).offset(row_count * (page - 1))
+    if cursor is None:
+        sql = sql.limit(row_count).offset(row_count * (page - 1))
+    else:
+        sql = keyset_paginate(sql, dbPlayer.id, cursor, row_count)
+
+    if format != ExportFormat.json:
+        return export_response(sql, format, engine=ML_ENGINE)
 
     # transaction
-    async with PLAYERDATA_ENGINE.get_session() as session:
+    async with ML_ENGINE.get_session(readonly=True) as session:
         session: AsyncSession = session
         async with session.begin():
             data = await session.execute(sql)
 
-    data = sqlalchemy_result(data)
-    return data.rows2dict()
+    data = core_result(data).rows2dict()
+
+    if cursor is not None:
+        set_next_cursor(response, data, key="id", row_count=row_count)
+    return data
 
 
 @router.put("/player", tags=["Player"])
@@ -191,14 +215,15 @@ async def insert_new_player_data_into_plugin_database(
     sql_insert = sql_insert.values(name=player_name)
     sql_insert = sql_insert.prefix_with("ignore")
 
+    # a locking read sees the row of a concurrent insert of the same name
     sql_select = select(dbPlayer)
     sql_select = sql_select.where(dbPlayer.name == player_name)
+    sql_select = sql_select.with_for_update(read=True)
 
     async with PLAYERDATA_ENGINE.get_session() as session:
         session: AsyncSession = session
         async with session.begin():
             await session.execute(sql_insert)
-        async with session.begin():
             data = await session.execute(sql_select)
 
     data = sqlalchemy_result(data)
@@ -1,17 +1,22 @@
 from operator import or_
 from typing import List, Optional
 
-from src.database import functions
+from src.database import functions, statements
+from src.database.database import ML_ENGINE
 from src.database.functions import (
     PLAYERDATA_ENGINE,
+    core_result,
+    core_select,
     list_to_string,
     sqlalchemy_result,
     verify_token,
 )
 from src.database.models import Player, PlayerHiscoreDataLatest
 from src.database.models import Prediction as dbPrediction
+from src.database.export import ExportFormat, export_response
+from src.database.pagination import keyset_paginate, set_next_cursor
 from src.utils import logging_helpers
-from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import Select, select, text
@@ -56,6 +61,18 @@ class Prediction(BaseModel):
     Nex_bot: Optional[float] = 0
 
 
+# the columns are the fields of Prediction, in the order of Prediction.dict()
+INSERT_PREDICTION = statements.register(
+    "insert_prediction",
+    lambda: text(
+        "replace into Predictions ({}) values ({})".format(
+            list_to_string(Prediction.model_fields),
+            list_to_string([f":{k}" for k in Prediction.model_fields]),
+        )
+    ),
+)
+
+
 @router.get("/prediction", tags=["Prediction"])
 async def get_account_prediction_result(name: str, breakdown: Optional[bool] = False):
     """
@@ -125,31 +142,29 @@ async def insert_prediction_into_plugin_database(
 
     data = [d.dict() for d in prediction]
 
-    columns = list_to_string([k for k in data[0].keys()])
-    values = list_to_string([f":{k}" for k in data[0].keys()])
-
-    sql = f"""replace into Predictions ({columns}) values ({values})"""
-    sql = text(sql)
-
     async with PLAYERDATA_ENGINE.get_session() as session:
         session: AsyncSession = session
         async with session.begin():
-            data = await session.execute(sql, data)
+            data = await session.execute(INSERT_PREDICTION.sql, data)
 
     return {"ok": "ok"}
 
 
 @router.get("/prediction/data", tags=["Business"])
-async def get_expired_predictions(token: str, limit: int = Query(50_000, ge=1)):
+async def get_expired_predictions(
+    token: str,
+    limit: int = Query(50_000, ge=1),
+    format: ExportFormat = ExportFormat.json,
+):
     """
     Select predictions where prediction data is not from today or null.
-    Business service: ML
+    Business service: ML\n
+    format=ndjson|arrow|parquet streams the rows, arrow is an ipc stream.
     """
     await verify_token(token, verification="request_highscores")
 
     # query
-    columns_to_select = [PlayerHiscoreDataLatest, Player.name]
-    sql: Select = select(*columns_to_select)
+    sql: Select = core_select(PlayerHiscoreDataLatest, Player.name)
     sql = sql.where(
         or_(
             func.date(dbPrediction.created) != func.curdate(),
@@ -160,23 +175,15 @@ async def get_expired_predictions(token: str, limit: int = Query(50_000, ge=1)):
     sql = sql.limit(limit).offset(0)
     sql = sql.join(Player).join(dbPrediction, isouter=True)
 
-    async with PLAYERDATA_ENGINE.get_session() as session:
+    if format != ExportFormat.json:
+        return export_response(sql, format, engine=ML_ENGINE)
+
+    async with ML_ENGINE.get_session(readonly=True) as session:
         session: AsyncSession = session
         async with session.begin():
             data = await session.execute(sql)
 
-    names, objs, output = [], [], []
-    for d in data:
-        objs.append((d[0],))
-        names.append(d[1])
-
-    data = sqlalchemy_result(objs).rows2dict()
-
-    for d, n in zip(data, names):
-        d["name"] = n
-        output.append(d)
-
-    return output
+    return core_result(data).rows2dict()
 
 
 @router.get("/prediction/bulk", tags=["Prediction"])
@@ -190,9 +197,14 @@ async def gets_predictions_by_player_features(
     confirmed_player: Optional[int] = Query(None, ge=0, le=1),
     label_id: Optional[int] = Query(None, ge=0),
     label_jagex: Optional[int] = Query(None, ge=0, le=5),
+    cursor: Optional[str] = Query(
+        None, description="keyset pagination, empty for the first page"
+    ),
+    response: Response = None,
 ):
     """
-    Get predictions by player features
+    Get predictions by player features\n
+    When a cursor is given, page is ignored & the next cursor is returned in the X-Next-Cursor header.
     """
     await verify_token(
         token,
@@ -210,7 +222,7 @@ async def gets_predictions_by_player_features(
     ):
         raise HTTPException(status_code=404, detail="No param given")
     # query
-    sql: Select = select(dbPrediction)
+    sql: Select = core_select(dbPrediction)
 
     # filters
     if not possible_ban is None:
@@ -229,16 +241,22 @@ async def gets_predictions_by_player_features(
         sql = sql.where(Player.label_jagex == label_jagex)
 
     # paging
-    sql = sql.limit(row_count).offset(row_count * (page - 1))
+    if cursor is None:
+        sql = sql.limit(row_count).offset(row_count * (page - 1))
+    else:
+        sql = keyset_paginate(sql, dbPrediction.id, cursor, row_count)
 
     # join
     sql = sql.join(Player)
 
     # execute query
-    async with PLAYERDATA_ENGINE.get_session() as session:
+    async with ML_ENGINE.get_session(readonly=True) as session:
         session: AsyncSession = session
         async with session.begin():
             data = await session.execute(sql)
 
-    data = sqlalchemy_result(data)
-    return data.rows2dict()
+    data = core_result(data).rows2dict()
+
+    if cursor is not None:
+        set_next_cursor(response, data, key="id", row_count=row_count)
+    return data
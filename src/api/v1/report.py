@@ -1,103 +1,37 @@
 import logging
-import time
 from datetime import date
 from typing import List, Optional
-import asyncio
-import pandas as pd
-from src.database import functions
+from src.app.ingest import report as report_ingest
+from src.app.repositories.report import write_reports
+from src.core import config, http
+from src.core.tasks import SHADOW_TASKS
+from src.database import functions, statements
+from src.kafka.report import publish_report
 from src.database.functions import PLAYERDATA_ENGINE
 from src.database.models import (
-    Player,
     Report,
     playerReports,
     playerReportsManual,
-    stgReport,
 )
 from src.utils import logging_helpers
 from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from pydantic.fields import Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import aliased
 from sqlalchemy.sql import func
-from sqlalchemy.sql.expression import Insert, Select, insert, select, update
-from sqlalchemy import Text, text
-import aiohttp
+from sqlalchemy.sql.expression import Select, select, update
 import random
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # TODO: put these in the correct place
-report_maximum = 5000
-front_time_buffer = 3600
-back_time_buffer = 25200
 upper_gear_cost = 1_000_000_000_000
 
 # TODO: cleanup thse functions
 
 
-async def sql_select_players(names: List[str]) -> List:
-    _names = await functions.jagexify_names_list(names=names)
-    sql = select(Player)
-    sql = sql.where(Player.name.in_(_names))
-    async with PLAYERDATA_ENGINE.get_session() as session:
-        session: AsyncSession = session
-        async with session.begin():
-            data = await session.execute(sql)
-    data = functions.sqlalchemy_result(data)
-    return [] if not data else data.rows2dict()
-
-
-async def sql_insert_player(new_names: List[dict]) -> None:
-    sql: Insert = insert(Player)
-    sql = sql.prefix_with("ignore")
-    async with PLAYERDATA_ENGINE.get_session() as session:
-        session: AsyncSession = session
-        async with session.begin():
-            await session.execute(sql, new_names)
-
-
-async def sql_insert_report(param: dict) -> None:
-    sql: Insert = insert(stgReport)
-    sql = sql.prefix_with("ignore")
-    async with PLAYERDATA_ENGINE.get_session() as session:
-        session: AsyncSession = session
-        async with session.begin():
-            await session.execute(sql, param)
-
-
-async def parse_detection(data: dict) -> dict:
-    gmt = time.gmtime(data["ts"])
-    human_time = time.strftime("%Y-%m-%d %H:%M:%S", gmt)
-
-    equipment = data.get("equipment", {})
-
-    param = {
-        "reportedID": data.get("id"),
-        "reportingID": data.get("reporter_id"),
-        "region_id": data.get("region_id"),
-        "x_coord": data.get("x_coord"),
-        "y_coord": data.get("y_coord"),
-        "z_coord": data.get("z_coord"),
-        "timestamp": human_time,
-        "manual_detect": data.get("manual_detect"),
-        "on_members_world": data.get("on_members_world"),
-        "on_pvp_world": data.get("on_pvp_world"),
-        "world_number": data.get("world_number"),
-        "equip_head_id": equipment.get("equip_head_id"),
-        "equip_amulet_id": equipment.get("equip_amulet_id"),
-        "equip_torso_id": equipment.get("equip_torso_id"),
-        "equip_legs_id": equipment.get("equip_legs_id"),
-        "equip_boots_id": equipment.get("equip_boots_id"),
-        "equip_cape_id": equipment.get("equip_cape_id"),
-        "equip_hands_id": equipment.get("equip_hands_id"),
-        "equip_weapon_id": equipment.get("equip_weapon_id"),
-        "equip_shield_id": equipment.get("equip_shield_id"),
-        "equip_ge_value": data.get("equip_ge_value", 0),
-    }
-    return param
-
-
 class equipment(BaseModel):
     equip_head_id: int = Field(0, ge=0)
     equip_amulet_id: int = Field(0, ge=0)
@@ -200,33 +134,20 @@ async def update_reports(
     return {"detail": f"{data.rowcount} rows updated to reportingID = {new_user_id}."}
 
 
-async def insert_active_reporter(reporter: str):
-    if "anonymoususer" in reporter:
-        return
-    try:
-        sql: Text = text("INSERT INTO activeReporters (name) VALUES (:reporter)")
-
-        async with PLAYERDATA_ENGINE.get_session() as session:
-            session: AsyncSession = session
-            async with session.begin():
-                await session.execute(sql, {"reporter": reporter})
-    except Exception as e:
-        e = str(e)
-        if "Duplicate entry" in e:
-            return
-        logger.error(str(e))
-
 async def insert_report_v2(detections: list[detection]):
     try:
-        url = 'http://public-api-svc.bd-prd.svc:5000/v2/report'
         data = [d.dict() for d in detections]
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url=url, json=data) as response:
-                if not response.ok:
-                    logger.error(await response.text())
+        status_code, body = await http.SHADOW_CLIENT.post(
+            config.shadow_report_url, json=data
+        )
+        if status_code >= 400:
+            logger.error(body)
+    except http.HttpUnavailable as e:
+        logger.debug(str(e))
     except Exception as e:
         logger.error(e)
 
+
 @router.post("/report", status_code=status.HTTP_201_CREATED, tags=["Report"])
 async def insert_report(
     detections: List[detection],
@@ -235,173 +156,45 @@ async def insert_report(
     """
     Inserts detections into to the plugin database.
     """
-    if random.randint(1, 10) == 1:
-        asyncio.create_task(insert_report_v2(detections))
-    # remove duplicates
-    df = pd.DataFrame([d.dict() for d in detections])
-    df.drop_duplicates(subset=["reporter", "reported", "region_id"], inplace=True)
-
-    # data validation, there can only be one reporter, and it is unrealistic to send more then 5k reports.
-    if len(df) > 5000 or df["reporter"].nunique() > 1:
-        logger.warning({"message": "Too many reports."})
-        return
+    if config.shadow_report_url and random.random() < config.shadow_report_sample_rate:
+        SHADOW_TASKS.try_submit(insert_report_v2, detections)
 
-    # data validation, checks for correct timing
-    now = int(time.time())
-    now_upper = int(now + 3600)
-    now_lower = int(now - 25200)
-
-    df_time = df.ts
-    mask = (df_time > now_upper) | (df_time < now_lower)
-    if len(df_time[mask].values) > 0:
-        logger.warning(
-            {
-                "message": "Data contains out of bounds time",
-                "reporter": df["reporter"].unique(),
-                "time": df_time[mask].values[0],
-            }
-        )
+    batch = report_ingest.prepare(detections)
+    if batch is None:
         return
 
-    logger.info({"message": f"Received: {len(df)} from: {df['reporter'].unique()}"})
-
-    # Normalize names
-    df["reporter"] = df["reporter"].apply(
-        lambda name: name.lower().replace("_", " ").replace("-", " ").strip()
-    )
-    df["reported"] = df["reported"].apply(
-        lambda name: name.lower().replace("_", " ").replace("-", " ").strip()
+    logger.info(
+        {"message": f"Received: {len(batch.detections)} from: {batch.reporter}"}
     )
 
-    # Get a list of unqiue reported names and reporter name
-    names = list(df["reported"].unique())
-    names.extend(df["reporter"].unique())
-
-    # validate all names
-    valid_names = [
-        await functions.to_jagex_name(name)
-        for name in names
-        if await functions.is_valid_rsn(name)
-    ]
-    # logger.debug(f"Valid names: {len(valid_names)}")
-    # logger.debug(f"{valid_names=}")
-
-    # Get IDs for all unique valid names
-    data = await sql_select_players(valid_names)
-    # logger.debug(f"Found players before insert: {len(data)}")
-    # logger.debug(f"{data=}")
-
-    # Create entries for players that do not yet exist in Players table
-    existing_names = [d["name"] for d in data]
-    # logger.debug(f"{existing_names=}")
-
-    new_names = set([name for name in valid_names]).difference(existing_names)
-    # logger.debug(f"{new_names=}")
-
-    # Get new player id's
-    if new_names:
-        param = [
-            {"name": name, "normalized_name": await functions.to_jagex_name(name)}
-            for name in new_names
-        ]
-        await functions.batch_function(sql_insert_player, param)
-        players = await sql_select_players(new_names)
-        # logger.debug(f"Found players after insert: {len(players)=}, {len(new_names)=}")
-        data.extend(players)
-
-    # Insert detections into Reports table with user ids
-    # add reported & reporter id
-    df_names = pd.DataFrame(data)
-
-    if len(df) == 0:
-        logger.warning(
-            {"message": "empty dataframe, before merge", "detections": detections}
-        )
+    if config.report_ingest_mode == "kafka":
+        try:
+            await publish_report(batch, manual_detect=manual_detect)
+            return JSONResponse(
+                content={"detail": "queued"}, status_code=status.HTTP_202_ACCEPTED
+            )
+        except Exception as e:
+            logger.error({"message": "publish failed, writing", "error": str(e)})
+
+    # players that do not exist are created
+    if not await write_reports([(batch, manual_detect)]):
         return
-
-    if len(df_names) == 0:
-        logger.warning(
-            {"message": "empty dataframe names, before merge", "detections": detections}
-        )
-        return
-
-    df = df.merge(df_names, left_on="reported", right_on="name")
-
-    if len(df) == 0:
-        logger.warning(
-            {"message": "empty dataframe, after merge", "detections": detections}
-        )
-        return
-
-    reporter = df["reporter"].unique()
-
-    if len(reporter) != 1:
-        logger.warning({"message": "No reporter", "detections": detections})
-        return
-
-    reporter_id = df_names.query(f"name == {reporter}")["id"].to_list()
-
-    if len(reporter_id) == 0:
-        logger.warning({"message": "No reporter in df_names", "detections": detections})
-        return
-
-    asyncio.create_task(insert_active_reporter(reporter[0]))
-
-    # if reporter_id[0] == 657248:
-    #     logger.debug({"message": "Temporary ignoring anonymous reporter"})
-    #     return
-
-    df["reporter_id"] = reporter_id[0]
-
-    if manual_detect:
-        df["manual_detect"] = manual_detect
-
-    # Parse data to param
-    data = df.to_dict("records")
-    param = [await parse_detection(d) for d in data]
-
-    # Parse query
-    await functions.batch_function(sql_insert_report, param)
     return {"detail": "ok"}
 
 
 @router.get("/report/count", tags=["Report"])
 async def get_report_count_v1(name: str):
-    """
-    """
+    """ """
     name = await functions.to_jagex_name(name)
 
-    voter: Player = aliased(Player, name="voter")
-    subject: Player = aliased(Player, name="subject")
-
-    sub_query: Select = select(Report.reportedID.distinct().label("reportedID"))
-    sub_query = sub_query.join(voter, Report.reportingID == voter.id)
-    sub_query = sub_query.where(voter.name == name)
-    sub_query = sub_query.where(Report.manual_detect == 0)
-
-    # Create an alias for the subquery
-    sub_query_alias = sub_query.alias("DistinctReports")
-
-    sql: Select = select(
-        func.count(subject.id),
-        subject.confirmed_ban,
-        subject.possible_ban,
-        subject.confirmed_player,
-    )
-    sql = sql.select_from(sub_query_alias)
-    sql = sql.join(
-        subject, sub_query_alias.c.reportedID == subject.id
-    )  # Use c to access columns
-    sql = sql.group_by(
-        subject.confirmed_ban, subject.possible_ban, subject.confirmed_player
-    )
-
     keys = ["count", "confirmed_ban", "possible_ban", "confirmed_player"]
     # execute query
     async with PLAYERDATA_ENGINE.get_session() as session:
         session: AsyncSession = session
         async with session.begin():
-            data = await session.execute(sql)
+            data = await session.execute(
+                statements.REPORT_COUNT.sql, {"name": name, "manual_detect": 0}
+            )
             data = [{k: v for k, v in zip(keys, d)} for d in data]
     return data
 
@@ -413,37 +206,14 @@ async def get_report_manual_count_v1(name: str):
     """
     name = await functions.to_jagex_name(name)
 
-    voter: Player = aliased(Player, name="voter")
-    subject: Player = aliased(Player, name="subject")
-
-    sub_query: Select = select(Report.reportedID.distinct().label("reportedID"))
-    sub_query = sub_query.join(voter, Report.reportingID == voter.id)
-    sub_query = sub_query.where(voter.name == name)
-    sub_query = sub_query.where(Report.manual_detect == 1)
-
-    # Create an alias for the subquery
-    sub_query_alias = sub_query.alias("DistinctReports")
-
-    sql: Select = select(
-        func.count(subject.id),
-        subject.confirmed_ban,
-        subject.possible_ban,
-        subject.confirmed_player,
-    )
-    sql = sql.select_from(sub_query_alias)
-    sql = sql.join(
-        subject, sub_query_alias.c.reportedID == subject.id
-    )  # Use c to access columns
-    sql = sql.group_by(
-        subject.confirmed_ban, subject.possible_ban, subject.confirmed_player
-    )
-
     keys = ["count", "confirmed_ban", "possible_ban", "confirmed_player"]
     # execute query
     async with PLAYERDATA_ENGINE.get_session() as session:
         session: AsyncSession = session
         async with session.begin():
-            data = await session.execute(sql)
+            data = await session.execute(
+                statements.REPORT_COUNT.sql, {"name": name, "manual_detect": 1}
+            )
             data = [{k: v for k, v in zip(keys, d)} for d in data]
 
     return data
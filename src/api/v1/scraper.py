@@ -6,7 +6,8 @@ from typing import List, Optional
 
 from src.database.functions import PLAYERDATA_ENGINE
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database.database import EngineType
+from src.core.tasks import TASKS
+from src.database.database import SCRAPER_INGEST_ENGINE, EngineType
 from src.database.functions import batch_function, execute_sql, verify_token
 from src.database.models import Player as dbPlayer
 from src.database.models import playerHiscoreData
@@ -129,7 +130,9 @@ class scraper(BaseModel):
 
 async def sql_get_players_to_scrape(page=1, amount=100_000):
     sql = "select * from playersToScrape"
-    data = await execute_sql(sql, page=page, row_count=amount)
+    data = await execute_sql(
+        sql, page=page, row_count=amount, engine=SCRAPER_INGEST_ENGINE
+    )
     return data.rows2dict()
 
 
@@ -158,7 +161,7 @@ async def sqla_update_player(players: List):
 
     dbplayer = players.copy()
     try:
-        async with PLAYERDATA_ENGINE.get_session() as session:
+        async with SCRAPER_INGEST_ENGINE.get_session() as session:
             session: AsyncSession = session
             for player in players:
                 async with session.begin():
@@ -179,7 +182,7 @@ async def sqla_insert_hiscore(hiscores: List):
     sql = insert(playerHiscoreData).prefix_with("ignore")
     dbhiscores = hiscores.copy()
     try:
-        async with PLAYERDATA_ENGINE.get_session() as session:
+        async with SCRAPER_INGEST_ENGINE.get_session() as session:
             session: AsyncSession = session
             for hiscore in hiscores:
                 async with session.begin():
@@ -199,7 +202,7 @@ async def receive_scraper_data(token, data: List[scraper], request: Request):
         route=logging_helpers.build_route_log_string(request),
     )
     # background task will cause lots of duplicates
-    asyncio.create_task(post_hiscores_to_db(data))
+    TASKS.submit(post_hiscores_to_db, data)
     return {"detail": f"{len(data)} records to be inserted."}
 
 
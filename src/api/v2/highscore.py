@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Query, status, Header, Request
+from src.database.database import ML_ENGINE
+from src.database.export import ExportFormat, export_response
 from src.database.functions import verify_token
 from src.utils import logging_helpers
 from src.app.repositories.highscore import (
@@ -38,6 +40,9 @@ async def get_highscore_data_latest(
     gte_player_id: int = Query(ge=0, description="player id greater than or equal to"),
     page: int = Query(default=None, ge=1),
     page_size: int = Query(default=1000, ge=1),
+    format: ExportFormat = Query(
+        default=ExportFormat.json, description="json, ndjson, arrow or parquet"
+    ),
     token: str = Header(...),
 ):
     await verify_token(
@@ -47,6 +52,13 @@ async def get_highscore_data_latest(
     )
 
     repo = RepositoryPlayerHiscoreDataLatest()
+
+    if format != ExportFormat.json:
+        sql = repo.select_columns(
+            gte_player_id=gte_player_id, page=page, page_size=page_size
+        )
+        return export_response(sql, format, engine=ML_ENGINE)
+
     data = await repo.read(gte_player_id=gte_player_id, page=page, page_size=page_size)
     return data
 
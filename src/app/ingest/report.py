@@ -0,0 +1,183 @@
+"""
+Parsing of the detections posted to /v1/report.
+
+prepare validates, dedupes & normalizes a payload, to_rows maps the player names
+to ids & returns the stgReports insert parameters as tuples (see COLUMNS),
+plain dict & set operations, no DataFrames.
+to_message & from_message (de)serialize a prepared batch for the kafka ingest mode.
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# data validation, it is unrealistic to send more then 5k reports
+REPORT_MAXIMUM = 5000
+FRONT_TIME_BUFFER = 3600
+BACK_TIME_BUFFER = 25200
+
+EQUIPMENT = (
+    "equip_head_id",
+    "equip_amulet_id",
+    "equip_torso_id",
+    "equip_legs_id",
+    "equip_boots_id",
+    "equip_cape_id",
+    "equip_hands_id",
+    "equip_weapon_id",
+    "equip_shield_id",
+)
+# column order of the rows returned by to_rows
+COLUMNS = (
+    "reportedID",
+    "reportingID",
+    "region_id",
+    "x_coord",
+    "y_coord",
+    "z_coord",
+    "timestamp",
+    "manual_detect",
+    "on_members_world",
+    "on_pvp_world",
+    "world_number",
+    *EQUIPMENT,
+    "equip_ge_value",
+)
+_MANUAL_DETECT = COLUMNS.index("manual_detect") - 2
+
+_VALID_NAME = re.compile(r"[\w\d\s_-]{1,13}")
+
+
+def normalize_name(name: str) -> str:
+    return name.lower().replace("_", " ").replace("-", " ").strip()
+
+
+def is_valid_name(name: str) -> bool:
+    return _VALID_NAME.fullmatch(name) is not None
+
+
+@dataclass
+class ReportBatch:
+    reporter: str
+    # the valid names of the reporter & reported players
+    names: set[str]
+    # (reported name, values of COLUMNS[2:])
+    detections: list[tuple] = field(default_factory=list)
+
+
+def prepare(detections: list, now: int = None) -> Optional[ReportBatch]:
+    """
+    Validates, dedupes on (reporter, reported, region_id) & normalizes the detections,
+    returns None when the payload is rejected.
+    """
+    if not detections:
+        return None
+
+    reporters = {d.reporter for d in detections}
+    if len(reporters) > 1:
+        logger.warning({"message": "Too many reports."})
+        return None
+
+    reporter = normalize_name(detections[0].reporter)
+    if not is_valid_name(reporter):
+        logger.warning({"message": "Invalid reporter", "reporter": reporter})
+        return None
+
+    now = int(time.time()) if now is None else now
+    upper, lower = now + FRONT_TIME_BUFFER, now - BACK_TIME_BUFFER
+
+    unique = {}
+    timestamps = {}
+    for d in detections:
+        if d.ts > upper or d.ts < lower:
+            logger.warning(
+                {
+                    "message": "Data contains out of bounds time",
+                    "reporter": reporter,
+                    "time": d.ts,
+                }
+            )
+            return None
+
+        reported = normalize_name(d.reported)
+        key = (reported, d.region_id)
+        if key in unique:
+            continue
+
+        # detections of one payload share a handful of timestamps
+        timestamp = timestamps.get(d.ts)
+        if timestamp is None:
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(d.ts))
+            timestamps[d.ts] = timestamp
+
+        equipment = d.equipment
+        unique[key] = (
+            reported,
+            d.region_id,
+            d.x_coord,
+            d.y_coord,
+            d.z_coord,
+            timestamp,
+            d.manual_detect,
+            d.on_members_world,
+            d.on_pvp_world,
+            d.world_number,
+            *[getattr(equipment, e) for e in EQUIPMENT],
+            d.equip_ge_value,
+        )
+
+    if len(unique) > REPORT_MAXIMUM:
+        logger.warning({"message": "Too many reports."})
+        return None
+
+    names = {reported for reported, _ in unique if is_valid_name(reported)}
+    names.add(reporter)
+    return ReportBatch(reporter=reporter, names=names, detections=list(unique.values()))
+
+
+def to_rows(
+    batch: ReportBatch, ids: dict[str, int], manual_detect: int = None
+) -> list[tuple]:
+    """
+    The stgReports insert parameters (see COLUMNS), detections of players without id are dropped.
+    """
+    reporter_id = ids.get(batch.reporter)
+    if reporter_id is None:
+        return []
+
+    rows = []
+    for reported, *values in batch.detections:
+        reported_id = ids.get(reported)
+        if reported_id is None:
+            continue
+        if manual_detect:
+            values[_MANUAL_DETECT] = manual_detect
+        rows.append((reported_id, reporter_id, *values))
+    return rows
+
+
+def to_message(batch: ReportBatch, manual_detect: int = None) -> dict:
+    """
+    The json serializable form of a prepared batch, published in the kafka ingest mode.
+    """
+    return {
+        "reporter": batch.reporter,
+        "names": sorted(batch.names),
+        "detections": batch.detections,
+        "manual_detect": manual_detect,
+    }
+
+
+def from_message(message: dict) -> tuple[ReportBatch, Optional[int]]:
+    """
+    The batch & manual_detect of a message of to_message.
+    """
+    batch = ReportBatch(
+        reporter=message["reporter"],
+        names=set(message["names"]),
+        detections=[tuple(d) for d in message["detections"]],
+    )
+    return batch, message.get("manual_detect")
@@ -2,10 +2,11 @@ import logging
 
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import select
+from sqlalchemy.sql.expression import Select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.app.schemas.highscore import PlayerHiscoreData as SchemaHiscore
-from src.database.database import PLAYERDATA_ENGINE
+from src.database.database import ML_ENGINE
 from src.database.functions import handle_database_error
 from src.database.models import Player as dbPlayer
 from src.database.models import PlayerHiscoreDataLatest as dbPlayerHiscoreDataLatest
@@ -14,13 +15,16 @@ logger = logging.getLogger(__name__)
 
 
 class PlayerHiscoreDataLatest:
+    """
+    Bulk reads of the latest hiscores, they run on ML_ENGINE like the v1 bulk routes.
+    """
+
     def __init__(self):
         pass
 
-    @handle_database_error
-    async def read(
+    def _select(
         self, gte_player_id: int = None, page: int = None, page_size: int = None
-    ):
+    ) -> Select:
         table = dbPlayerHiscoreDataLatest
 
         sql_select = select(table)
@@ -38,7 +42,26 @@ class PlayerHiscoreDataLatest:
         if page is not None and page_size:
             sql_select = sql_select.offset((page - 1) * page_size)
 
-        async with PLAYERDATA_ENGINE.get_session() as session:
+        return sql_select
+
+    def select_columns(
+        self, gte_player_id: int = None, page: int = None, page_size: int = None
+    ) -> Select:
+        """
+        The read query, selecting the table columns instead of orm objects, used for exports.
+        """
+        sql_select = self._select(gte_player_id, page, page_size)
+        return sql_select.with_only_columns(
+            *dbPlayerHiscoreDataLatest.__table__.columns
+        )
+
+    @handle_database_error
+    async def read(
+        self, gte_player_id: int = None, page: int = None, page_size: int = None
+    ):
+        sql_select = self._select(gte_player_id, page, page_size)
+
+        async with ML_ENGINE.get_session(readonly=True) as session:
             session: AsyncSession
             # Execute the select query
             result = await session.execute(sql_select)
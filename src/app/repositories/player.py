@@ -1,17 +1,113 @@
 import logging
+from typing import Iterable
 
 from pydantic import ValidationError
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 from sqlalchemy.sql.expression import Delete, Insert, Select, Update, and_
 
+from src.app.ingest.report import is_valid_name
 from src.app.schemas.player import Player as SchemaPlayer
-from src.database.database import PLAYERDATA_ENGINE
+from src.core import config, metrics
+from src.database import statements
+from src.database.database import PLAYERDATA_ENGINE, Engine
 from src.database.functions import handle_database_error
 from src.database.models import Player as dbPlayer
+from src.utils.cache import MISSING, LRUCache
 
 logger = logging.getLogger(__name__)
 
+# normalized name -> player id of the known players
+PLAYER_ID_CACHE = LRUCache(
+    maxsize=config.player_cache_size, ttl=config.player_cache_ttl
+)
+metrics.register("player_id_cache", PLAYER_ID_CACHE.stats)
+
+
+def cache_player_ids(ids: dict[str, int]) -> None:
+    """
+    Adds the ids of players that were just read or created.
+    """
+    for name, player_id in ids.items():
+        PLAYER_ID_CACHE.set(name, player_id)
+
+
+def _split_cached(names: Iterable[str], validate: bool) -> tuple[dict, list]:
+    # the cached ids & the names that are not cached
+    ids, unseen = {}, []
+    for name in names:
+        player_id = PLAYER_ID_CACHE.get(name, default=MISSING)
+        if player_id is not MISSING:
+            ids[name] = player_id
+            continue
+        # the routes drop invalid names first (report_ingest.prepare), not cached
+        if validate and not is_valid_name(name):
+            continue
+        unseen.append(name)
+    return ids, unseen
+
+
+@handle_database_error
+async def get_player_ids(
+    names: Iterable[str], engine: Engine = PLAYERDATA_ENGINE, validate: bool = True
+) -> dict[str, int]:
+    """
+    The ids of the known players by normalized name, only names that are not cached are read.
+    With validate, names that are not valid rsn's are skipped.
+    """
+    ids, unseen = _split_cached(names, validate)
+    if not unseen:
+        return ids
+
+    async with engine.get_session() as session:
+        session: AsyncSession = session
+        async with session.begin():
+            result = await session.execute(statements.PLAYER_IDS.sql, {"names": unseen})
+            found = {name: player_id for name, player_id in result}
+
+    cache_player_ids(found)
+    ids.update(found)
+    return ids
+
+
+@handle_database_error
+async def get_or_create_players(
+    names: Iterable[str], engine: Engine = PLAYERDATA_ENGINE, validate: bool = True
+) -> dict[str, int]:
+    """
+    The ids of the players by normalized name, players that do not exist are created.
+
+    The names that are not cached are read in one transaction, only the names that
+    were not found are inserted (an ignored insert still uses an auto increment id)
+    & read again with a share lock. The locking read returns the latest committed rows,
+    so concurrent callers creating the same names wait on each others insert & get the same ids.
+    """
+    ids, unseen = _split_cached(names, validate)
+    if not unseen:
+        return ids
+
+    async with engine.get_session() as session:
+        session: AsyncSession = session
+        async with session.begin():
+            result = await session.execute(statements.PLAYER_IDS.sql, {"names": unseen})
+            found = {name: player_id for name, player_id in result}
+
+            # the same lock order for concurrent callers, deadlocks are retried
+            missing = sorted(name for name in unseen if name not in found)
+            if missing:
+                await session.execute(
+                    statements.INSERT_PLAYERS.sql,
+                    [{"name": n, "normalized_name": n} for n in missing],
+                )
+                result = await session.execute(
+                    statements.PLAYER_IDS_SHARE_LOCK.sql, {"names": missing}
+                )
+                found.update({name: player_id for name, player_id in result})
+
+    cache_player_ids(found)
+    ids.update(found)
+    return ids
+
 
 class Player:
     def __init__(self) -> None:
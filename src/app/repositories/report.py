@@ -0,0 +1,62 @@
+import logging
+from typing import Optional
+
+from src.app.ingest.report import COLUMNS, ReportBatch, to_rows
+from src.app.repositories.player import get_or_create_players
+from src.core import config, metrics
+from src.database.active_reporters import ACTIVE_REPORTERS
+from src.database.coalescer import CoalescingWriter
+from src.database.database import PLUGIN_INGEST_ENGINE
+from src.database.functions import EXECUTE_SQL_RETRY
+
+logger = logging.getLogger(__name__)
+
+SQL_INSERT_REPORT = "INSERT IGNORE INTO stgReports ({}) VALUES ({})".format(
+    ", ".join(COLUMNS), ", ".join(["%s"] * len(COLUMNS))
+)
+
+# rows of report_ingest.to_rows, merged over the concurrent /v1/report requests
+REPORT_WRITER = CoalescingWriter(
+    "stgReports",
+    sql=SQL_INSERT_REPORT,
+    engine=PLUGIN_INGEST_ENGINE,
+    batch_size=config.report_write_batch_size,
+    flush_interval=config.report_write_flush_interval,
+    max_queue=config.report_write_queue_size,
+    ack=config.report_write_ack,
+    retry=EXECUTE_SQL_RETRY,
+)
+metrics.register("report_writer", REPORT_WRITER.stats)
+
+
+async def write_reports(
+    batches: list[tuple[ReportBatch, Optional[int]]], flushed: bool = False
+) -> int:
+    """
+    Writes prepared batches (with their manual_detect) to stgReports,
+    the players of all batches are created with one insert, returns the number of rows.
+    With flushed it returns once the rows are committed, whatever config.report_write_ack.
+    """
+    names = set()
+    for batch, _ in batches:
+        names |= batch.names
+
+    # only names that are not cached reach the database
+    ids = await get_or_create_players(names, engine=PLUGIN_INGEST_ENGINE)
+
+    rows = []
+    for batch, manual_detect in batches:
+        if batch.reporter not in ids:
+            logger.warning({"message": "No reporter", "reporter": batch.reporter})
+            continue
+
+        ACTIVE_REPORTERS.record(batch.reporter)
+
+        batch_rows = to_rows(batch, ids, manual_detect=manual_detect)
+        if not batch_rows:
+            logger.warning({"message": "No known players", "reporter": batch.reporter})
+        rows.extend(batch_rows)
+
+    # merged with the rows of concurrent requests, see config.report_write_ack
+    await REPORT_WRITER.submit(rows, flushed=flushed)
+    return len(rows)
@@ -12,10 +12,114 @@ load_dotenv(find_dotenv(), verbose=True)
 
 sql_uri = os.environ.get("sql_uri")
 discord_sql_uri = os.environ.get("discord_sql_uri")
+# read replicas of sql_uri (comma separated), readonly sessions are routed to them
+sql_read_uris = [uri for uri in os.environ.get("sql_read_uris", "").split(",") if uri]
 token = os.environ.get("token")
 kafka_url = os.environ.get("kafka_url", "127.0.0.1:9094")
+# "kafka" or "memory", an in-process broker for tests & local development
+kafka_backend = os.environ.get("kafka_backend", "kafka")
+# a consumer fetch waits up to kafka_fetch_timeout_ms for messages
+kafka_fetch_timeout_ms = int(os.environ.get("kafka_fetch_timeout_ms", 500))
+# a publish that is not acknowledged in kafka_publish_timeout seconds fails,
+# /v1/report then writes the detections directly
+kafka_publish_timeout = float(os.environ.get("kafka_publish_timeout", 5))
+# "auto", "orjson" or "json", decoder of the kafka messages (src.kafka.modules.codec)
+json_backend = os.environ.get("json_backend", "auto")
 env = os.environ.get("env", "DEV")
 
+# verify_token permission cache, entries live for token_cache_ttl seconds,
+# a revoked token or permission keeps working for up to token_cache_ttl seconds
+# in the processes that did not call invalidate_token_cache
+token_cache_ttl = float(os.environ.get("token_cache_ttl", 10))
+token_cache_size = int(os.environ.get("token_cache_size", 10_000))
+# unknown tokens are cached apart & shorter, random tokens do not evict the known ones
+unknown_token_cache_ttl = float(os.environ.get("unknown_token_cache_ttl", 2))
+unknown_token_cache_size = int(os.environ.get("unknown_token_cache_size", 1_000))
+# ApiUser.ratelimit is enforced over a sliding window of ratelimit_window seconds
+ratelimit_window = float(os.environ.get("ratelimit_window", 3600))
+ratelimit_backend = os.environ.get("ratelimit_backend", "local")
+# ApiUsage audit rows are queued & written in batches
+audit_queue_size = int(os.environ.get("audit_queue_size", 10_000))
+audit_batch_size = int(os.environ.get("audit_batch_size", 500))
+audit_flush_interval = float(os.environ.get("audit_flush_interval", 5))
+# reporters of /v1/report are collected & written to activeReporters in one insert
+active_reporters_size = int(os.environ.get("active_reporters_size", 100_000))
+active_reporters_flush_interval = float(
+    os.environ.get("active_reporters_flush_interval", 10)
+)
+# normalized player name -> id cache of the report & feedback ingest
+player_cache_size = int(os.environ.get("player_cache_size", 100_000))
+player_cache_ttl = float(os.environ.get("player_cache_ttl", 3600))
+# stgReports rows of concurrent /v1/report requests are merged into multi-row INSERTs,
+# report_write_ack: "flushed" responds after the commit, "queued" after queueing
+report_write_batch_size = int(os.environ.get("report_write_batch_size", 1000))
+report_write_flush_interval = float(os.environ.get("report_write_flush_interval", 0.05))
+report_write_queue_size = int(os.environ.get("report_write_queue_size", 50_000))
+report_write_ack = os.environ.get("report_write_ack", "flushed")
+# /v1/report ingest, "direct" writes stgReports in the request,
+# "kafka" publishes the validated detections to report_topic & responds 202,
+# the report consumer (report_consumer_enabled) writes them in batches
+report_ingest_mode = os.environ.get("report_ingest_mode", "direct")
+report_topic = os.environ.get("report_topic", "report")
+report_consumer_group = os.environ.get("report_consumer_group", "report-api")
+report_consumer_enabled = os.environ.get("report_consumer_enabled", "true") == "true"
+report_consumer_batch_size = int(os.environ.get("report_consumer_batch_size", 100))
+report_consumer_flush_interval = float(
+    os.environ.get("report_consumer_flush_interval", 1)
+)
+
+
+def _db_pool(name: str, size: int, overflow: int, timeout: float) -> dict:
+    return {
+        "pool_size": int(os.environ.get(f"db_pool_{name}_size", size)),
+        "max_overflow": int(os.environ.get(f"db_pool_{name}_overflow", overflow)),
+        "pool_timeout": float(os.environ.get(f"db_pool_{name}_timeout", timeout)),
+    }
+
+
+# a connection pool per workload, so one workload can not exhaust the connections of the others
+db_pools = {
+    "interactive": _db_pool("interactive", 10, 30, 10),
+    "plugin_ingest": _db_pool("plugin_ingest", 5, 25, 30),
+    "scraper_ingest": _db_pool("scraper_ingest", 5, 15, 30),
+    "ml_read": _db_pool("ml_read", 2, 8, 60),
+    "discord": _db_pool("discord", 5, 20, 30),
+}
+replica_check_interval = float(os.environ.get("replica_check_interval", 10))
+# reads of a request that wrote stay on the primary for replica_sticky_seconds (replication lag)
+replica_sticky_seconds = float(os.environ.get("replica_sticky_seconds", 5))
+# ingest worker (python -m src.kafka.worker), health & metrics are served on worker_port
+worker_port = int(os.environ.get("worker_port", 8080))
+worker_liveness_timeout = float(os.environ.get("worker_liveness_timeout", 120))
+highscore_topic = os.environ.get("highscore_topic", "scraper")
+highscore_consumer_group = os.environ.get("highscore_consumer_group", "highscore-api")
+highscore_batch_size = int(os.environ.get("highscore_batch_size", 100))
+highscore_flush_interval = float(os.environ.get("highscore_flush_interval", 60))
+# concurrent batch writers, a partition is always written by the same writer
+highscore_parallelism = int(os.environ.get("highscore_parallelism", 4))
+# src.core.http clients, calls over http_max_concurrency are rejected,
+# the circuit opens for http_breaker_reset seconds after http_breaker_failures failures
+http_timeout = float(os.environ.get("http_timeout", 5))
+http_max_connections = int(os.environ.get("http_max_connections", 20))
+http_max_concurrency = int(os.environ.get("http_max_concurrency", 50))
+http_breaker_failures = int(os.environ.get("http_breaker_failures", 5))
+http_breaker_reset = float(os.environ.get("http_breaker_reset", 30))
+# share of the /v1/report payloads also posted to shadow_report_url, empty url disables it
+shadow_report_url = os.environ.get(
+    "shadow_report_url", "http://public-api-svc.bd-prd.svc:5000/v2/report"
+)
+shadow_report_sample_rate = float(os.environ.get("shadow_report_sample_rate", 0.1))
+# src.core.tasks, background work of the routes, over the queue the routes respond 503
+task_max_concurrency = int(os.environ.get("task_max_concurrency", 20))
+task_max_queue = int(os.environ.get("task_max_queue", 1000))
+task_drain_timeout = float(os.environ.get("task_drain_timeout", 30))
+# limits of the best effort shadow posts, apart from the ones above
+shadow_task_max_concurrency = int(os.environ.get("shadow_task_max_concurrency", 5))
+shadow_task_max_queue = int(os.environ.get("shadow_task_max_queue", 100))
+# workers of src.core.executors, 0 runs the work inline on the event loop
+process_pool_size = int(os.environ.get("process_pool_size", 2))
+thread_pool_size = int(os.environ.get("thread_pool_size", 8))
+
 # setup logging
 file_handler = logging.FileHandler(filename="./error.log", mode="a")
 stream_handler = logging.StreamHandler(sys.stdout)
@@ -0,0 +1,148 @@
+"""
+Process & thread pools for work that would block the event loop.
+
+    @cpu_bound      runs the function in the process pool (pandas, parsing),
+                    arguments & results must be picklable
+    @blocking_io    runs the function in the thread pool (files, blocking clients)
+
+The pools are created on app startup & shut down on app shutdown,
+until then (or with a pool size of 0) the functions run inline.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from src.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Pool:
+    def __init__(self, name: str, size: int, factory: Callable[[int], Executor]):
+        self.name = name
+        self.size = size
+        self.factory = factory
+        self.executor: Optional[Executor] = None
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "inline": 0,
+            "latency_seconds": 0.0,
+            "max_latency_seconds": 0.0,
+        }
+
+    def start(self) -> None:
+        if self.executor is None and self.size > 0:
+            self.executor = self.factory(self.size)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self.executor is None:
+            return
+        executor, self.executor = self.executor, None
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        if self.executor is None:
+            self.counters["inline"] += 1
+            return fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        self.counters["submitted"] += 1
+        start = time.monotonic()
+        try:
+            result = await loop.run_in_executor(self.executor, call)
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            latency = time.monotonic() - start
+            self.counters["latency_seconds"] += latency
+            self.counters["max_latency_seconds"] = max(
+                self.counters["max_latency_seconds"], latency
+            )
+        self.counters["completed"] += 1
+        return result
+
+    def stats(self) -> dict:
+        c = self.counters
+        return {
+            "workers": self.size if self.executor is not None else 0,
+            # submitted, not yet finished (queued or running)
+            "queue_depth": c["submitted"] - c["completed"] - c["failed"],
+            **c,
+        }
+
+
+PROCESS_POOL = Pool(
+    "process",
+    size=config.process_pool_size,
+    # forking a process with a running event loop & open connections is unsafe
+    factory=lambda size: ProcessPoolExecutor(
+        max_workers=size, mp_context=multiprocessing.get_context("spawn")
+    ),
+)
+THREAD_POOL = Pool(
+    "thread",
+    size=config.thread_pool_size,
+    factory=lambda size: ThreadPoolExecutor(
+        max_workers=size, thread_name_prefix="blocking-io"
+    ),
+)
+metrics.register(
+    "executors", lambda: {p.name: p.stats() for p in (PROCESS_POOL, THREAD_POOL)}
+)
+
+
+def start() -> None:
+    PROCESS_POOL.start()
+    THREAD_POOL.start()
+
+
+def shutdown(wait: bool = True) -> None:
+    PROCESS_POOL.shutdown(wait=wait)
+    THREAD_POOL.shutdown(wait=wait)
+
+
+async def run_in_process(fn: Callable, *args, **kwargs):
+    return await PROCESS_POOL.run(fn, *args, **kwargs)
+
+
+async def run_in_thread(fn: Callable, *args, **kwargs):
+    return await THREAD_POOL.run(fn, *args, **kwargs)
+
+
+def cpu_bound(fn: Callable) -> Callable:
+    """
+    Runs fn in the process pool, fn must be a module level function.
+    """
+    # functions are pickled by reference (module & qualname), the module attribute
+    # becomes the async wrapper, so the original is kept under another name
+    alias = f"_{fn.__name__}_cpu_bound"
+    setattr(sys.modules[fn.__module__], alias, fn)
+    fn.__qualname__ = alias
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_in_process(fn, *args, **kwargs)
+
+    wrapper.__qualname__ = wrapper.__name__
+    return wrapper
+
+
+def blocking_io(fn: Callable) -> Callable:
+    """
+    Runs fn in the thread pool.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_in_thread(fn, *args, **kwargs)
+
+    return wrapper
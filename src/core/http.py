@@ -0,0 +1,190 @@
+"""
+App scoped HTTP client for outbound calls.
+
+One aiohttp.ClientSession per client, created on app startup & closed on app shutdown,
+its connector keeps the connections alive between calls. A client limits the
+calls in flight, calls over the limit are rejected instead of queued, and a circuit
+breaker rejects the calls for reset_timeout seconds after failure_threshold
+consecutive failures (connection errors, timeouts & 5xx responses).
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import aiohttp
+
+from src.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HttpUnavailable(Exception):
+    """
+    The call was not made, the client is not started, busy or its circuit is open.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial:
+            # one trial call, its result closes or re-opens the circuit
+            self.trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        closed = self.opened_at is None and self.failures >= self.failure_threshold
+        if self.trial or closed:
+            self.opened += 1
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "opened": self.opened}
+
+
+class HttpClient:
+    def __init__(
+        self,
+        name: str,
+        max_connections: int = 20,
+        max_concurrency: int = 50,
+        timeout: float = 5,
+        breaker: CircuitBreaker = None,
+    ) -> None:
+        self.name = name
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.in_flight = 0
+        self.counters = {
+            "requests": 0,
+            "failed": 0,
+            "rejected": 0,
+            "latency_seconds": 0.0,
+            "max_latency_seconds": 0.0,
+        }
+
+    async def start(self) -> None:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections, ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def stop(self) -> None:
+        if self.session is not None:
+            session, self.session = self.session, None
+            await session.close()
+
+    def _reject(self, reason: str):
+        self.counters["rejected"] += 1
+        raise HttpUnavailable(f"{self.name}: {reason}")
+
+    async def request(self, method: str, url: str, **kwargs) -> tuple[int, str]:
+        """
+        Makes the call & returns the status & body, raises HttpUnavailable
+        when the call was not made.
+        """
+        if self.session is None:
+            self._reject("not started")
+        if self.in_flight >= self.max_concurrency:
+            self._reject("busy")
+        if not self.breaker.allow():
+            self._reject("circuit open")
+
+        self.in_flight += 1
+        self.counters["requests"] += 1
+        start = time.monotonic()
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                body = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.counters["failed"] += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # no result (cancelled, unexpected error), a later call can be the trial
+            self.breaker.trial = False
+            raise
+        finally:
+            self.in_flight -= 1
+            latency = time.monotonic() - start
+            self.counters["latency_seconds"] += latency
+            self.counters["max_latency_seconds"] = max(
+                self.counters["max_latency_seconds"], latency
+            )
+
+        if response.status >= 500:
+            self.counters["failed"] += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response.status, body
+
+    async def post(self, url: str, json=None) -> tuple[int, str]:
+        return await self.request("POST", url, json=json)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.session is not None,
+            "in_flight": self.in_flight,
+            "breaker": self.breaker.stats(),
+            **self.counters,
+        }
+
+
+# dual writes of /v1/report to the public api
+SHADOW_CLIENT = HttpClient(
+    "shadow",
+    max_connections=config.http_max_connections,
+    max_concurrency=config.http_max_concurrency,
+    timeout=config.http_timeout,
+    breaker=CircuitBreaker(
+        failure_threshold=config.http_breaker_failures,
+        reset_timeout=config.http_breaker_reset,
+    ),
+)
+CLIENTS = [SHADOW_CLIENT]
+metrics.register("http_clients", lambda: {c.name: c.stats() for c in CLIENTS})
+
+
+async def start() -> None:
+    for client in CLIENTS:
+        await client.start()
+
+
+async def stop() -> None:
+    for client in CLIENTS:
+        await client.stop()
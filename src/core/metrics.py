@@ -0,0 +1,34 @@
+"""
+In-process metrics registry.
+
+Components register a collector, a (async) callable returning a dict with their current
+counters & gauges, the `/metrics` route returns a snapshot of all collectors.
+"""
+import inspect
+import logging
+from typing import Awaitable, Callable, Union
+
+logger = logging.getLogger(__name__)
+
+Collector = Callable[[], Union[dict, Awaitable[dict]]]
+
+_collectors: dict[str, Collector] = {}
+
+
+def register(name: str, collector: Collector) -> None:
+    _collectors[name] = collector
+
+
+async def collect() -> dict:
+    snapshot = {}
+    for name, collector in _collectors.items():
+        try:
+            value = collector()
+            if inspect.isawaitable(value):
+                value = await value
+            snapshot[name] = value
+        except Exception as e:
+            logger.error(
+                {"message": "metrics collector failed", "name": name, "error": str(e)}
+            )
+    return snapshot
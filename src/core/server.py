@@ -10,8 +10,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from src import api
-from src.core import config
-from src.kafka.highscore import HighscoreProcessor
+from src.app.repositories.report import REPORT_WRITER
+from src.core import config, executors, http, metrics
+from src.core.tasks import SHADOW_TASKS, TASKS, TasksSaturated
+from src.database.active_reporters import ACTIVE_REPORTERS
+from src.database.audit import API_USAGE_WRITER
+from src.database.database import ENGINES
+from src.kafka.report import REPORT_PROCESSOR, REPORT_PRODUCER
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +66,11 @@ async def favicon():
     return {}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    return await metrics.collect()
+
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
@@ -98,9 +108,49 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     return JSONResponse(content={"detail": error}, status_code=422)
 
 
-# @app.on_event("startup")
-# async def startup_event():
-#     if config.env != "DEV":
-#         logger.info("startup initiated")
-#         highscore_processor = HighscoreProcessor(batch_size=100)
-#         asyncio.ensure_future(highscore_processor.start())
+@app.exception_handler(TasksSaturated)
+async def tasks_saturated_handler(request: Request, exc: TasksSaturated):
+    logger.warning({"url_path": request.url.path, "error": str(exc)})
+    return JSONResponse(
+        content={"detail": "Too many pending requests, retry later."},
+        status_code=503,
+        headers={"Retry-After": "5"},
+    )
+
+
+@app.on_event("startup")
+async def startup():
+    executors.start()
+    await http.start()
+    await API_USAGE_WRITER.start()
+    await REPORT_WRITER.start()
+    await ACTIVE_REPORTERS.start()
+    for engine in ENGINES:
+        await engine.start()
+    if config.report_ingest_mode == "kafka":
+        try:
+            await REPORT_PRODUCER.start()
+        except Exception as e:
+            # /v1/report falls back to writing stgReports directly
+            logger.error({"message": "report producer not started", "error": str(e)})
+        if config.report_consumer_enabled:
+            await REPORT_PROCESSOR.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # the background tasks write through the writers & engines below
+    await asyncio.gather(
+        TASKS.drain(timeout=config.task_drain_timeout),
+        SHADOW_TASKS.drain(timeout=config.task_drain_timeout),
+    )
+    await API_USAGE_WRITER.stop()
+    if config.report_ingest_mode == "kafka":
+        await REPORT_PRODUCER.stop()
+        await REPORT_PROCESSOR.stop()
+    await REPORT_WRITER.stop()
+    await ACTIVE_REPORTERS.stop()
+    for engine in ENGINES:
+        await engine.stop()
+    executors.shutdown()
+    await http.stop()
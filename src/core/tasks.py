@@ -0,0 +1,143 @@
+"""
+Supervisor of the fire-and-forget work of the routes.
+
+    TASKS.submit(fn, *args)      runs fn(*args) in the background, raises
+                                 TasksSaturated (503) when the queue is full
+    TASKS.try_submit(fn, *args)  same, but drops & counts the work instead (best effort)
+
+At most max_concurrency tasks run at once, up to max_queue more wait for a slot.
+The best effort shadow posts have their own SHADOW_TASKS, so a slow shadow
+endpoint cannot fill the slots & queue of TASKS.
+On app shutdown new work is refused & the pending tasks get drain_timeout seconds.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from src.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TasksSaturated(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"{name} tasks saturated")
+        self.name = name
+
+
+class TaskManager:
+    def __init__(self, name: str, max_concurrency: int = 20, max_queue: int = 1000):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self.closed = False
+        self.in_flight = 0
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "cancelled": 0,
+        }
+
+    @property
+    def queued(self) -> int:
+        return len(self._tasks) - self.in_flight
+
+    def saturated(self) -> bool:
+        return self.closed or len(self._tasks) >= self.max_concurrency + self.max_queue
+
+    def submit(self, fn: Callable[..., Awaitable], *args, **kwargs) -> asyncio.Task:
+        if self.saturated():
+            self.counters["rejected"] += 1
+            raise TasksSaturated(self.name)
+        return self._spawn(fn, args, kwargs)
+
+    def try_submit(self, fn: Callable[..., Awaitable], *args, **kwargs) -> bool:
+        if self.saturated():
+            self.counters["dropped"] += 1
+            return False
+        self._spawn(fn, args, kwargs)
+        return True
+
+    def _spawn(self, fn: Callable[..., Awaitable], args, kwargs) -> asyncio.Task:
+        self.counters["submitted"] += 1
+        # a reference is kept until the task is done, the loop only keeps a weak one
+        task = asyncio.create_task(self._run(fn, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, fn: Callable[..., Awaitable], args, kwargs):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                result = await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                self.counters["cancelled"] += 1
+                raise
+            except Exception as e:
+                self.counters["failed"] += 1
+                logger.error(
+                    {
+                        "message": "background task failed",
+                        "tasks": self.name,
+                        "function": getattr(fn, "__qualname__", repr(fn)),
+                        "error": str(e),
+                    }
+                )
+                return None
+            finally:
+                self.in_flight -= 1
+        self.counters["completed"] += 1
+        return result
+
+    async def drain(self, timeout: float = 30) -> None:
+        """
+        Refuses new work & waits for the pending tasks, cancels what is left after timeout.
+        """
+        self.closed = True
+        if not self._tasks:
+            return
+        logger.info(
+            {"message": "draining", "tasks": self.name, "pending": len(self._tasks)}
+        )
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                {
+                    "message": "cancelled on drain",
+                    "tasks": self.name,
+                    "pending": len(pending),
+                }
+            )
+            await asyncio.wait(pending)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            **self.counters,
+        }
+
+
+TASKS = TaskManager(
+    "background",
+    max_concurrency=config.task_max_concurrency,
+    max_queue=config.task_max_queue,
+)
+metrics.register("tasks", TASKS.stats)
+
+SHADOW_TASKS = TaskManager(
+    "shadow",
+    max_concurrency=config.shadow_task_max_concurrency,
+    max_queue=config.shadow_task_max_queue,
+)
+metrics.register("shadow_tasks", SHADOW_TASKS.stats)
@@ -0,0 +1,100 @@
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core import config, metrics
+from src.database.database import PLUGIN_INGEST_ENGINE, Engine
+from src.database.writer import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+SQL_INSERT_ACTIVE_REPORTERS = "INSERT IGNORE INTO activeReporters (name) VALUES (%s)"
+
+
+class ActiveReporters(BackgroundWriter):
+    """
+    Set of the reporters seen since the last flush, a background task writes them
+    with one multi-row INSERT IGNORE every flush_interval seconds.
+    When the set is full new reporters are dropped until the next flush.
+    """
+
+    def __init__(
+        self,
+        engine: Engine = PLUGIN_INGEST_ENGINE,
+        max_size: int = 100_000,
+        flush_interval: float = 10,
+    ) -> None:
+        super().__init__("active_reporters", flush_interval)
+        self.engine = engine
+        self.max_size = max_size
+
+        self.seen: set[str] = set()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def record(self, reporter: str) -> None:
+        if "anonymoususer" in reporter or reporter in self.seen:
+            return
+        if len(self.seen) >= self.max_size:
+            self.dropped += 1
+            return
+        self.seen.add(reporter)
+        self.recorded += 1
+
+    async def flush(self) -> int:
+        """
+        Writes the reporters seen since the last flush, returns the number written.
+        """
+        if not self.seen:
+            return 0
+
+        reporters, self.seen = self.seen, set()
+        start = time.perf_counter()
+        try:
+            async with self.engine.get_session() as session:
+                session: AsyncSession = session
+                async with session.begin():
+                    connection = await session.connection()
+                    await connection.exec_driver_sql(
+                        SQL_INSERT_ACTIVE_REPORTERS, [(r,) for r in sorted(reporters)]
+                    )
+        except Exception as e:
+            self.failed += len(reporters)
+            logger.error(
+                {
+                    "message": "active reporters write failed",
+                    "rows": len(reporters),
+                    "error": str(e),
+                }
+            )
+            return 0
+
+        self.flushes += 1
+        self.written += len(reporters)
+        self.last_flush_seconds = time.perf_counter() - start
+        return len(reporters)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.seen),
+            "max_size": self.max_size,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+
+ACTIVE_REPORTERS = ActiveReporters(
+    max_size=config.active_reporters_size,
+    flush_interval=config.active_reporters_flush_interval,
+)
+metrics.register("active_reporters", ACTIVE_REPORTERS.stats)
@@ -0,0 +1,112 @@
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import insert
+
+from src.core import config, metrics
+from src.database.database import PLAYERDATA_ENGINE, Engine
+from src.database.models import ApiUsage
+from src.database.writer import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+
+class ApiUsageWriter(BackgroundWriter):
+    """
+    Buffers ApiUsage audit rows in a bounded in-memory queue, a background task writes
+    them with one multi-row INSERT every flush_interval seconds or every batch_size rows.
+    When the queue is full new rows are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        engine: Engine = PLAYERDATA_ENGINE,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 5,
+    ) -> None:
+        super().__init__("api_usage", flush_interval)
+        self.engine = engine
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+
+        self.queue: deque[dict] = deque()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def record(self, user_id: int, route: str) -> bool:
+        """
+        Queues an audit row without blocking, returns False if it was dropped.
+        """
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+
+        self.queue.append(
+            {"user_id": user_id, "route": route, "timestamp": datetime.utcnow()}
+        )
+        self.recorded += 1
+
+        if len(self.queue) >= self.batch_size:
+            self.wake()
+        return True
+
+    async def flush(self) -> int:
+        """
+        Writes all queued rows in batches of batch_size, returns the number of rows written.
+        """
+        written = 0
+        while self.queue:
+            size = min(len(self.queue), self.batch_size)
+            batch = [self.queue.popleft() for _ in range(size)]
+            written += await self._write(batch)
+        return written
+
+    async def _write(self, batch: list[dict]) -> int:
+        start = time.perf_counter()
+        sql = insert(ApiUsage).values(batch)
+
+        try:
+            async with self.engine.get_session() as session:
+                session: AsyncSession = session
+                async with session.begin():
+                    await session.execute(sql)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(
+                {"message": "audit write failed", "rows": len(batch), "error": str(e)}
+            )
+            return 0
+
+        self.flushes += 1
+        self.written += len(batch)
+        self.last_flush_seconds = time.perf_counter() - start
+        return len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self.queue),
+            "max_queue": self.max_queue,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+
+API_USAGE_WRITER = ApiUsageWriter(
+    max_queue=config.audit_queue_size,
+    batch_size=config.audit_batch_size,
+    flush_interval=config.audit_flush_interval,
+)
+metrics.register("api_usage_writer", API_USAGE_WRITER.stats)
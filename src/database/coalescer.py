@@ -0,0 +1,190 @@
+"""
+Write coalescer, merges the rows of concurrent requests into multi-row INSERTs.
+
+A batch is written when batch_size rows are pending or flush_interval seconds
+after the previous flush, whichever comes first.
+
+    ack="flushed"   submit returns once the rows are committed, a failed write
+                    raises in every request of the batch
+    ack="queued"    submit returns once the rows are queued, rows still queued
+                    when the process dies are lost & failed writes are only logged,
+                    submit(rows, flushed=True) still waits for the write
+
+Deadlocks & lock timeouts of a write are retried with retry.
+
+Until the writer is started the rows are written inline.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.database import Engine
+from src.database.retry import RetryPolicy
+from src.database.writer import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+ACK_MODES = ("flushed", "queued")
+
+
+class _Pending:
+    __slots__ = ("rows", "future", "queued_at")
+
+    def __init__(self, rows: list[tuple], future: Optional[asyncio.Future]):
+        self.rows = rows
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class CoalescingWriter(BackgroundWriter):
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        engine: Engine,
+        batch_size: int = 1000,
+        flush_interval: float = 0.05,
+        max_queue: int = 50_000,
+        ack: str = "flushed",
+        retry: RetryPolicy = None,
+    ) -> None:
+        if ack not in ACK_MODES:
+            raise ValueError(f"ack {ack} not valid, expected one of {ACK_MODES}")
+
+        super().__init__(name, flush_interval)
+        self.sql = sql
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.ack = ack
+        self.retry = retry or RetryPolicy()
+
+        self.queue: deque[_Pending] = deque()
+        self.queued_rows = 0
+
+        self.counters = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "flushes": 0,
+            "backpressure": 0,
+            "last_flush_rows": 0,
+            "max_flush_rows": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+            "max_queued_seconds": 0.0,
+        }
+
+    async def submit(self, rows: list[tuple], flushed: bool = False) -> None:
+        """
+        Queues rows for the next batch, waits for the write depending on ack,
+        or always with flushed. With a full queue the request waits for the write of its rows.
+        """
+        if not rows:
+            return
+
+        self.counters["submitted"] += len(rows)
+        if not self.running:
+            await self._write([_Pending(rows, None)], inline=True)
+            return
+
+        full = self.queued_rows >= self.max_queue
+        wait = flushed or full or self.ack == "flushed"
+        if full and self.ack == "queued":
+            self.counters["backpressure"] += 1
+
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self.queue.append(_Pending(rows, future))
+        self.queued_rows += len(rows)
+
+        if self.queued_rows >= self.batch_size:
+            self.wake()
+
+        if future is not None:
+            await future
+
+    def _next_batch(self) -> list[_Pending]:
+        # the rows of a request stay in one batch, so one transaction
+        batch, size = [], 0
+        while self.queue and size < self.batch_size:
+            pending = self.queue.popleft()
+            batch.append(pending)
+            size += len(pending.rows)
+        self.queued_rows -= size
+        return batch
+
+    async def flush(self) -> int:
+        """
+        Writes all queued rows, returns the number of rows written.
+        """
+        written = 0
+        while self.queue:
+            written += await self._write(self._next_batch())
+        return written
+
+    async def _execute(self, rows: list[tuple]) -> None:
+        async with self.engine.get_session() as session:
+            session: AsyncSession = session
+            async with session.begin():
+                connection = await session.connection()
+                await connection.exec_driver_sql(self.sql, rows)
+
+    async def _write(self, batch: list[_Pending], inline: bool = False) -> int:
+        start = time.monotonic()
+        rows = [row for pending in batch for row in pending.rows]
+        queued_seconds = start - min(pending.queued_at for pending in batch)
+
+        try:
+            # a rolled back transaction, the whole batch is written again
+            await self.retry.call(f"coalescer.{self.name}", self._execute, rows)
+        except Exception as e:
+            self.counters["failed"] += len(rows)
+            logger.error(
+                {
+                    "message": "coalesced write failed",
+                    "writer": self.name,
+                    "rows": len(rows),
+                    "error": str(e),
+                }
+            )
+            if inline:
+                raise
+            for pending in batch:
+                if pending.future is not None and not pending.future.done():
+                    pending.future.set_exception(e)
+            return 0
+
+        seconds = time.monotonic() - start
+        c = self.counters
+        c["flushes"] += 1
+        c["written"] += len(rows)
+        c["last_flush_rows"] = len(rows)
+        c["max_flush_rows"] = max(c["max_flush_rows"], len(rows))
+        c["last_flush_seconds"] = seconds
+        c["max_flush_seconds"] = max(c["max_flush_seconds"], seconds)
+        c["max_queued_seconds"] = max(c["max_queued_seconds"], queued_seconds)
+
+        for pending in batch:
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_result(None)
+        return len(rows)
+
+    def stats(self) -> dict:
+        c = self.counters
+        oldest = time.monotonic() - self.queue[0].queued_at if self.queue else 0.0
+        return {
+            "ack": self.ack,
+            # backlog
+            "queue_depth": self.queued_rows,
+            "queued_requests": len(self.queue),
+            "oldest_queued_seconds": round(oldest, 4),
+            "max_queue": self.max_queue,
+            "avg_flush_rows": round(c["written"] / c["flushes"], 1)
+            if c["flushes"]
+            else 0,
+            **c,
+        }
@@ -1,10 +1,21 @@
+import time
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from enum import Enum, auto
 
-from src.core import config
+from src.core import config, metrics
+from src.database.replicas import Replica, ReplicaSet, connection_lost
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.elements import TextClause
+
+# monotonic time of the last write of the current request (task),
+# its readonly sessions go to the primary for config.replica_sticky_seconds
+_last_write: ContextVar[float] = ContextVar("last_write", default=None)
 
 
 class EngineType(Enum):
@@ -12,12 +23,85 @@ class EngineType(Enum):
     DISCORD = auto()
 
 
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.counters = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _do_get(self):
+        start = time.monotonic()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        finally:
+            wait = time.monotonic() - start
+            self.counters["checkouts"] += 1
+            self.counters["wait_seconds"] += wait
+            self.counters["max_wait_seconds"] = max(
+                self.counters["max_wait_seconds"], wait
+            )
+
+    def recreate(self):
+        # dispose & invalidation create a new pool, keep the counters
+        pool = super().recreate()
+        pool.counters = self.counters
+        return pool
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            **self.counters,
+        }
+
+
+class PrimarySession(Session):
+    """
+    Session of the primary, flags the sessions that wrote in session.info["wrote"].
+    """
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _flag_write(state: ORMExecuteState):
+    statement = state.statement
+    if isinstance(statement, TextClause):
+        is_select = str(statement).lstrip().lower().startswith("select")
+    else:
+        is_select = statement.is_select
+    if not is_select:
+        state.session.info["wrote"] = True
+
+
 class Engine:
-    def __init__(self, engine_type: EngineType = EngineType.PLAYERDATA):
+    def __init__(
+        self,
+        engine_type: EngineType = EngineType.PLAYERDATA,
+        pool: str = None,
+        read_uris: list[str] = None,
+    ):
         self.type: EngineType = engine_type
+        self.pool = pool or self.__get_default_pool(engine_type)
         self.connection_string = self.__get_connection_string(engine_type)
-        self.engine = self.__get_engine(self.connection_string)
-        self.session = self.__get_session_factory(self.engine)
+        self.engine = self.__get_engine(self.connection_string, self.pool)
+        self.session = self.__get_session_factory(self.engine, PrimarySession)
+        if read_uris is None:
+            read_uris = self.__get_read_uris(engine_type)
+        self.replicas = self.__get_replicas(read_uris, self.pool)
+
+    def __get_default_pool(self, type: EngineType) -> str:
+        return "discord" if type == EngineType.DISCORD else "interactive"
 
     def __get_connection_string(self, type: EngineType) -> str:
         """
@@ -31,29 +115,108 @@ class Engine:
             raise ValueError(f"Engine type {type} not valid.")
         return connection_string
 
-    def __get_engine(self, connection_string) -> AsyncEngine:
+    def __get_read_uris(self, type: EngineType) -> list[str]:
+        return config.sql_read_uris if type == EngineType.PLAYERDATA else []
+
+    def __get_engine(self, connection_string, pool: str) -> AsyncEngine:
+        if pool not in config.db_pools:
+            raise ValueError(f"Pool {pool} not valid.")
+
         engine = create_async_engine(
             connection_string,
-            poolclass=QueuePool,
+            poolclass=MeteredPool,
             pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=90,
-            pool_timeout=30,
             pool_recycle=60,
+            **config.db_pools[pool],
         )
         return engine
 
-    def __get_session_factory(self, engine) -> sessionmaker:
+    def __get_session_factory(
+        self, engine, sync_session_class: type = Session
+    ) -> sessionmaker:
         # self.engine.echo = True
-        session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        session = sessionmaker(
+            engine,
+            class_=AsyncSession,
+            sync_session_class=sync_session_class,
+            expire_on_commit=False,
+        )
         return session
 
+    def __get_replicas(self, read_uris: list[str], pool: str) -> ReplicaSet:
+        replicas = []
+        for uri in read_uris:
+            engine = self.__get_engine(uri, pool)
+            name = f"{pool}:{make_url(uri).host}"
+            replicas.append(Replica(name, engine, self.__get_session_factory(engine)))
+        return ReplicaSet(replicas, check_interval=config.replica_check_interval)
+
+    def __is_sticky(self) -> bool:
+        last_write = _last_write.get()
+        if last_write is None:
+            return False
+        return time.monotonic() - last_write < config.replica_sticky_seconds
+
     @asynccontextmanager
-    async def get_session(self):
-        async with self.session() as session:
-            yield session
+    async def get_session(self, readonly: bool = False):
+        """
+        readonly sessions go to a healthy replica, when there is one
+        & the current request did not just write.
+        """
+        replica = None
+        if readonly and self.replicas and not self.__is_sticky():
+            replica = self.replicas.pick()
+
+        if replica is None:
+            async with self.session() as session:
+                try:
+                    yield session
+                finally:
+                    if session.info.get("wrote"):
+                        _last_write.set(time.monotonic())
+            return
+
+        try:
+            async with replica.session() as session:
+                yield session
+        except (OperationalError, InterfaceError) as e:
+            # lost connection, back in rotation after a passing health check,
+            # a failed statement (deadlock, lock timeout) leaves the replica up
+            if connection_lost(e):
+                self.replicas.mark_down(replica, e)
+            raise
+
+    async def start(self) -> None:
+        await self.replicas.start()
+
+    async def stop(self) -> None:
+        await self.replicas.stop()
+
+    def stats(self) -> dict:
+        return self.engine.pool.stats()
 
 
 """Our Database Engines"""
+# interactive lookups
 PLAYERDATA_ENGINE = Engine(EngineType.PLAYERDATA)
+# /v1/report
+PLUGIN_INGEST_ENGINE = Engine(EngineType.PLAYERDATA, pool="plugin_ingest", read_uris=[])
+# /v1/scraper
+SCRAPER_INGEST_ENGINE = Engine(
+    EngineType.PLAYERDATA, pool="scraper_ingest", read_uris=[]
+)
+# bulk reads & exports for the ML
+ML_ENGINE = Engine(EngineType.PLAYERDATA, pool="ml_read")
 DISCORD_ENGINE = Engine(EngineType.DISCORD)
+
+ENGINES = [
+    PLAYERDATA_ENGINE,
+    PLUGIN_INGEST_ENGINE,
+    SCRAPER_INGEST_ENGINE,
+    ML_ENGINE,
+    DISCORD_ENGINE,
+]
+metrics.register("db_pools", lambda: {e.pool: e.stats() for e in ENGINES})
+metrics.register(
+    "db_replicas", lambda: {e.pool: e.replicas.stats() for e in ENGINES if e.replicas}
+)
@@ -0,0 +1,238 @@
+"""
+Streaming exports of large result sets.
+
+The rows are read with a server side cursor in partitions of chunk_size rows
+& encoded partition by partition, so memory stays flat regardless of the number of rows.
+"""
+import io
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import AsyncIterator, Callable, Optional, Sequence, Union
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Numeric, Text
+from sqlalchemy.engine import Row, RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import Select
+
+from src.database.database import PLAYERDATA_ENGINE, Engine
+
+logger = logging.getLogger(__name__)
+
+
+class ExportFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def stream_partitions(
+    sql: Union[Select, Text],
+    param: dict = None,
+    engine: Engine = PLAYERDATA_ENGINE,
+    chunk_size: int = 1_000,
+    mappings: bool = True,
+) -> AsyncIterator[Sequence[Union[RowMapping, Row]]]:
+    """
+    Yields the rows of sql in partitions of at most chunk_size rows, as mappings or tuples,
+    sql must select columns (not orm entities) e.g. select(*table.__table__.columns).
+    """
+    async with engine.get_session(readonly=True) as session:
+        session: AsyncSession = session
+        async with session.begin():
+            result = await session.stream(
+                sql, param, execution_options={"yield_per": chunk_size}
+            )
+            if mappings:
+                result = result.mappings()
+            async for partition in result.partitions(chunk_size):
+                yield partition
+
+
+async def _ndjson_lines(partitions: AsyncIterator[Sequence[RowMapping]]):
+    rows = 0
+    try:
+        async for partition in partitions:
+            rows += len(partition)
+            yield "".join(
+                json.dumps(dict(row), default=_json_default) + "\n" for row in partition
+            )
+    finally:
+        # a client that disconnected, the session & its streamed result are released now
+        await partitions.aclose()
+    logger.debug({"message": "ndjson export", "rows": rows})
+
+
+def ndjson_response(
+    sql: Union[Select, Text],
+    param: dict = None,
+    engine: Engine = PLAYERDATA_ENGINE,
+    chunk_size: int = 1_000,
+) -> StreamingResponse:
+    """
+    Streams the rows of sql as newline delimited json, one object per line.
+    """
+    partitions = stream_partitions(sql, param, engine=engine, chunk_size=chunk_size)
+    return StreamingResponse(
+        _ndjson_lines(partitions), media_type=MEDIA_TYPES[ExportFormat.ndjson]
+    )
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyarrow is not installed")
+    return pyarrow
+
+
+def _to_float(values: Sequence) -> list:
+    return [None if value is None else float(value) for value in values]
+
+
+def _arrow_schema(pa, sql: Select) -> tuple:
+    """
+    Arrow schema of the selected columns, typed from the sqlalchemy column types,
+    & per column a conversion of the values (None when they are used as is).
+
+    Decimal columns are decimal128 (decimal256) of the column precision & scale,
+    float64 when the column has no precision.
+    """
+    types = {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+        datetime: pa.timestamp("us"),
+        date: pa.date32(),
+    }
+    fields, converters = [], []
+    for column in sql.selected_columns:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = str
+
+        converter: Optional[Callable] = None
+        if python_type is Decimal:
+            precision = getattr(column.type, "precision", None)
+            scale = getattr(column.type, "scale", None) or 0
+            if isinstance(column.type, Numeric) and precision:
+                decimal = pa.decimal128 if precision <= 38 else pa.decimal256
+                arrow_type = decimal(precision, scale)
+            else:
+                arrow_type, converter = pa.float64(), _to_float
+        else:
+            arrow_type = types.get(python_type, pa.string())
+
+        fields.append(pa.field(column.key, arrow_type))
+        converters.append(converter)
+    return pa.schema(fields), converters
+
+
+async def _arrow_chunks(
+    sql: Select, format: ExportFormat, engine: Engine, chunk_size: int
+):
+    pa = _import_pyarrow()
+    schema, converters = _arrow_schema(pa, sql)
+
+    # the writers write sequentially, so the sink is drained after every batch
+    sink = io.BytesIO()
+    if format == ExportFormat.parquet:
+        writer = pa.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    rows = 0
+    partitions = stream_partitions(
+        sql, engine=engine, chunk_size=chunk_size, mappings=False
+    )
+    closed = False
+    try:
+        async for partition in partitions:
+            rows += len(partition)
+            # column wise, straight from the cursor tuples into typed arrays
+            columns = zip(*partition)
+            arrays = [
+                pa.array(convert(values) if convert else values, type=field.type)
+                for values, field, convert in zip(columns, schema, converters)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield drain()
+
+        closed = True
+        writer.close()
+        yield drain()
+    finally:
+        # an error or a client that disconnected, the export is not complete
+        if not closed:
+            try:
+                writer.close()
+            except Exception as e:
+                logger.warning({"message": "closing export writer", "error": str(e)})
+        await partitions.aclose()
+    logger.debug({"message": f"{format.value} export", "rows": rows})
+
+
+def arrow_response(
+    sql: Select,
+    format: ExportFormat = ExportFormat.arrow,
+    engine: Engine = PLAYERDATA_ENGINE,
+    chunk_size: int = 10_000,
+) -> StreamingResponse:
+    """
+    Streams the rows of sql as an arrow ipc stream or a parquet file,
+    one record batch (row group) per partition of chunk_size rows.
+    """
+    # fail before the response starts if pyarrow is missing
+    _import_pyarrow()
+    return StreamingResponse(
+        _arrow_chunks(sql, format, engine, chunk_size),
+        media_type=MEDIA_TYPES[format],
+    )
+
+
+def export_response(
+    sql: Union[Select, Text],
+    format: ExportFormat,
+    param: dict = None,
+    engine: Engine = PLAYERDATA_ENGINE,
+) -> StreamingResponse:
+    """
+    Streams the rows of sql in a non json format.
+    """
+    if format == ExportFormat.ndjson:
+        return ndjson_response(sql, param, engine=engine)
+
+    if not isinstance(sql, Select):
+        raise HTTPException(
+            status_code=422, detail=f"format={format.value} is not supported here"
+        )
+    return arrow_response(sql, format, engine=engine)
@@ -1,27 +1,46 @@
 import asyncio
+import functools
 import logging
-import random
+import operator
 import re
+import sys
 import traceback
 from asyncio.tasks import create_task
 from collections import namedtuple
 from datetime import datetime, timedelta
-from typing import List
+from typing import Callable, List, Optional
 
 from fastapi import HTTPException
 from sqlalchemy import Text, text
 from sqlalchemy.exc import InternalError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
-from sqlalchemy.sql.expression import insert, select
+from sqlalchemy.sql.expression import Select, insert, select
+
+from src.core import config, metrics
+from src.database.audit import API_USAGE_WRITER
 
 # Although never directly used, the engines are imported to add a permanent reference
 # to these entities to prevent the
 # garbage collector from trying to dispose of our engines.
+from src.database import statements
 from src.database.database import PLAYERDATA_ENGINE, Engine, EngineType
-from src.database.models import ApiPermission, ApiUsage, ApiUser, ApiUserPerm
+from src.database.retry import RetryPolicy
+from src.utils.cache import MISSING, LRUCache
+from src.utils.ratelimit import BACKENDS, RateLimiter
 
 logger = logging.getLogger(__name__)
 
+# deadlocks & lock timeouts in execute_sql
+EXECUTE_SQL_RETRY = RetryPolicy(max_attempts=5, max_delay=5, deadline=30)
+# repositories only retry OperationalError
+HANDLE_DATABASE_ERROR_RETRY = RetryPolicy(
+    max_attempts=5, max_delay=2, deadline=30, retry_on=(OperationalError,)
+)
+
+
+# TextClause of a raw sql string, parsed once per distinct string
+_text = functools.lru_cache(maxsize=1024)(text)
+
 
 def list_to_string(l):
     string_list = ", ".join(str(item) for item in l)
@@ -41,10 +60,16 @@ async def jagexify_names_list(names: List[str]) -> List[str]:
 
 
 async def parse_sql(
-    sql, param: dict, has_return: bool, row_count: int, page: int
+    sql,
+    param: dict,
+    has_return: bool,
+    row_count: int,
+    page: int,
+    keyset: str = None,
+    after=None,
 ) -> tuple[Text, bool]:
     if isinstance(sql, Text):
-        return sql
+        return sql, has_return
     elif isinstance(sql, str):
         has_return = True if sql.strip().lower().startswith("select") else False
 
@@ -52,16 +77,28 @@ async def parse_sql(
             # add pagination to every query
             # max number of rows = 100k
             row_count = row_count if row_count <= 100_000 else 100_000
-            page = page if page >= 1 else 1
-            offset = (page - 1) * row_count
-            # add limit to sql
-            sql = f"{sql} limit :offset, :row_count;"
-            # add the param
-            param["offset"] = offset
+
+            if keyset is not None:
+                # seek past the last key of the previous page, on the rows of the
+                # query as a derived table, so a where of a subquery or cte is not extended,
+                # mysql merges the derived table, the index of the key is still used
+                if after is not None:
+                    keyset = keyset.rsplit(".", 1)[-1]
+                    sql = f"select * from ({sql}) as keyset_page"
+                    sql = f"{sql} where {keyset} > :keyset_after"
+                    param["keyset_after"] = after
+                sql = f"{sql} order by {keyset} limit :row_count;"
+            else:
+                page = page if page >= 1 else 1
+                offset = (page - 1) * row_count
+                # add limit to sql
+                sql = f"{sql} limit :offset, :row_count;"
+                # add the param
+                param["offset"] = offset
             param["row_count"] = row_count
 
-        # parsing
-        sql: Text = text(sql)
+        # parsing, the same sql strings come back on every request
+        sql: Text = _text(sql)
     return sql, has_return
 
 
@@ -73,52 +110,77 @@ async def execute_sql(
     row_count: int = 100_000,
     page: int = 1,
     has_return: bool = None,
-    retry_attempt: int = 0,
+    site: str = None,
+    keyset: str = None,
+    after=None,
+    readonly: bool = False,
 ):
-    # retry breakout
-    if retry_attempt >= 5:
-        logger.debug({"message": "Too many retries"})
-        return None
+    """
+    Executes a raw sql string, select statements are paginated, by page (limit, offset)
+    or when keyset (a column) is given, by the rows with keyset > after (see src.database.pagination).
+    readonly queries may be routed to a read replica.
+    """
+    # retries are reported per calling function
+    if site is None:
+        caller = sys._getframe(1)
+        site = f"{caller.f_globals.get('__name__')}.{caller.f_code.co_name}"
 
-    sleep = retry_attempt * 5
-    sql, has_return = await parse_sql(sql, param, has_return, row_count, page)
+    sql, has_return = await parse_sql(
+        sql, param, has_return, row_count, page, keyset=keyset, after=after
+    )
 
-    try:
-        async with engine.get_session() as session:
+    async def _execute():
+        async with engine.get_session(readonly=readonly) as session:
             session: AsyncSession = session
             async with session.begin():
                 rows = await session.execute(sql, param)
-                records = sql_cursor(rows) if has_return else None
+                return sql_cursor(rows) if has_return else None
+
+    try:
+        records = await EXECUTE_SQL_RETRY.call(site, _execute)
     # OperationalError = Deadlock, InternalError = lock timeout
+    except (InternalError, OperationalError) as e:
+        e = e if debug else ""
+        logger.debug({"message": f"Too many retries: {e}", "site": site})
+        return None
     except Exception as e:
-        if isinstance(e, InternalError):
-            e = e if debug else ""
-            logger.debug(
-                {"message": f"Lock, Retry Attempt: {retry_attempt}, retrying: {e}"}
-            )
-        elif isinstance(e, OperationalError):
-            e = e if debug else ""
-            logger.debug(
-                {"message": f"Deadlock, Retry Attempt: {retry_attempt}, retrying {e}"}
-            )
-        else:
-            err = {"message": "Unknown Error", "error": e}
-            logger.error(f"{err}\n{traceback.format_exc()}")
-            return None
-        await asyncio.sleep(random.uniform(0.1, sleep))
-        records = await execute_sql(
-            sql,
-            param,
-            debug,
-            engine,
-            row_count,
-            page,
-            has_return=has_return,
-            retry_attempt=retry_attempt + 1,
-        )
+        err = {"message": "Unknown Error", "error": e}
+        logger.error(f"{err}\n{traceback.format_exc()}")
+        return None
     return records
 
 
+@functools.lru_cache(maxsize=256)
+def _record_class(fields: tuple[str, ...]) -> type:
+    # building a namedtuple class is slow, reuse it for the same columns
+    return namedtuple("Record", fields)
+
+
+@functools.lru_cache(maxsize=None)
+def _orm_converter(cls) -> tuple[tuple[str, ...], Callable]:
+    """
+    The column names of an orm class & a precompiled getter
+    returning the values of those columns as a tuple, built once per class.
+    """
+    names = tuple(col.name for col in cls.__table__.columns)
+    getter = operator.attrgetter(*names)
+    if len(names) == 1:
+        return names, lambda row: (getter(row),)
+    return names, getter
+
+
+def core_select(*entities) -> Select:
+    """
+    Selects the table columns of orm classes (& plain columns) instead of orm objects,
+    the rows can be read with core_result without building orm objects.
+    """
+    columns = []
+    for entity in entities:
+        table = getattr(entity, "__table__", None)
+        columns.extend(table.columns if table is not None else [entity])
+    return select(*columns)
+
+
 class sql_cursor:
     def __init__(self, rows):
         self.rows: AsyncResult = rows
@@ -127,8 +189,26 @@ class sql_cursor:
         return self.rows.mappings().all()
 
     def rows2tuple(self):
-        Record = namedtuple("Record", self.rows.keys())
-        return [Record(*r) for r in self.rows.fetchall()]
+        Record = _record_class(tuple(self.rows.keys()))
+        return [Record._make(r) for r in self.rows.fetchall()]
+
+
+class core_result:
+    """
+    Rows of a core select (see core_select), the values are read from the row tuples directly.
+    """
+
+    def __init__(self, rows):
+        self.keys = tuple(rows.keys())
+        self.rows = rows.all()
+
+    def rows2dict(self):
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in self.rows]
+
+    def rows2tuple(self):
+        Record = _record_class(self.keys)
+        return [Record._make(row) for row in self.rows]
 
 
 class sqlalchemy_result:
@@ -136,64 +216,109 @@ class sqlalchemy_result:
         self.rows = [row[0] for row in rows]
 
     def rows2dict(self):
-        return [
-            {col.name: getattr(row, col.name) for col in row.__table__.columns}
-            for row in self.rows
-        ]
+        if not self.rows:
+            return []
+        names, getter = _orm_converter(type(self.rows[0]))
+        return [dict(zip(names, getter(row))) for row in self.rows]
 
     def rows2tuple(self):
-        columns = [col.name for col in self.rows[0].__table__.columns]
-        Record = namedtuple("Record", columns)
-        return [
-            Record(*[getattr(row, col.name) for col in row.__table__.columns])
-            for row in self.rows
-        ]
+        if not self.rows:
+            return []
+        names, getter = _orm_converter(type(self.rows[0]))
+        Record = _record_class(names)
+        return [Record._make(getter(row)) for row in self.rows]
+
+
+# the api users & their permissions are managed in the database, outside of the api,
+# a deactivated token or a removed permission is honored after token_cache_ttl seconds
+# unless invalidate_token_cache is called
+TOKEN_CACHE = LRUCache(maxsize=config.token_cache_size, ttl=config.token_cache_ttl)
+metrics.register("token_cache", TOKEN_CACHE.stats)
+# tokens without permissions, apart so a flood of random tokens cannot evict TOKEN_CACHE
+UNKNOWN_TOKEN_CACHE = LRUCache(
+    maxsize=config.unknown_token_cache_size, ttl=config.unknown_token_cache_ttl
+)
+metrics.register("unknown_token_cache", UNKNOWN_TOKEN_CACHE.stats)
+
+RATE_LIMITER = RateLimiter(
+    window=config.ratelimit_window,
+    backend=BACKENDS[config.ratelimit_backend](),
+)
+metrics.register("rate_limiter", RATE_LIMITER.stats)
+
+
+def invalidate_token_cache(token: str = None, user_id: int = None) -> int:
+    """
+    Drops cached permissions of a token, of an api user, or all when no filter is given.
+    Must be called after an ApiUser is created, deactivated or its permissions change,
+    other processes pick up the change when their entries expire (token_cache_ttl).
+    """
 
+    def match(key: tuple, api_user: Optional[dict]) -> bool:
+        if token is not None and key[0] != token:
+            return False
+        if user_id is not None and (api_user is None or api_user["id"] != user_id):
+            return False
+        return True
 
-async def verify_token(token: str, verification: str, route: str = None) -> bool:
-    sql = select(ApiUser)
-    sql = sql.where(ApiUser.token == token)
-    sql = sql.where(ApiPermission.permission == verification)
-    sql = sql.join(ApiUserPerm, ApiUser.id == ApiUserPerm.user_id)
-    sql = sql.join(ApiPermission, ApiUserPerm.permission_id == ApiPermission.id)
-
-    sql_usage = select(ApiUsage)
-    sql_usage = sql_usage.where(ApiUser.id == ApiUsage.user_id)
-    sql_usage = sql_usage.where(ApiUser.token == token)
-    sql_usage = sql_usage.where(
-        ApiUsage.timestamp >= datetime.utcnow() - timedelta(hours=1)
-    )
+    removed = TOKEN_CACHE.invalidate(match) + UNKNOWN_TOKEN_CACHE.invalidate(match)
+    logger.debug({"message": "token cache invalidated", "removed": removed})
+    return removed
 
-    async with PLAYERDATA_ENGINE.get_session() as session:
-        session: AsyncSession = session
-        async with session.begin():
-            api_user = await session.execute(sql)
-            usage_data = await session.execute(sql_usage)
 
-            api_user = sqlalchemy_result(api_user)
-            usage_data = sqlalchemy_result(usage_data)
+async def _seed_rate_limiter(session: AsyncSession, user_id: int) -> None:
+    """
+    The first time this process sees a user, its limiter starts from the usage
+    recorded in the database instead of zero.
+    """
+    if await RATE_LIMITER.known(user_id):
+        return
 
-            api_user = api_user.rows2dict()
-            usage_data = usage_data.rows2dict()
+    since = datetime.utcnow() - timedelta(seconds=RATE_LIMITER.window)
+    usage_count = await session.scalar(
+        statements.API_USAGE_COUNT.sql, {"user_id": user_id, "since": since}
+    )
+    await RATE_LIMITER.seed(user_id, usage_count)
 
-            # Checks to see if there is a user ID
-            if not len(api_user) == 0:
-                insert_values = {}
-                insert_values["route"] = route
-                insert_values["user_id"] = api_user[0]["id"]
-                insert_usage = insert(ApiUsage).values(insert_values)
-                await session.execute(insert_usage)
 
-    # If len api_user == 0; user does not have necessary permissions
-    if len(api_user) == 0:
-        raise HTTPException(status_code=401, detail=f"Insufficent Permissions")
+async def verify_token(token: str, verification: str, route: str = None) -> bool:
+    cache_key = (token, verification)
+    # unknown tokens are cached as None
+    api_user = TOKEN_CACHE.get(cache_key, default=MISSING)
+    if api_user is MISSING:
+        api_user = UNKNOWN_TOKEN_CACHE.get(cache_key, default=MISSING)
+
+    if api_user is MISSING:
+        async with PLAYERDATA_ENGINE.get_session() as session:
+            session: AsyncSession = session
+            async with session.begin():
+                data = await session.execute(
+                    statements.VERIFY_TOKEN.sql,
+                    {"token": token, "verification": verification},
+                )
+                data = sqlalchemy_result(data).rows2dict()
+                api_user = data[0] if data else None
+
+                if api_user is not None:
+                    await _seed_rate_limiter(session, api_user["id"])
+
+        if api_user is None:
+            UNKNOWN_TOKEN_CACHE.set(cache_key, None)
+        else:
+            TOKEN_CACHE.set(cache_key, api_user)
 
-    api_user = api_user[0]
+    # Checks to see if there is a user ID, usage is written in the background
+    if api_user is not None:
+        API_USAGE_WRITER.record(user_id=api_user["id"], route=route)
+
+    # If api_user is None; user does not have necessary permissions
+    if api_user is None:
+        raise HTTPException(status_code=401, detail=f"Insufficent Permissions")
 
     if api_user["is_active"] != 1:
         raise HTTPException(status_code=403, detail=f"Insufficent Permissions")
 
-    if (len(usage_data) > api_user["ratelimit"]) and (api_user["ratelimit"] != -1):
+    if not await RATE_LIMITER.hit(api_user["id"], limit=api_user["ratelimit"]):
         raise HTTPException(status_code=429, detail=f"Your Ratelimit has been reached.")
 
     return True
@@ -215,17 +340,14 @@ async def batch_function(function, data, batch_size=100):
 
 
 def handle_database_error(func):
+    site = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         try:
-            return await func(*args, **kwargs)
+            return await HANDLE_DATABASE_ERROR_RETRY.call(site, func, *args, **kwargs)
         except OperationalError as e:
-            # Handle the OperationalError here (you can log the error, retry, etc.)
-            # {traceback.format_exc()}
             logger.error(f"Caught OperationalError:\n{e}\n{traceback.format_exc()}")
-            # Add a random sleep time between 100ms to 1000ms (adjust as needed).
-            sleep_time_ms = random.randint(100, 2000)
-            await asyncio.sleep(sleep_time_ms / 1000)
-            # Retry the operation by calling the wrapper again (could be recursive).
-            return await wrapper(*args, **kwargs)
+            raise
 
     return wrapper
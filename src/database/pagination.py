@@ -0,0 +1,69 @@
+"""
+Keyset (seek) pagination.
+
+Instead of skipping `offset` rows, every page continues after the last key of the
+previous page, so every page costs the same index range scan regardless of its depth.
+The position is handed to the client as an opaque cursor in the X-Next-Cursor header,
+an empty cursor starts at the first page, a missing header means there are no more pages.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy.sql.expression import ColumnElement, Select
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Any) -> str:
+    data = json.dumps(value).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """
+    Returns the key encoded in the cursor, None for an empty cursor (first page),
+    the key is an int or a str, anything else is not a cursor of ours.
+    """
+    if not cursor:
+        return None
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    # a list or object would end up as a bind parameter of the keyset condition
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    return value
+
+
+def keyset_paginate(
+    sql: Select, column: ColumnElement, cursor: str, row_count: int
+) -> Select:
+    """
+    Orders sql by column & returns the page of row_count rows after the cursor.
+    """
+    after = decode_cursor(cursor)
+    if after is not None:
+        sql = sql.where(column > after)
+    return sql.order_by(column).limit(row_count)
+
+
+def next_cursor(rows: Sequence, key: str, row_count: int) -> Optional[str]:
+    """
+    Returns the cursor of the page after rows, None if rows is the last page.
+    """
+    if len(rows) < row_count:
+        return None
+    return encode_cursor(rows[-1][key])
+
+
+def set_next_cursor(
+    response: Response, rows: Sequence, key: str, row_count: int
+) -> None:
+    cursor = next_cursor(rows, key, row_count)
+    if cursor is not None:
+        response.headers[CURSOR_HEADER] = cursor
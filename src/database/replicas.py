@@ -0,0 +1,134 @@
+"""
+Read replicas of an Engine.
+
+Reads are spread round-robin over the healthy replicas. A replica that fails
+a health check or a connection is taken out of rotation until it passes a
+check again. With no healthy replica, reads go to the primary.
+"""
+import asyncio
+import itertools
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# mysql client errors of a lost server, can't connect, gone away, lost during query
+CONNECTION_LOST_ERRNOS = (2003, 2006, 2013)
+
+
+def connection_lost(error: Exception) -> bool:
+    """
+    True when error means the server cannot be reached, not that a statement failed
+    (deadlock, lock timeout, syntax), the only errors that take a replica out of rotation.
+    """
+    if getattr(error, "connection_invalidated", False):
+        return True
+    args = getattr(getattr(error, "orig", None), "args", ())
+    return bool(args) and args[0] in CONNECTION_LOST_ERRNOS
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine, session: sessionmaker):
+        self.name = name
+        self.engine = engine
+        self.session = session
+        self.healthy = True
+        self.failures = 0
+        self.sessions = 0
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        replicas: list[Replica],
+        check_interval: float = 10,
+    ):
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self._next = itertools.cycle(range(len(replicas)))
+        self._task: Optional[asyncio.Task] = None
+        self.fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        """
+        The next healthy replica, None when all replicas are down.
+        """
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next)]
+            if replica.healthy:
+                replica.sessions += 1
+                return replica
+        self.fallbacks += 1
+        return None
+
+    def mark_down(self, replica: Replica, error: Exception = None) -> None:
+        if replica.healthy:
+            logger.warning(
+                {
+                    "message": "replica out of rotation",
+                    "replica": replica.name,
+                    "error": str(error),
+                }
+            )
+        replica.healthy = False
+        replica.failures += 1
+
+    async def check(self) -> None:
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+            except (DBAPIError, OSError) as e:
+                self.mark_down(replica, e)
+                continue
+
+            if not replica.healthy:
+                logger.info(
+                    {"message": "replica back in rotation", "replica": replica.name}
+                )
+            replica.healthy = True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(
+                    {"message": "replica health check failed", "error": str(e)}
+                )
+
+    async def start(self) -> None:
+        if self._task is None and self.replicas:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": {
+                r.name: {
+                    "healthy": r.healthy,
+                    "failures": r.failures,
+                    "sessions": r.sessions,
+                }
+                for r in self.replicas
+            },
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import InternalError, OperationalError
+
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# call site -> retry counters, shared by all policies
+RETRY_STATS: dict[str, dict] = {}
+metrics.register("retries", lambda: RETRY_STATS)
+
+
+class RetryPolicy:
+    """
+    Retries a coroutine on transient database errors,
+    OperationalError = Deadlock, InternalError = lock timeout.
+
+    The delay grows exponentially with decorrelated jitter,
+    sleep = min(max_delay, uniform(base_delay, previous_sleep * 3)),
+    retrying stops after max_attempts or when the next attempt would start after deadline seconds.
+
+    Parameters
+    ----------
+    max_attempts : int
+        The maximum number of attempts, including the first one.
+
+    base_delay : float
+        The minimum delay between two attempts in seconds.
+
+    max_delay : float
+        The maximum delay between two attempts in seconds.
+
+    deadline : float
+        The maximum time in seconds spent on one call, including the retries.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.1,
+        max_delay: float = 5,
+        deadline: float = 30,
+        retry_on: tuple[type[Exception], ...] = (OperationalError, InternalError),
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retry_on = retry_on
+        self.sleep = sleep
+        self.timer = timer
+
+    def next_delay(self, previous: float) -> float:
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+    async def call(
+        self, site: str, fn: Callable[..., Awaitable[T]], *args, **kwargs
+    ) -> T:
+        """
+        Awaits fn(*args, **kwargs), retrying it according to this policy,
+        the retries are reported under site, the last error is raised when retrying stops.
+        """
+        stats = RETRY_STATS.setdefault(
+            site,
+            {"calls": 0, "retries": 0, "exhausted": 0, "retry_seconds": 0.0},
+        )
+        stats["calls"] += 1
+
+        start = self.timer()
+        delay = self.base_delay
+        attempt = 1
+        while True:
+            try:
+                result = await fn(*args, **kwargs)
+            except self.retry_on as e:
+                delay = self.next_delay(delay)
+                elapsed = self.timer() - start
+
+                if attempt >= self.max_attempts or elapsed + delay > self.deadline:
+                    stats["exhausted"] += 1
+                    stats["retry_seconds"] += elapsed
+                    logger.warning(
+                        {
+                            "message": "Too many retries",
+                            "site": site,
+                            "attempt": attempt,
+                            "error": type(e).__name__,
+                        }
+                    )
+                    raise
+
+                stats["retries"] += 1
+                logger.debug(
+                    {
+                        "message": f"{type(e).__name__}, Retry Attempt: {attempt}, retrying",
+                        "site": site,
+                        "sleep": round(delay, 3),
+                    }
+                )
+                await self.sleep(delay)
+                attempt += 1
+                continue
+
+            if attempt > 1:
+                stats["retry_seconds"] += self.timer() - start
+            return result
@@ -0,0 +1,133 @@
+"""
+Statements of the hot paths, built once on import instead of on every request.
+
+The values of a statement are bind parameters, given on execution:
+
+    await session.execute(REPORT_COUNT.sql, {"name": name, "manual_detect": 0})
+
+SQLAlchemy memoizes the cache key on the statement object, so a prebuilt statement
+skips the construction & the cache key generation, and its compiled form
+comes from the compiled cache of the engine.
+
+Build & first compile time of each statement are measured on registration,
+exported as sql_statements.
+"""
+import logging
+import time
+from typing import Callable
+
+from sqlalchemy import bindparam
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import Executable, insert, select
+
+from src.core import metrics
+from src.database.models import (
+    ApiPermission,
+    ApiUsage,
+    ApiUser,
+    ApiUserPerm,
+    Player,
+    Report,
+)
+
+logger = logging.getLogger(__name__)
+
+DIALECT = mysql.dialect()
+
+
+class Statement:
+    def __init__(self, name: str, build: Callable[[], Executable]):
+        self.name = name
+
+        start = time.perf_counter()
+        self.sql = build()
+        self.build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.sql.compile(dialect=DIALECT)
+        self.compile_seconds = time.perf_counter() - start
+
+    def stats(self) -> dict:
+        return {
+            "build_seconds": round(self.build_seconds, 6),
+            "compile_seconds": round(self.compile_seconds, 6),
+        }
+
+
+STATEMENTS: dict[str, Statement] = {}
+metrics.register(
+    "sql_statements", lambda: {name: s.stats() for name, s in STATEMENTS.items()}
+)
+
+
+def register(name: str, build: Callable[[], Executable]) -> Statement:
+    if name in STATEMENTS:
+        raise ValueError(f"Statement {name} already registered.")
+    statement = Statement(name, build)
+    STATEMENTS[name] = statement
+    return statement
+
+
+def _verify_token():
+    sql = select(ApiUser)
+    sql = sql.where(ApiUser.token == bindparam("token"))
+    sql = sql.where(ApiPermission.permission == bindparam("verification"))
+    sql = sql.join(ApiUserPerm, ApiUser.id == ApiUserPerm.user_id)
+    sql = sql.join(ApiPermission, ApiUserPerm.permission_id == ApiPermission.id)
+    return sql
+
+
+def _api_usage_count():
+    sql = select(func.count(ApiUsage.id))
+    sql = sql.where(ApiUsage.user_id == bindparam("user_id"))
+    sql = sql.where(ApiUsage.timestamp >= bindparam("since"))
+    return sql
+
+
+def _report_count():
+    voter: Player = aliased(Player, name="voter")
+    subject: Player = aliased(Player, name="subject")
+
+    sub_query = select(Report.reportedID.distinct().label("reportedID"))
+    sub_query = sub_query.join(voter, Report.reportingID == voter.id)
+    sub_query = sub_query.where(voter.name == bindparam("name"))
+    sub_query = sub_query.where(Report.manual_detect == bindparam("manual_detect"))
+    sub_query_alias = sub_query.alias("DistinctReports")
+
+    sql = select(
+        func.count(subject.id),
+        subject.confirmed_ban,
+        subject.possible_ban,
+        subject.confirmed_player,
+    )
+    sql = sql.select_from(sub_query_alias)
+    sql = sql.join(subject, sub_query_alias.c.reportedID == subject.id)
+    sql = sql.group_by(
+        subject.confirmed_ban, subject.possible_ban, subject.confirmed_player
+    )
+    return sql
+
+
+def _player_ids():
+    sql = select(Player.name, Player.id)
+    return sql.where(Player.name.in_(bindparam("names", expanding=True)))
+
+
+# token & permission of verify_token
+VERIFY_TOKEN = register("verify_token", _verify_token)
+# usage of an api user since a timestamp, seeds the rate limiter
+API_USAGE_COUNT = register("api_usage_count", _api_usage_count)
+# reported players by ban status, of a reporter name & manual_detect
+REPORT_COUNT = register("report_count", _report_count)
+# ids of players by normalized name
+PLAYER_IDS = register("player_ids", _player_ids)
+# LOCK IN SHARE MODE, reads the latest committed rows of the inserted names
+PLAYER_IDS_SHARE_LOCK = register(
+    "player_ids_share_lock", lambda: _player_ids().with_for_update(read=True)
+)
+# executed with a list of {"name", "normalized_name"}
+INSERT_PLAYERS = register(
+    "insert_players", lambda: insert(Player).prefix_with("ignore")
+)
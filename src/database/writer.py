@@ -0,0 +1,73 @@
+"""
+Base of the background writers (audit, coalescer, active_reporters).
+
+A background task calls flush every flush_interval seconds, or as soon as
+wake is called. stop does not cancel the task, a write that is in progress
+finishes, then whatever is left is flushed before the process exits.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter(ABC):
+    def __init__(self, name: str, flush_interval: float) -> None:
+        self.name = name
+        self.flush_interval = flush_interval
+
+        self._batch_ready = asyncio.Event()
+        self._task: asyncio.Task = None
+        self._stopping = False
+
+    @abstractmethod
+    async def flush(self) -> int:
+        """
+        Writes what is pending, returns the number of rows written.
+        """
+        pass
+
+    def wake(self) -> None:
+        """
+        Flushes now instead of after flush_interval.
+        """
+        self._batch_ready.set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is None:
+            logger.info({"message": "starting", "writer": self.name})
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        logger.info({"message": "stopping", "writer": self.name})
+        if self._task is not None:
+            # not cancelled, a batch that is being written is not lost
+            self._stopping = True
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+        # write whatever is left before the process exits
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(
+                    {"message": "flush failed", "writer": self.name, "error": str(e)}
+                )
@@ -1,93 +1,88 @@
-import json
 import logging
+from typing import Optional
 
-from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition
+from pydantic import BaseModel, TypeAdapter, ValidationError, field_validator
 
 from src.app.repositories.highscore import PlayerHiscoreData as RepoHiscore
 from src.app.repositories.player import Player as RepositoryPlayer
 from src.app.schemas.highscore import PlayerHiscoreData as SchemaHiscore
 from src.app.schemas.player import Player as SchemaPlayer
-from src.database.models import playerHiscoreData as dbHiscore
-from src.kafka.modules.kafka_consumer import KafkaMessageConsumer
-from src.kafka.modules.kafka_producer import KafkaMessageProducer
-from asyncio import Queue
-import asyncio
-import time
 from src.core import config
+from src.database.models import playerHiscoreData as dbHiscore
+from src.kafka.modules.processor import BatchProcessor
 
 logger = logging.getLogger(__name__)
 
 
-class HighscoreProcessor:
-    def __init__(self, batch_size: int = 100) -> None:
-        self.repo_highscore = RepoHiscore()
-        self.repo_player = RepositoryPlayer()
-        self.message_queue = Queue(maxsize=batch_size * 2)
-        self.batch = []
+class ScraperMessage(BaseModel):
+    player: SchemaPlayer
+    hiscores: Optional[SchemaHiscore] = None
 
-        self.batch_size = batch_size
+    @field_validator("hiscores", mode="before")
+    @classmethod
+    def no_hiscores(cls, value):
+        # players without highscores come as {}
+        return value or None
 
-    async def initialize(self):
-        self.message_consumer = KafkaMessageConsumer(
-            bootstrap_servers=config.kafka_url,
-            consumer_topic="scraper",
-            group_id="highscore-api",
-            message_queue=self.message_queue,
-        )
 
-    async def start(self):
-        logger.info("starting")
-        while True:
-            await self.initialize()
-            try:
-                await asyncio.gather(
-                    self.message_consumer.consume_messages_continuously(),
-                    self.process_messages(),
-                )
-            except Exception as error:
-                logger.error(f"Error occured: {str(error)}")
-            finally:
-                await self.message_consumer.stop()
-            await asyncio.sleep(5)
+# validate_python, with pydantic 2.1 it is faster than validate_json of the bytes
+SCRAPER_MESSAGE = TypeAdapter(ScraperMessage)
+SCRAPER_MESSAGES = TypeAdapter(list[ScraperMessage])
 
-    async def process_messages(self):
-        logger.info("start processing messages")
-        last_send = int(time.time())
-        while True:
-            message: dict = await self.message_queue.get()
 
-            self.batch.append(message)
+class HighscoreProcessor(BatchProcessor):
+    """
+    Consumes the scraper topic, inserts the new highscores & updates the players.
+    Runs in the ingest worker (src.kafka.worker), not in the api process.
 
-            delta_send_time = int(time.time()) - last_send
-            delta_send_time = delta_send_time if delta_send_time != 0 else 1
+    Batches of different partitions are written by up to parallelism writers,
+    batches with the same Player_id one after another.
+    The messages of a batch are validated at once (decode).
+    """
 
-            qsize = self.message_queue.qsize()
+    def __init__(
+        self, batch_size: int = 100, flush_interval: float = 60, parallelism: int = 1
+    ) -> None:
+        super().__init__(
+            topic=config.highscore_topic,
+            group_id=config.highscore_consumer_group,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            liveness_timeout=config.worker_liveness_timeout,
+            parallelism=parallelism,
+        )
+        self.repo_highscore = RepoHiscore()
+        self.repo_player = RepositoryPlayer()
 
-            if len(self.batch) > self.batch_size or (
-                delta_send_time > 60 and self.batch and qsize == 0
-            ):
-                last_send = int(time.time())
-                await self.process_batch()
+    def decode(self, batch: list[dict]) -> list[ScraperMessage]:
+        try:
+            return SCRAPER_MESSAGES.validate_python(batch)
+        except ValidationError:
+            pass
 
-                logger.info(f"{qsize=} - {len(self.batch)/delta_send_time:.2f} it/s")
-                self.batch = []
+        # one message is not valid, find it
+        messages = []
+        for value in batch:
+            try:
+                messages.append(SCRAPER_MESSAGE.validate_python(value))
+            except ValidationError as e:
+                # committed with the batch, a replay would fail the same way
+                self.invalid += 1
+                logger.warning({"message": "invalid message", "error": str(e)})
+        return messages
 
-            self.message_queue.task_done()
+    def keys(self, batch: list[ScraperMessage]) -> set:
+        return {message.player.id for message in batch}
 
-    async def process_batch(self):
+    async def process_batch(self, batch: list[ScraperMessage]) -> int:
         # Lists to store processed highscores and players
         highscores: list[SchemaHiscore] = []
         players: list[SchemaPlayer] = []
 
-        # Process each row of data containing 'hiscores' and 'player' information
-        for row in self.batch:
-            row: dict
-            # Extract 'hiscores' and 'player' dictionaries from the row
-            highscore = row.get("hiscores")
-            player = row.get("player")
-
-            # Create a SchemaPlayer object from the 'player' dictionary
-            player = SchemaPlayer(**player)
+        # Process each message containing 'hiscores' and 'player' information
+        for message in batch:
+            player = message.player
+            highscore = message.hiscores
 
             # Skip processing if the player's name is longer than 13 characters
             if len(player.name) > 13:
@@ -96,14 +91,12 @@ class HighscoreProcessor:
             # Append the player to the list of players
             players.append(player)
 
-            # If 'hiscores' data exists, create a SchemaHiscore object and append it to the list
+            # If 'hiscores' data exists, append the SchemaHiscore object to the list
             if highscore:
-                highscore = SchemaHiscore(**highscore)
                 highscore.ts_date = highscore.timestamp.date()
                 highscores.append(highscore)
 
         # Create new highscore records in the database using the repo_highscore
-        # _ = await self.repo_highscore.create(data=highscores)
         if highscores:
             await self.repo_highscore.insert_if_not_exist(
                 table=dbHiscore,
@@ -114,4 +107,4 @@ class HighscoreProcessor:
         if players:
             # Update player records in the database using the repo_player
             await self.repo_player.update(data=players)
-        return
+        return len(highscores) + len(players)
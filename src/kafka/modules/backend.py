@@ -0,0 +1,42 @@
+"""
+The message producer & consumer classes of config.kafka_backend,
+"kafka" or "memory" (src.kafka.modules.memory, no broker needed).
+"""
+from asyncio import Queue
+
+from src.core import config
+from src.kafka.modules.kafka_consumer import KafkaMessageConsumer
+from src.kafka.modules.kafka_producer import KafkaMessageProducer
+from src.kafka.modules.memory import MemoryMessageConsumer, MemoryMessageProducer
+
+BACKENDS = {
+    "kafka": (KafkaMessageProducer, KafkaMessageConsumer),
+    "memory": (MemoryMessageProducer, MemoryMessageConsumer),
+}
+
+
+def _classes() -> tuple:
+    if config.kafka_backend not in BACKENDS:
+        raise ValueError(f"Kafka backend {config.kafka_backend} not valid.")
+    return BACKENDS[config.kafka_backend]
+
+
+def create_producer(topic: str):
+    producer, _ = _classes()
+    return producer(
+        bootstrap_servers=config.kafka_url,
+        producer_topic=topic,
+        publish_timeout=config.kafka_publish_timeout,
+    )
+
+
+def create_consumer(topic: str, group_id: str, message_queue: Queue, **kwargs):
+    _, consumer = _classes()
+    return consumer(
+        bootstrap_servers=config.kafka_url,
+        consumer_topic=topic,
+        group_id=group_id,
+        message_queue=message_queue,
+        fetch_timeout_ms=config.kafka_fetch_timeout_ms,
+        **kwargs,
+    )
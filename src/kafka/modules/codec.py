@@ -0,0 +1,51 @@
+"""
+JSON decoding of the kafka messages, config.json_backend:
+
+    auto    orjson when it is installed, else json
+    orjson  orjson, json with a warning when it is not installed
+    json    the standard library
+"""
+import json
+import logging
+from typing import Any
+
+from src.core import config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _backend() -> str:
+    if config.json_backend not in ("auto", "orjson", "json"):
+        raise ValueError(f"JSON backend {config.json_backend} not valid.")
+    if config.json_backend == "json":
+        return "json"
+    if orjson is None:
+        if config.json_backend == "orjson":
+            logger.warning("orjson is not installed, using json")
+        return "json"
+    return "orjson"
+
+
+BACKEND = _backend()
+
+
+def loads(data: bytes) -> Any:
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def loads_message(data: bytes) -> Any:
+    """
+    The decoded message, None when it is not valid json.
+    """
+    try:
+        return loads(data)
+    except ValueError as e:
+        logger.warning({"message": "invalid json", "error": str(e)})
+        return None
@@ -1,45 +1,110 @@
 import asyncio
-import json
 from asyncio import Queue
+from collections import namedtuple
+from typing import Awaitable, Callable
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
 import logging
 
+from src.kafka.modules import codec
+
 logger = logging.getLogger(__name__)
 
+# with manual_commit the queue gets the decoded value & its position
+ConsumedMessage = namedtuple("ConsumedMessage", ["value", "partition", "offset"])
+
+
+class _RevokeListener(ConsumerRebalanceListener):
+    def __init__(self, on_revoke: Callable[[], Awaitable]):
+        self.on_revoke = on_revoke
+
+    async def on_partitions_revoked(self, revoked):
+        # the processed messages are committed before another consumer takes over
+        await self.on_revoke()
+
+    async def on_partitions_assigned(self, assigned):
+        pass
+
 
 class KafkaMessageConsumer:
+    """
+    Fetches up to max_records messages of all assigned partitions with getmany,
+    the queue gets one list per fetch, in offset order per partition.
+    The messages are decoded with src.kafka.modules.codec.
+
+    With manual_commit, offsets are only committed by commit, after the messages
+    are processed (at-least-once), on_revoke is awaited before a rebalance.
+    """
+
     def __init__(
-        self, bootstrap_servers, consumer_topic, group_id, message_queue: Queue
+        self,
+        bootstrap_servers,
+        consumer_topic,
+        group_id,
+        message_queue: Queue,
+        manual_commit: bool = False,
+        on_revoke: Callable[[], Awaitable] = None,
+        max_records: int = 500,
+        fetch_timeout_ms: int = 500,
     ):
         self.bootstrap_servers = bootstrap_servers
         self.consumer_topic = consumer_topic
         self.group_id = group_id
         self.message_queue = message_queue
+        self.manual_commit = manual_commit
+        self.on_revoke = on_revoke
+        self.max_records = max_records
+        self.fetch_timeout_ms = fetch_timeout_ms
         self.consumer = None
 
     async def start(self):
         logger.info("starting")
         self.consumer = AIOKafkaConsumer(
-            self.consumer_topic,
             group_id=self.group_id,
             loop=asyncio.get_event_loop(),
             bootstrap_servers=self.bootstrap_servers,
+            enable_auto_commit=not self.manual_commit,
         )
+        listener = _RevokeListener(self.on_revoke) if self.on_revoke else None
+        self.consumer.subscribe([self.consumer_topic], listener=listener)
         await self.consumer.start()
 
     async def stop(self):
         logger.info("stopping")
         if self.consumer:
-            await self.consumer.stop()
+            consumer, self.consumer = self.consumer, None
+            await consumer.stop()
+
+    async def commit(self, offsets: dict[int, int]):
+        """
+        Commits the offsets of the last processed message per partition.
+        """
+        await self.consumer.commit(
+            {
+                TopicPartition(self.consumer_topic, partition): offset + 1
+                for partition, offset in offsets.items()
+            }
+        )
 
     async def consume_messages(self):
         logger.info("start consuming messages")
         try:
-            async for message in self.consumer:
-                message = message.value.decode("utf-8")
-                message = json.loads(message)
-                await self.message_queue.put(message)
+            while True:
+                fetched = await self.consumer.getmany(
+                    timeout_ms=self.fetch_timeout_ms, max_records=self.max_records
+                )
+                messages = []
+                for records in fetched.values():
+                    for record in records:
+                        # invalid messages are committed with the batch
+                        value = codec.loads_message(record.value)
+                        if self.manual_commit:
+                            value = ConsumedMessage(
+                                value, record.partition, record.offset
+                            )
+                        messages.append(value)
+                if messages:
+                    await self.message_queue.put(messages)
         except Exception as e:
             print(f"Error consuming message: {e}")
 
@@ -1,24 +1,51 @@
 import asyncio
+import logging
 from asyncio import Queue
+
 from aiokafka import AIOKafkaProducer
 
+logger = logging.getLogger(__name__)
+
 
 class KafkaMessageProducer:
-    def __init__(self, bootstrap_servers, producer_topic):
+    def __init__(self, bootstrap_servers, producer_topic, publish_timeout: float = 5):
         self.bootstrap_servers = bootstrap_servers
         self.producer_topic = producer_topic
+        self.publish_timeout = publish_timeout
         self.producer = None
 
     async def start(self):
-        self.producer = AIOKafkaProducer(
+        producer = AIOKafkaProducer(
             loop=asyncio.get_event_loop(),
             bootstrap_servers=self.bootstrap_servers,
         )
-        await self.producer.start()
+        try:
+            await producer.start()
+        except Exception:
+            # not started, publish raises instead of waiting on a broker that is down
+            try:
+                await producer.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping producer: {e}")
+            raise
+        self.producer = producer
 
     async def stop(self):
         if self.producer:
-            await self.producer.stop()
+            producer, self.producer = self.producer, None
+            await producer.stop()
+
+    async def publish(self, message: str):
+        """
+        Sends the message & waits up to publish_timeout seconds for the broker
+        to acknowledge it, raises on failure, on a timeout & when not started.
+        """
+        if self.producer is None:
+            raise RuntimeError("producer not started")
+        await asyncio.wait_for(
+            self.producer.send_and_wait(self.producer_topic, message.encode("utf-8")),
+            timeout=self.publish_timeout,
+        )
 
     async def produce_message(self, message):
         try:
@@ -0,0 +1,146 @@
+"""
+In-memory stand-in for the kafka broker, for tests & local development.
+
+MemoryMessageProducer & MemoryMessageConsumer have the interface of
+KafkaMessageProducer & KafkaMessageConsumer. A topic is a log of encoded messages
+with one partition (0), consumers of a group start at the committed offset of
+the group, so messages that were consumed but not committed are delivered again.
+"""
+import asyncio
+import logging
+from asyncio import Queue
+from typing import Awaitable, Callable, Optional
+
+from src.kafka.modules import codec
+from src.kafka.modules.kafka_consumer import ConsumedMessage
+
+logger = logging.getLogger(__name__)
+
+PARTITION = 0
+
+
+class MemoryBroker:
+    def __init__(self, poll_interval: float = 0.01):
+        self.poll_interval = poll_interval
+        self.topics: dict[str, list[bytes]] = {}
+        # (group_id, topic) -> next offset to consume
+        self.committed: dict[tuple[str, str], int] = {}
+
+    def topic(self, name: str) -> list[bytes]:
+        return self.topics.setdefault(name, [])
+
+    def append(self, name: str, message: bytes) -> int:
+        log = self.topic(name)
+        log.append(message)
+        return len(log) - 1
+
+    def commit(self, group_id: str, name: str, offset: int) -> None:
+        key = (group_id, name)
+        self.committed[key] = max(self.committed.get(key, 0), offset)
+
+
+BROKER = MemoryBroker()
+
+
+class MemoryMessageProducer:
+    def __init__(
+        self,
+        bootstrap_servers,
+        producer_topic,
+        publish_timeout: float = 5,
+        broker: MemoryBroker = None,
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.producer_topic = producer_topic
+        self.publish_timeout = publish_timeout
+        self.broker = broker or BROKER
+        self.producer = None
+
+    async def start(self):
+        self.producer = self.broker
+
+    async def stop(self):
+        self.producer = None
+
+    async def publish(self, message: str):
+        if self.producer is None:
+            raise RuntimeError("producer not started")
+        self.producer.append(self.producer_topic, message.encode("utf-8"))
+
+    async def produce_message(self, message):
+        try:
+            await self.publish(message)
+        except Exception as e:
+            logger.error(f"Error producing message: {e}")
+
+
+class MemoryMessageConsumer:
+    def __init__(
+        self,
+        bootstrap_servers,
+        consumer_topic,
+        group_id,
+        message_queue: Queue,
+        manual_commit: bool = False,
+        on_revoke: Callable[[], Awaitable] = None,
+        max_records: int = 500,
+        fetch_timeout_ms: int = 500,
+        broker: MemoryBroker = None,
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.consumer_topic = consumer_topic
+        self.group_id = group_id
+        self.message_queue = message_queue
+        self.manual_commit = manual_commit
+        self.on_revoke = on_revoke
+        self.max_records = max_records
+        self.fetch_timeout_ms = fetch_timeout_ms
+        self.broker = broker or BROKER
+        self.consumer = None
+        self.position: Optional[int] = None
+
+    async def start(self):
+        logger.info("starting")
+        self.consumer = self.broker
+        self.position = self.broker.committed.get(
+            (self.group_id, self.consumer_topic), 0
+        )
+
+    async def stop(self):
+        logger.info("stopping")
+        self.consumer = None
+
+    async def commit(self, offsets: dict[int, int]):
+        """
+        Commits the offsets of the last processed message per partition.
+        """
+        for _, offset in offsets.items():
+            self.broker.commit(self.group_id, self.consumer_topic, offset + 1)
+
+    async def consume_messages(self):
+        logger.info("start consuming messages")
+        log = self.broker.topic(self.consumer_topic)
+        while self.consumer is not None:
+            if self.position >= len(log):
+                await asyncio.sleep(self.broker.poll_interval)
+                continue
+
+            start = self.position
+            self.position = min(len(log), start + self.max_records)
+            if not self.manual_commit:
+                self.broker.commit(self.group_id, self.consumer_topic, self.position)
+
+            messages = []
+            for offset in range(start, self.position):
+                message = codec.loads_message(log[offset])
+                if self.manual_commit:
+                    message = ConsumedMessage(message, PARTITION, offset)
+                messages.append(message)
+            await self.message_queue.put(messages)
+
+    async def consume_messages_continuously(self):
+        await self.start()
+        try:
+            await self.consume_messages()
+        finally:
+            await self.stop()
@@ -0,0 +1,325 @@
+"""
+Base of the kafka ingest processors.
+
+A processor consumes its topic into a bounded queue of fetches (up to batch_size
+messages each), process_batch is called with batch_size messages, or with what
+arrived when the flush timer of flush_interval seconds expires, messages or not.
+Subclasses implement process_batch, returning the number of rows written,
+messages that can never be written are skipped & counted as invalid.
+decode can validate the messages of a batch at once, process_batch gets
+what decode returned.
+
+Batches are written by up to parallelism writers, the messages of a partition
+always by the same writer (partition % parallelism), in offset order. A writer
+that is still busy holds back the next batch of its partitions & so the consumer
+(backpressure). Batches with overlapping keys (see keys) are not written at once.
+
+Offsets are committed per partition after process_batch succeeded (at-least-once).
+A batch that fails restarts the consumer, the uncommitted
+messages are delivered again from the last committed offset. The pending messages
+are written & committed before a rebalance & on stop, so replays stay small.
+
+    live    the processing loop ran in the last liveness_timeout seconds
+    ready   live & the consumer is started
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from asyncio import Queue
+from typing import Optional
+
+from src.kafka.modules.backend import create_consumer
+from src.kafka.modules.kafka_consumer import ConsumedMessage
+
+logger = logging.getLogger(__name__)
+
+
+class BatchProcessor(ABC):
+    def __init__(
+        self,
+        topic: str,
+        group_id: str,
+        batch_size: int = 100,
+        flush_interval: float = 1,
+        liveness_timeout: float = 120,
+        parallelism: int = 1,
+    ) -> None:
+        self.topic = topic
+        self.group_id = group_id
+        # fetches of up to batch_size messages
+        self.message_queue = Queue(maxsize=2)
+        self.batch: list[ConsumedMessage] = []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.liveness_timeout = liveness_timeout
+        self.parallelism = max(parallelism, 1)
+        self.message_consumer = None
+        self._task: Optional[asyncio.Task] = None
+        # writer (partition % parallelism) -> the batch it is writing
+        self._writing: dict[int, asyncio.Task] = {}
+        self._flush_lock = asyncio.Lock()
+        self._keys: set = set()
+        self._keys_released = asyncio.Condition()
+        self.restart_delay = 5
+
+        self.started_at: Optional[float] = None
+        self.heartbeat: Optional[float] = None
+        self.messages = 0
+        self.batches = 0
+        self.rows = 0
+        self.failed = 0
+        self.invalid = 0
+        self.commits = 0
+        self.restarts = 0
+        self.last_batch_seconds = 0.0
+
+    @abstractmethod
+    async def process_batch(self, batch: list[dict]) -> int:
+        pass
+
+    def decode(self, batch: list) -> list:
+        """
+        The messages of a batch, called once per batch before keys & process_batch.
+        """
+        return batch
+
+    def keys(self, batch: list[dict]) -> set:
+        """
+        The rows a batch writes, batches sharing a key are written one after another.
+        """
+        return set()
+
+    async def initialize(self):
+        self.message_consumer = create_consumer(
+            topic=self.topic,
+            group_id=self.group_id,
+            message_queue=self.message_queue,
+            manual_commit=True,
+            on_revoke=self.drain,
+            max_records=self.batch_size,
+        )
+
+    async def run(self):
+        logger.info({"message": "starting", "topic": self.topic})
+        while True:
+            await self.initialize()
+            tasks = [
+                asyncio.create_task(
+                    self.message_consumer.consume_messages_continuously()
+                ),
+                asyncio.create_task(self.process_messages()),
+            ]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+            except asyncio.CancelledError:
+                # stopping, write & commit what was consumed while the consumer is open
+                tasks[1].cancel()
+                await asyncio.gather(tasks[1], return_exceptions=True)
+                try:
+                    await self.drain()
+                except Exception as e:
+                    logger.error(
+                        {
+                            "message": "drain failed",
+                            "topic": self.topic,
+                            "error": str(e),
+                        }
+                    )
+                raise
+            except Exception as error:
+                logger.error(f"Error occured: {str(error)}")
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # the other writers commit what they are writing
+                await asyncio.gather(*self._writing.values(), return_exceptions=True)
+                self._writing.clear()
+                await self.message_consumer.stop()
+
+            # not committed, kafka delivers these again
+            self.restarts += 1
+            self.batch = []
+            while not self.message_queue.empty():
+                self.message_queue.get_nowait()
+            await asyncio.sleep(self.restart_delay)
+
+    async def start(self):
+        if self._task is None:
+            self.started_at = self.heartbeat = time.monotonic()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        logger.info({"message": "stopping", "topic": self.topic})
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def process_messages(self):
+        logger.info("start processing messages")
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            self.heartbeat = time.monotonic()
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                messages = await asyncio.wait_for(self.message_queue.get(), timeout)
+                self.batch.extend(messages)
+                self.message_queue.task_done()
+            except asyncio.TimeoutError:
+                pass
+
+            self.raise_writer_errors()
+            while len(self.batch) >= self.batch_size:
+                await self.flush(self.batch_size)
+                deadline = time.monotonic() + self.flush_interval
+
+            if time.monotonic() >= deadline:
+                if self.batch:
+                    await self.flush()
+                deadline = time.monotonic() + self.flush_interval
+
+    async def drain(self):
+        """
+        Writes & commits the consumed messages, before a rebalance or a stop.
+        Raises when a batch failed, see raise_writer_errors.
+        """
+        while not self.message_queue.empty():
+            self.batch.extend(self.message_queue.get_nowait())
+        await self.flush()
+        await self.wait_writers()
+
+    async def flush(self, limit: Optional[int] = None):
+        """
+        Hands the first limit (all) messages of the batch to the writers of their
+        partitions, waits for a writer that is still busy.
+        """
+        async with self._flush_lock:
+            limit = len(self.batch) if limit is None else limit
+            batch, self.batch = self.batch[:limit], self.batch[limit:]
+
+            writers: dict[int, list[ConsumedMessage]] = {}
+            for message in batch:
+                writer = message.partition % self.parallelism
+                writers.setdefault(writer, []).append(message)
+
+            try:
+                while writers:
+                    writer, messages = next(iter(writers.items()))
+                    writing = self._writing.get(writer)
+                    if writing is not None:
+                        # shielded, a stop does not interrupt the write
+                        await asyncio.shield(writing)
+                    self._writing[writer] = asyncio.create_task(
+                        self.write_batch(messages)
+                    )
+                    del writers[writer]
+            finally:
+                # not handed to a writer, back in front of the batch
+                self.batch[:0] = [m for messages in writers.values() for m in messages]
+
+    def raise_writer_errors(self):
+        """
+        Raises the error of a failed batch. The failed batch stays with its writer
+        until the consumer restarts, nothing after it is written or committed &
+        the processing loop sees it, also when it failed in the drain of a rebalance.
+        """
+        for writer, writing in list(self._writing.items()):
+            if not writing.done():
+                continue
+            if not writing.cancelled() and writing.exception() is not None:
+                raise writing.exception()
+            del self._writing[writer]
+
+    async def wait_writers(self):
+        await asyncio.gather(*self._writing.values(), return_exceptions=True)
+        self.raise_writer_errors()
+
+    async def write_batch(self, batch: list[ConsumedMessage]):
+        """
+        Processes the batch & commits its offsets, raises when the batch failed.
+        """
+        # the last offset per partition, the batch is in consumed order
+        offsets = {message.partition: message.offset for message in batch}
+        values = self.decode([message.value for message in batch])
+        keys = self.keys(values)
+        async with self._keys_released:
+            await self._keys_released.wait_for(lambda: self._keys.isdisjoint(keys))
+            self._keys |= keys
+
+        start = time.monotonic()
+        try:
+            # the database calls retry transient errors (handle_database_error)
+            rows = await self.process_batch(values)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(
+                {
+                    "message": "batch failed",
+                    "topic": self.topic,
+                    "size": len(batch),
+                    "error": str(e),
+                }
+            )
+            raise
+        finally:
+            async with self._keys_released:
+                self._keys -= keys
+                self._keys_released.notify_all()
+
+        self.batches += 1
+        self.messages += len(batch)
+        self.rows += rows or 0
+        self.last_batch_seconds = time.monotonic() - start
+
+        try:
+            await self.message_consumer.commit(offsets)
+            self.commits += 1
+        except Exception as e:
+            # written but not committed, delivered again after a restart
+            logger.error(
+                {"message": "commit failed", "topic": self.topic, "error": str(e)}
+            )
+        logger.info(
+            {
+                "message": "batch",
+                "topic": self.topic,
+                "size": len(batch),
+                "rows": rows,
+                "offsets": offsets,
+            }
+        )
+
+    def live(self) -> bool:
+        if self._task is None or self._task.done():
+            return False
+        return time.monotonic() - self.heartbeat < self.liveness_timeout
+
+    def ready(self) -> bool:
+        consumer = self.message_consumer
+        return self.live() and consumer is not None and consumer.consumer is not None
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            "live": self.live(),
+            "ready": self.ready(),
+            "queue_depth": len(self.batch),
+            "queued_fetches": self.message_queue.qsize(),
+            "writing": sum(not w.done() for w in self._writing.values()),
+            "messages": self.messages,
+            "batches": self.batches,
+            "rows": self.rows,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "commits": self.commits,
+            "restarts": self.restarts,
+            "messages_per_second": round(self.messages / uptime, 2) if uptime else 0,
+            "last_batch_seconds": round(self.last_batch_seconds, 4),
+        }
@@ -0,0 +1,66 @@
+import json
+import logging
+from typing import Awaitable, Callable
+
+from src.app.ingest.report import ReportBatch, from_message, to_message
+from src.app.repositories.report import write_reports
+from src.core import config, metrics
+from src.kafka.modules.backend import create_producer
+from src.kafka.modules.processor import BatchProcessor
+
+logger = logging.getLogger(__name__)
+
+# long lived, started on app startup in the kafka ingest mode
+REPORT_PRODUCER = create_producer(config.report_topic)
+
+
+async def publish_report(batch: ReportBatch, manual_detect: int = None) -> None:
+    """
+    Publishes a prepared batch to config.report_topic, raises when it is not acknowledged.
+    """
+    await REPORT_PRODUCER.publish(json.dumps(to_message(batch, manual_detect)))
+
+
+async def write_flushed(batches: list) -> int:
+    """
+    write_reports, returns once the rows are committed, the offsets are committed after it.
+    """
+    return await write_reports(batches, flushed=True)
+
+
+class ReportProcessor(BatchProcessor):
+    """
+    Consumes the report topic & writes the batches with write_reports.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval: float = 1,
+        write: Callable[[list], Awaitable[int]] = write_flushed,
+    ) -> None:
+        super().__init__(
+            topic=config.report_topic,
+            group_id=config.report_consumer_group,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+        )
+        self.write = write
+
+    async def process_batch(self, batch: list[dict]) -> int:
+        batches = []
+        for message in batch:
+            try:
+                batches.append(from_message(message))
+            except (KeyError, TypeError, ValueError) as e:
+                # committed with the batch, a replay would fail the same way
+                self.invalid += 1
+                logger.warning({"message": "invalid message", "error": str(e)})
+        return await self.write(batches) if batches else 0
+
+
+REPORT_PROCESSOR = ReportProcessor(
+    batch_size=config.report_consumer_batch_size,
+    flush_interval=config.report_consumer_flush_interval,
+)
+metrics.register("report_processor", REPORT_PROCESSOR.stats)
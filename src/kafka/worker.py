@@ -0,0 +1,112 @@
+"""
+Standalone ingest worker, runs a kafka processor outside of the api process.
+
+    python -m src.kafka.worker highscore
+    python -m src.kafka.worker report
+
+Serves on config.worker_port:
+    /live       200 while the processing loop runs, 503 otherwise (liveness probe)
+    /ready      200 while the consumer is started as well (readiness probe)
+    /metrics    the metrics snapshot, as the /metrics route of the api
+
+Stops on SIGTERM & SIGINT, the consumed messages are written before exiting.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+
+from src.app.repositories.report import REPORT_WRITER
+from src.core import config, executors, metrics
+from src.database.active_reporters import ACTIVE_REPORTERS
+from src.database.database import ENGINES
+from src.kafka.highscore import HighscoreProcessor
+from src.kafka.modules.processor import BatchProcessor
+from src.kafka.report import REPORT_PROCESSOR
+
+logger = logging.getLogger(__name__)
+
+PROCESSORS = {
+    "highscore": lambda: HighscoreProcessor(
+        batch_size=config.highscore_batch_size,
+        flush_interval=config.highscore_flush_interval,
+        parallelism=config.highscore_parallelism,
+    ),
+    "report": lambda: REPORT_PROCESSOR,
+}
+# the background writers a processor writes through
+WRITERS = {
+    "highscore": [],
+    "report": [REPORT_WRITER, ACTIVE_REPORTERS],
+}
+
+
+def health_app(processor: BatchProcessor) -> web.Application:
+    async def live(request):
+        return web.json_response(
+            {"live": processor.live()}, status=200 if processor.live() else 503
+        )
+
+    async def ready(request):
+        return web.json_response(
+            {"ready": processor.ready()}, status=200 if processor.ready() else 503
+        )
+
+    async def get_metrics(request):
+        return web.json_response(await metrics.collect())
+
+    app = web.Application()
+    app.router.add_get("/live", live)
+    app.router.add_get("/ready", ready)
+    app.router.add_get("/metrics", get_metrics)
+    return app
+
+
+async def run(name: str, port: int = None) -> None:
+    processor = PROCESSORS[name]()
+    metrics.register(f"{name}_processor", processor.stats)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    writers = WRITERS[name]
+    runner = web.AppRunner(health_app(processor))
+    try:
+        executors.start()
+        for engine in ENGINES:
+            await engine.start()
+        for writer in writers:
+            await writer.start()
+
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", port or config.worker_port).start()
+
+        await processor.start()
+        logger.info({"message": "worker started", "processor": name})
+        await stopping.wait()
+    finally:
+        # also after a failed startup, stopping what was not started is a no-op
+        logger.info({"message": "worker stopping", "processor": name})
+        await processor.stop()
+        for writer in writers:
+            await writer.stop()
+        await runner.cleanup()
+        for engine in ENGINES:
+            await engine.stop()
+        executors.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="kafka ingest worker")
+    parser.add_argument("processor", choices=sorted(PROCESSORS))
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args.processor, port=args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# sentinel to tell a cached None apart from a cache miss
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded least recently used cache with an optional time to live.
+
+    Not thread safe, it is meant to be used from the event loop only.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of entries, the least recently used entry is evicted first.
+
+    ttl : float (Optional)
+        Seconds an entry stays valid, None means entries never expire.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = None,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        # key -> (expires_at, value)
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, MISSING, count=False) is not MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        entry = self._data.get(key)
+
+        if entry is not None and entry[0] < self.timer():
+            del self._data[key]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += count
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += count
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = float("inf") if self.ttl is None else self.timer() + self.ttl
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Removes every entry for which predicate(key, value) is true,
+        returns the number of removed entries.
+        """
+        keys = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,136 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Hashable
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage of the sliding window counters, a shared backend (e.g. redis)
+    implements these methods so every api process sees the same counts.
+    """
+
+    @abstractmethod
+    async def hit(self, key: Hashable, window: float, now: float) -> float:
+        """Records a hit for key, returns the number of hits in the sliding window."""
+        pass
+
+    @abstractmethod
+    async def seed(self, key: Hashable, count: int, window: float, now: float) -> bool:
+        """Sets the count of an unknown key, returns False if the key is already known."""
+        pass
+
+    @abstractmethod
+    async def known(self, key: Hashable) -> bool:
+        pass
+
+    @abstractmethod
+    async def size(self) -> int:
+        pass
+
+
+class LocalBackend(RateLimitBackend):
+    """
+    In process sliding window counter, keeps the count of the current and previous
+    fixed window per key, the previous window is weighted by its overlap
+    with the sliding window, so every decision is O(1).
+    """
+
+    def __init__(self) -> None:
+        # key -> [window index, current count, previous count]
+        self._counters: dict[Hashable, list] = {}
+
+    def _counter(self, key: Hashable, window: float, now: float) -> list:
+        index = int(now // window)
+        counter = self._counters.get(key)
+
+        if counter is None:
+            counter = self._counters[key] = [index, 0, 0]
+        elif counter[0] != index:
+            # the previous window only counts if it is the window right before this one
+            previous = counter[1] if counter[0] == index - 1 else 0
+            counter[:] = [index, 0, previous]
+        return counter
+
+    async def hit(self, key: Hashable, window: float, now: float) -> float:
+        counter = self._counter(key, window, now)
+        counter[1] += 1
+
+        elapsed = (now % window) / window
+        return counter[1] + counter[2] * (1 - elapsed)
+
+    async def seed(self, key: Hashable, count: int, window: float, now: float) -> bool:
+        if key in self._counters:
+            return False
+        counter = self._counter(key, window, now)
+        counter[1] = count
+        return True
+
+    async def known(self, key: Hashable) -> bool:
+        return key in self._counters
+
+    async def size(self) -> int:
+        return len(self._counters)
+
+
+BACKENDS: dict[str, Callable[[], RateLimitBackend]] = {
+    "local": LocalBackend,
+}
+
+
+class RateLimiter:
+    """
+    Sliding window rate limiter.
+
+    Parameters
+    ----------
+    window : float
+        The length of the sliding window in seconds.
+
+    backend : RateLimitBackend (Optional)
+        Where the counters are kept, defaults to an in process LocalBackend.
+    """
+
+    def __init__(
+        self,
+        window: float = 3600,
+        backend: RateLimitBackend = None,
+        timer: Callable[[], float] = time.time,
+    ) -> None:
+        self.window = window
+        self.backend = backend or LocalBackend()
+        self.timer = timer
+
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, key: Hashable, limit: int) -> bool:
+        """
+        Records a hit for key, returns False if the key went over its limit,
+        a limit of -1 means unlimited.
+        """
+        count = await self.backend.hit(key, self.window, self.timer())
+
+        if limit != -1 and count > limit:
+            self.rejected += 1
+            return False
+
+        self.allowed += 1
+        return True
+
+    async def seed(self, key: Hashable, count: int) -> bool:
+        """
+        Initializes the count of a key that this limiter has not seen yet,
+        e.g. with the usage that is already in the database.
+        """
+        return await self.backend.seed(key, count, self.window, self.timer())
+
+    async def known(self, key: Hashable) -> bool:
+        return await self.backend.known(key)
+
+    async def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "keys": await self.backend.size(),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
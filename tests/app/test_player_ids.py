@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.app.repositories.player import (
+    PLAYER_ID_CACHE,
+    cache_player_ids,
+    get_or_create_players,
+    get_player_ids,
+)
+
+
+class PlayersSession:
+    def __init__(self, engine):
+        self.engine = engine
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, sql, params=None):
+        if sql.is_insert:
+            self.engine.inserted.append([p["name"] for p in params])
+            for p in params:
+                self.engine.players.setdefault(p["name"], len(self.engine.players) + 1)
+            return
+
+        names = params["names"]
+        self.engine.queried.append(sorted(names))
+        return [(n, self.engine.players[n]) for n in names if n in self.engine.players]
+
+
+class PlayersEngine:
+    def __init__(self, players: dict):
+        self.players = players
+        self.queried = []
+        self.inserted = []
+
+    @asynccontextmanager
+    async def get_session(self):
+        yield PlayersSession(self)
+
+
+def test_only_unseen_names_are_read():
+    PLAYER_ID_CACHE.clear()
+    engine = PlayersEngine({"bot 1": 1, "bot 2": 2})
+
+    first = asyncio.run(get_player_ids({"bot 1", "bot 3"}, engine=engine))
+    second = asyncio.run(get_player_ids({"bot 1", "bot 2", "bot 3"}, engine=engine))
+
+    assert first == {"bot 1": 1}
+    assert second == {"bot 1": 1, "bot 2": 2}
+    # unknown valid names are read again, they may have been created since
+    assert engine.queried == [["bot 1", "bot 3"], ["bot 2", "bot 3"]]
+
+
+def test_invalid_names_are_not_read():
+    PLAYER_ID_CACHE.clear()
+    engine = PlayersEngine({})
+
+    ids = asyncio.run(get_player_ids(["name that is too long"], engine=engine))
+
+    assert ids == {}
+    assert engine.queried == []
+    assert len(PLAYER_ID_CACHE) == 0
+
+
+def test_validation_can_be_skipped():
+    PLAYER_ID_CACHE.clear()
+    engine = PlayersEngine({"anonymoususer 12ab": 7})
+
+    ids = asyncio.run(
+        get_player_ids(["anonymoususer 12ab"], engine=engine, validate=False)
+    )
+
+    assert ids == {"anonymoususer 12ab": 7}
+
+
+def test_created_players_are_cached():
+    PLAYER_ID_CACHE.clear()
+    engine = PlayersEngine({})
+    cache_player_ids({"new player": 42})
+
+    assert asyncio.run(get_player_ids(["new player"], engine=engine)) == {
+        "new player": 42
+    }
+    assert engine.queried == []
+
+
+def test_get_or_create_inserts_only_the_missing_names():
+    PLAYER_ID_CACHE.clear()
+    engine = PlayersEngine({"bot 1": 1})
+    cache_player_ids({"reporter": 9})
+
+    ids = asyncio.run(
+        get_or_create_players(
+            {"reporter", "bot 2", "bot 1", "name that is too long"}, engine=engine
+        )
+    )
+
+    assert ids == {"reporter": 9, "bot 1": 1, "bot 2": 2}
+    # existing players are not inserted, an ignored insert uses an auto increment id
+    assert engine.inserted == [["bot 2"]]
+    assert engine.queried == [["bot 1", "bot 2"], ["bot 2"]]
+
+    asyncio.run(get_or_create_players({"bot 1", "bot 2"}, engine=engine))
+    assert len(engine.inserted) == 1
+
+
+def test_get_or_create_without_missing_names_does_not_insert():
+    PLAYER_ID_CACHE.clear()
+    engine = PlayersEngine({"bot 1": 1, "bot 2": 2})
+
+    ids = asyncio.run(get_or_create_players({"bot 1", "bot 2"}, engine=engine))
+
+    assert ids == {"bot 1": 1, "bot 2": 2}
+    assert engine.inserted == []
+    assert engine.queried == [["bot 1", "bot 2"]]
+
+
+def test_legacy_player_id_lookup_is_cached(monkeypatch):
+    from src.api.legacy import legacy
+
+    PLAYER_ID_CACHE.clear()
+    lookups = []
+
+    async def sql_get_player(player_name, engine=None):
+        lookups.append(player_name)
+        return {"id": 5, "name": player_name} if player_name == "Bot_1" else None
+
+    monkeypatch.setattr(legacy, "sql_get_player", sql_get_player)
+
+    async def run():
+        return [
+            await legacy.sql_get_player_id(name)
+            for name in ["Bot_1", "bot 1", "unknown", "unknown"]
+        ]
+
+    assert asyncio.run(run()) == [5, 5, None, None]
+    # unknown players are read again, they may have been created since
+    assert lookups == ["Bot_1", "unknown", "unknown"]
+    assert PLAYER_ID_CACHE.get("bot 1") == 5
@@ -0,0 +1,189 @@
+"""
+The report ingest module, with a benchmark against the previous pandas path.
+
+    BENCHMARK=1 python -m pytest -s tests/app/test_report_ingest.py
+"""
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.app.ingest import report as report_ingest
+
+NOW = 1_700_000_000
+
+
+def make_detection(
+    reporter="Some_Reporter", reported="bot-1", **fields
+) -> SimpleNamespace:
+    equipment = {e: fields.pop(e, 0) for e in report_ingest.EQUIPMENT}
+    values = dict(
+        reporter=reporter,
+        reported=reported,
+        region_id=12850,
+        x_coord=3200,
+        y_coord=3200,
+        z_coord=0,
+        ts=NOW,
+        manual_detect=0,
+        on_members_world=1,
+        on_pvp_world=0,
+        world_number=420,
+        equip_ge_value=0,
+    )
+    values.update(fields)
+    values["equipment"] = SimpleNamespace(**equipment)
+    values["dict"] = lambda: {
+        **{k: v for k, v in values.items() if k not in ("equipment", "dict")},
+        "equipment": equipment,
+    }
+    return SimpleNamespace(**values)
+
+
+def payload(size: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        make_detection(
+            reported=f"Bot_{rng.randrange(size)}",
+            region_id=rng.randrange(3),
+            ts=NOW - rng.randrange(600),
+            equip_head_id=rng.randrange(30_000),
+            equip_ge_value=rng.randrange(10_000_000),
+        )
+        for _ in range(size)
+    ]
+
+
+def fake_ids(names) -> dict:
+    return {name: i for i, name in enumerate(sorted(names), start=1)}
+
+
+def pandas_rows(detections: list, manual_detect: int = None) -> list[tuple]:
+    """
+    The previous insert_report path, without the database.
+    """
+    df = pd.DataFrame([d.dict() for d in detections])
+    df.drop_duplicates(subset=["reporter", "reported", "region_id"], inplace=True)
+
+    normalize = lambda name: name.lower().replace("_", " ").replace("-", " ").strip()
+    df["reporter"] = df["reporter"].apply(normalize)
+    df["reported"] = df["reported"].apply(normalize)
+
+    names = list(df["reported"].unique())
+    names.extend(df["reporter"].unique())
+    valid_names = [n for n in names if re.fullmatch(r"[\w\d\s_-]{1,13}", n)]
+    df_names = pd.DataFrame(
+        [{"name": n, "id": i} for n, i in fake_ids(set(valid_names)).items()]
+    )
+
+    df = df.merge(df_names, left_on="reported", right_on="name")
+    reporter = df["reporter"].unique()
+    reporter_id = df_names.query(f"name == {reporter}")["id"].to_list()
+    df["reporter_id"] = reporter_id[0]
+    if manual_detect:
+        df["manual_detect"] = manual_detect
+
+    rows = []
+    for data in df.to_dict("records"):
+        human_time = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(data["ts"]))
+        equipment = data.get("equipment", {})
+        rows.append(
+            (
+                data.get("id"),
+                data.get("reporter_id"),
+                data.get("region_id"),
+                data.get("x_coord"),
+                data.get("y_coord"),
+                data.get("z_coord"),
+                human_time,
+                data.get("manual_detect"),
+                data.get("on_members_world"),
+                data.get("on_pvp_world"),
+                data.get("world_number"),
+                *[equipment.get(e) for e in report_ingest.EQUIPMENT],
+                data.get("equip_ge_value", 0),
+            )
+        )
+    return rows
+
+
+def ingest_rows(detections: list, manual_detect: int = None) -> list[tuple]:
+    batch = report_ingest.prepare(detections, now=NOW)
+    return report_ingest.to_rows(batch, fake_ids(batch.names), manual_detect)
+
+
+def test_rows_match_the_pandas_path():
+    detections = payload(500)
+
+    rows = ingest_rows(detections)
+
+    assert len(rows[0]) == len(report_ingest.COLUMNS)
+    assert sorted(rows) == sorted(pandas_rows(detections))
+    assert sorted(ingest_rows(detections, 1)) == sorted(pandas_rows(detections, 1))
+
+
+def test_dedupes_on_reported_and_region():
+    detections = [
+        make_detection(reported="bot_1", x_coord=1),
+        make_detection(reported="Bot 1", x_coord=2),
+        make_detection(reported="bot_1", region_id=1),
+    ]
+
+    batch = report_ingest.prepare(detections, now=NOW)
+
+    assert batch.reporter == "some reporter"
+    assert batch.names == {"some reporter", "bot 1"}
+    assert [(d[0], d[1], d[2]) for d in batch.detections] == [
+        ("bot 1", 12850, 1),
+        ("bot 1", 1, 3200),
+    ]
+
+
+def test_rejected_payloads():
+    assert report_ingest.prepare([], now=NOW) is None
+    assert (
+        report_ingest.prepare(
+            [make_detection(reporter="a"), make_detection(reporter="b")], now=NOW
+        )
+        is None
+    )
+    assert report_ingest.prepare([make_detection(ts=NOW + 3601)], now=NOW) is None
+    assert report_ingest.prepare([make_detection(ts=NOW - 25201)], now=NOW) is None
+    too_many = [make_detection(reported=f"bot {i}") for i in range(5001)]
+    assert report_ingest.prepare(too_many, now=NOW) is None
+
+
+def test_unknown_players_are_dropped():
+    batch = report_ingest.prepare(
+        [make_detection(reported="bot 1"), make_detection(reported="bot 2")], now=NOW
+    )
+
+    assert report_ingest.to_rows(batch, {"bot 1": 1}) == []
+
+    rows = report_ingest.to_rows(batch, {"some reporter": 9, "bot 2": 2})
+    assert [(r[0], r[1]) for r in rows] == [(2, 9)]
+
+
+@pytest.mark.skipif(not os.environ.get("BENCHMARK"), reason="set BENCHMARK=1")
+def test_benchmark(size: int = 5000, repeat: int = 20):
+    detections = payload(size)
+    timings = {}
+    for name, path in (("pandas", pandas_rows), ("ingest", ingest_rows)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            path(detections)
+        timings[name] = (time.perf_counter() - start) / repeat
+
+    print(f"\n{size} detections")
+    for name, seconds in timings.items():
+        print(f"{name:>7}: {seconds * 1000:.2f}ms")
+    assert timings["ingest"] < timings["pandas"]
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.core.executors import PROCESS_POOL, THREAD_POOL, Pool, blocking_io, cpu_bound
+
+
+@cpu_bound
+def worker_pid(fail: bool = False) -> int:
+    if fail:
+        raise ValueError("failed")
+    return os.getpid()
+
+
+@blocking_io
+def thread_name() -> str:
+    import threading
+
+    return threading.current_thread().name
+
+
+def test_runs_inline_without_a_pool():
+    pool = Pool("test", size=0, factory=None)
+    pool.start()
+
+    assert asyncio.run(pool.run(sum, [1, 2])) == 3
+    assert pool.stats()["inline"] == 1
+    assert pool.stats()["workers"] == 0
+
+
+def test_cpu_bound_runs_in_another_process():
+    PROCESS_POOL.start()
+    try:
+        assert asyncio.run(worker_pid()) != os.getpid()
+        with pytest.raises(ValueError):
+            asyncio.run(worker_pid(fail=True))
+    finally:
+        PROCESS_POOL.shutdown()
+
+    stats = PROCESS_POOL.stats()
+    assert stats["completed"] >= 1 and stats["failed"] >= 1
+    assert stats["queue_depth"] == 0
+    assert stats["max_latency_seconds"] > 0
+
+
+def test_blocking_io_runs_in_the_thread_pool():
+    THREAD_POOL.start()
+    try:
+        assert asyncio.run(thread_name()).startswith("blocking-io")
+    finally:
+        THREAD_POOL.shutdown()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from aiohttp import web
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.core.http import CircuitBreaker, HttpClient, HttpUnavailable
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["opened"] == 1
+
+
+async def serve(handler) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/"
+
+
+def test_client_reuses_session_and_opens_circuit():
+    statuses = [200, 500, 500]
+
+    async def handler(request):
+        await request.json()
+        return web.Response(status=statuses.pop(0), text="body")
+
+    async def run():
+        runner, url = await serve(handler)
+        client = HttpClient("test", breaker=CircuitBreaker(failure_threshold=2))
+        await client.start()
+        session = client.session
+        try:
+            results = [await client.post(url, json={"a": 1}) for _ in range(3)]
+            with pytest.raises(HttpUnavailable):
+                await client.post(url, json={})
+            assert client.session is session
+        finally:
+            await client.stop()
+            await runner.cleanup()
+        return client, results
+
+    client, results = asyncio.run(run())
+    assert results == [(200, "body"), (500, "body"), (500, "body")]
+    stats = client.stats()
+    assert stats["requests"] == 3
+    assert stats["failed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["breaker"]["state"] == "open"
+
+
+def test_client_rejects_over_max_concurrency():
+    async def run():
+        gate = asyncio.Event()
+
+        async def handler(request):
+            await gate.wait()
+            return web.Response(text="ok")
+
+        runner, url = await serve(handler)
+        client = HttpClient("test", max_concurrency=1)
+        await client.start()
+        try:
+            first = asyncio.create_task(client.post(url))
+            await asyncio.sleep(0.1)
+            with pytest.raises(HttpUnavailable):
+                await client.post(url)
+            gate.set()
+            return await first
+        finally:
+            await client.stop()
+            await runner.cleanup()
+
+    assert asyncio.run(run()) == (200, "ok")
+
+
+def test_unexpected_error_ends_the_trial():
+    async def run():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        client = HttpClient("test", breaker=breaker)
+        await client.start()
+        try:
+            # not json serializable, raised before the request is sent
+            with pytest.raises(TypeError):
+                await client.post("http://127.0.0.1/", json=object())
+        finally:
+            await client.stop()
+        return breaker
+
+    breaker = asyncio.run(run())
+    assert not breaker.trial
+    assert breaker.allow()
+
+
+def test_client_not_started():
+    with pytest.raises(HttpUnavailable):
+        asyncio.run(HttpClient("test").post("http://127.0.0.1/"))
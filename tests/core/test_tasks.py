@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.core.tasks import TaskManager, TasksSaturated
+
+
+def test_concurrency_is_capped_and_queue_is_bounded():
+    async def run():
+        manager = TaskManager("test", max_concurrency=2, max_queue=1)
+        gate = asyncio.Event()
+
+        async def work():
+            await gate.wait()
+
+        for _ in range(3):
+            manager.submit(work)
+        await asyncio.sleep(0)
+        during = manager.stats()
+
+        with pytest.raises(TasksSaturated):
+            manager.submit(work)
+        dropped = manager.try_submit(work)
+
+        gate.set()
+        await manager.drain()
+        return during, dropped, manager.stats()
+
+    during, dropped, after = asyncio.run(run())
+    assert (during["in_flight"], during["queued"]) == (2, 1)
+    assert dropped is False
+    assert after["completed"] == 3
+    assert after["rejected"] == 1
+    assert after["dropped"] == 1
+    assert (after["in_flight"], after["queued"]) == (0, 0)
+
+
+def test_failures_are_counted_not_raised():
+    async def fail():
+        raise ValueError("boom")
+
+    async def run():
+        manager = TaskManager("test")
+        manager.submit(fail)
+        await manager.drain()
+        return manager.stats()
+
+    assert asyncio.run(run())["failed"] == 1
+
+
+def test_drain_refuses_new_work_and_cancels_after_timeout():
+    async def run():
+        manager = TaskManager("test")
+
+        async def forever():
+            await asyncio.Event().wait()
+
+        manager.submit(forever)
+        await asyncio.sleep(0)
+        await manager.drain(timeout=0.05)
+        assert not manager.try_submit(forever)
+        return manager.stats()
+
+    stats = asyncio.run(run())
+    assert stats["cancelled"] == 1
+    assert stats["dropped"] == 1
@@ -0,0 +1,56 @@
+"""
+Engine fakes of the background writer tests, they record what would be written.
+
+    statements  the statements of session.execute
+    writes      the rows of connection.exec_driver_sql
+    errors      raised by the next writes, one per write
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class RecordingConnection:
+    def __init__(self, engine: "RecordingEngine"):
+        self.engine = engine
+
+    async def exec_driver_sql(self, sql, rows):
+        await self.engine.wait()
+        self.engine.writes.append(list(rows))
+
+
+class RecordingSession:
+    def __init__(self, engine: "RecordingEngine"):
+        self.engine = engine
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, sql):
+        await self.engine.wait()
+        self.engine.statements.append(sql)
+
+    async def connection(self):
+        return RecordingConnection(self.engine)
+
+
+class RecordingEngine:
+    def __init__(self, fail: bool = False, delay: float = 0, errors: list = None):
+        self.statements = []
+        self.writes = []
+        self.fail = fail
+        self.delay = delay
+        self.errors = list(errors or [])
+
+    async def wait(self):
+        # a write takes delay seconds, then fails with fail
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.fail:
+            raise RuntimeError("write failed")
+
+    @asynccontextmanager
+    async def get_session(self):
+        yield RecordingSession(self)
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.database.active_reporters import ActiveReporters
+from tests.database.recording import RecordingEngine
+
+
+def test_reporters_are_deduplicated_per_flush():
+    engine = RecordingEngine()
+    reporters = ActiveReporters(engine=engine)
+    for name in ["b", "a", "b", "anonymoususer 123", "a"]:
+        reporters.record(name)
+
+    assert asyncio.run(reporters.flush()) == 2
+    assert engine.writes == [[("a",), ("b",)]]
+
+    reporters.record("a")
+    assert asyncio.run(reporters.flush()) == 1
+    assert asyncio.run(reporters.flush()) == 0
+    assert len(engine.writes) == 2
+
+
+def test_full_set_drops_new_reporters():
+    reporters = ActiveReporters(engine=RecordingEngine(), max_size=1)
+    reporters.record("a")
+    reporters.record("b")
+
+    assert reporters.stats()["pending"] == 1
+    assert reporters.stats()["dropped"] == 1
+
+
+def test_stop_flushes_pending():
+    async def run():
+        engine = RecordingEngine()
+        reporters = ActiveReporters(engine=engine, flush_interval=60)
+        await reporters.start()
+        reporters.record("a")
+        await reporters.stop()
+        return engine
+
+    assert asyncio.run(run()).writes == [[("a",)]]
+
+
+def test_stop_waits_for_the_write_in_progress():
+    async def run():
+        engine = RecordingEngine(delay=0.05)
+        reporters = ActiveReporters(engine=engine, flush_interval=0.01)
+        await reporters.start()
+        reporters.record("a")
+        # the reporters are taken off the set & being written
+        await asyncio.sleep(0.03)
+        assert reporters.stats()["pending"] == 0
+        await reporters.stop()
+        return engine, reporters
+
+    engine, reporters = asyncio.run(run())
+    assert engine.writes == [[("a",)]]
+    assert reporters.stats()["written"] == 1
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.database.audit import ApiUsageWriter
+from tests.database.recording import RecordingEngine
+
+
+def test_overflow_is_dropped_and_counted():
+    writer = ApiUsageWriter(engine=RecordingEngine(), max_queue=3)
+    results = [writer.record(user_id=1, route="/v1/test") for _ in range(5)]
+
+    assert results == [True, True, True, False, False]
+    assert writer.stats()["queue_depth"] == 3
+    assert writer.stats()["dropped"] == 2
+
+
+def test_flush_writes_multi_row_batches():
+    engine = RecordingEngine()
+    writer = ApiUsageWriter(engine=engine, batch_size=2)
+    for i in range(5):
+        writer.record(user_id=i, route="/v1/test")
+
+    written = asyncio.run(writer.flush())
+
+    assert written == 5
+    assert len(engine.statements) == 3
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_stop_flushes_queue():
+    async def run():
+        engine = RecordingEngine()
+        writer = ApiUsageWriter(engine=engine, flush_interval=60)
+        await writer.start()
+        writer.record(user_id=1, route="/v1/test")
+        await writer.stop()
+        return engine, writer
+
+    engine, writer = asyncio.run(run())
+    assert len(engine.statements) == 1
+    assert writer.stats()["written"] == 1
+
+
+def test_stop_waits_for_the_write_in_progress():
+    async def run():
+        engine = RecordingEngine(delay=0.05)
+        writer = ApiUsageWriter(engine=engine, batch_size=1, flush_interval=60)
+        await writer.start()
+        writer.record(user_id=1, route="/v1/test")
+        # the batch is off the queue & being written
+        await asyncio.sleep(0.01)
+        assert writer.stats()["queue_depth"] == 0
+        await writer.stop()
+        return engine, writer
+
+    engine, writer = asyncio.run(run())
+    assert len(engine.statements) == 1
+    assert writer.stats()["written"] == 1
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy.exc import OperationalError
+
+from src.database.coalescer import CoalescingWriter
+from src.database.retry import RetryPolicy
+from tests.database.recording import RecordingEngine
+
+
+def rows(n: int, start: int = 0) -> list[tuple]:
+    return [(i,) for i in range(start, start + n)]
+
+
+def test_concurrent_requests_share_a_write():
+    async def run():
+        engine = RecordingEngine()
+        writer = CoalescingWriter("test", "sql", engine, flush_interval=0.01)
+        await writer.start()
+        await asyncio.gather(*[writer.submit(rows(10, i * 10)) for i in range(20)])
+        await writer.stop()
+        return engine, writer
+
+    engine, writer = asyncio.run(run())
+    assert len(engine.writes) == 1
+    assert sorted(engine.writes[0]) == rows(200)
+    assert writer.stats()["written"] == 200
+    assert writer.stats()["last_flush_rows"] == 200
+
+
+def test_batch_size_triggers_flush_and_keeps_requests_whole():
+    async def run():
+        engine = RecordingEngine()
+        writer = CoalescingWriter(
+            "test", "sql", engine, batch_size=25, flush_interval=60
+        )
+        await writer.start()
+        await asyncio.wait_for(
+            asyncio.gather(*[writer.submit(rows(10)) for _ in range(6)]), timeout=5
+        )
+        await writer.stop()
+        return engine
+
+    engine = asyncio.run(run())
+    assert [len(write) for write in engine.writes] == [30, 30]
+
+
+def test_queued_ack_returns_before_the_write():
+    async def run():
+        engine = RecordingEngine()
+        writer = CoalescingWriter(
+            "test", "sql", engine, flush_interval=60, ack="queued"
+        )
+        await writer.start()
+        await writer.submit(rows(5))
+        queued = writer.stats()["queue_depth"], len(engine.writes)
+        await writer.stop()
+        return engine, queued
+
+    engine, queued = asyncio.run(run())
+    assert queued == (5, 0)
+    assert engine.writes == [rows(5)]
+
+
+def test_flushed_waits_with_queued_ack():
+    async def run():
+        engine = RecordingEngine()
+        writer = CoalescingWriter(
+            "test", "sql", engine, flush_interval=0.01, ack="queued"
+        )
+        await writer.start()
+        await writer.submit(rows(5), flushed=True)
+        written = len(engine.writes)
+        await writer.stop()
+        return written
+
+    assert asyncio.run(run()) == 1
+
+
+def test_deadlock_retried():
+    async def no_sleep(_):
+        pass
+
+    async def run():
+        deadlock = OperationalError("INSERT", {}, Exception("Deadlock found"))
+        engine = RecordingEngine(errors=[deadlock, deadlock])
+        writer = CoalescingWriter(
+            "test", "sql", engine, retry=RetryPolicy(sleep=no_sleep)
+        )
+        await writer.start()
+        await writer.submit(rows(5))
+        await writer.stop()
+        return engine, writer
+
+    engine, writer = asyncio.run(run())
+    assert engine.writes == [rows(5)]
+    assert writer.stats()["failed"] == 0
+
+
+def test_flushed_ack_raises_failed_write():
+    async def run():
+        writer = CoalescingWriter("test", "sql", RecordingEngine(fail=True))
+        await writer.start()
+        try:
+            with pytest.raises(RuntimeError):
+                await writer.submit(rows(5))
+        finally:
+            await writer.stop()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats()["failed"] == 5
+
+
+def test_writes_inline_when_not_started():
+    engine = RecordingEngine()
+    writer = CoalescingWriter("test", "sql", engine)
+    asyncio.run(writer.submit(rows(3)))
+    assert engine.writes == [rows(3)]
+
+
+def test_invalid_ack():
+    with pytest.raises(ValueError):
+        CoalescingWriter("test", "sql", RecordingEngine(), ack="never")
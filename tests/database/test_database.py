@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from src.core import config
+from src.database.database import ENGINES, Engine, EngineType, MeteredPool
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_engines_have_their_own_pools():
+    pools = {engine.pool: engine.engine.pool for engine in ENGINES}
+
+    assert set(pools) == set(config.db_pools)
+    assert len({id(pool) for pool in pools.values()}) == len(pools)
+    for name, pool in pools.items():
+        assert pool.size() == config.db_pools[name]["pool_size"]
+
+
+def test_unknown_pool_is_rejected():
+    with pytest.raises(ValueError):
+        Engine(EngineType.PLAYERDATA, pool="unknown")
+
+
+def test_pool_counts_checkout_waits_and_timeouts():
+    def checkout():
+        pool = MeteredPool(FakeConnection, pool_size=1, max_overflow=0, timeout=0.05)
+        connection = pool.connect()
+        with pytest.raises(TimeoutError):
+            pool.connect()
+        connection.close()
+        return pool.recreate().stats()
+
+    stats = asyncio.run(greenlet_spawn(checkout))
+
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_seconds"] >= 0.05
+    assert stats["checked_out"] == 0
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.database.export import _ndjson_lines
+
+
+async def partitions():
+    yield [{"Player_id": 1, "ts": datetime(2023, 1, 1)}, {"Player_id": 2, "ts": None}]
+    yield [{"Player_id": 3, "ts": None, "total": Decimal("1.5")}]
+
+
+def test_ndjson_lines():
+    async def run():
+        return [chunk async for chunk in _ndjson_lines(partitions())]
+
+    chunks = asyncio.run(run())
+    # one chunk per partition
+    assert len(chunks) == 2
+
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert rows == [
+        {"Player_id": 1, "ts": "2023-01-01T00:00:00"},
+        {"Player_id": 2, "ts": None},
+        {"Player_id": 3, "ts": None, "total": 1.5},
+    ]
+
+
+def test_ndjson_lines_closes_on_disconnect():
+    closed = []
+
+    async def partitions():
+        try:
+            for i in range(3):
+                yield [{"Player_id": i}]
+        finally:
+            closed.append(True)
+
+    async def run():
+        lines = _ndjson_lines(partitions())
+        await lines.__anext__()
+        # the client disconnected after the first chunk
+        await lines.aclose()
+
+    asyncio.run(run())
+    assert closed == [True]
+
+
+def test_arrow_and_parquet():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from sqlalchemy.sql.expression import select
+
+    from src.database import export
+    from src.database.models import Player
+
+    sql = select(Player.id, Player.name, Player.created_at)
+    rows = [(1, "a", datetime(2023, 1, 1)), (2, "b", None), (3, None, None)]
+
+    async def tuple_partitions(*args, **kwargs):
+        yield rows[:2]
+        yield rows[2:]
+
+    async def run(format):
+        chunks = export._arrow_chunks(sql, format, engine=None, chunk_size=2)
+        return b"".join([chunk async for chunk in chunks])
+
+    original = export.stream_partitions
+    export.stream_partitions = tuple_partitions
+    try:
+        arrow = asyncio.run(run(export.ExportFormat.arrow))
+        parquet = asyncio.run(run(export.ExportFormat.parquet))
+    finally:
+        export.stream_partitions = original
+
+    table = pa.ipc.open_stream(arrow).read_all()
+    assert table.schema.field("id").type == pa.int64()
+    assert table.schema.field("created_at").type == pa.timestamp("us")
+    assert table.column("id").to_pylist() == [1, 2, 3]
+    assert table.column("name").to_pylist() == ["a", "b", None]
+
+    table = pq.read_table(pa.BufferReader(parquet))
+    assert table.num_rows == 3
+    assert table.column("id").to_pylist() == [1, 2, 3]
+
+
+def test_arrow_decimal_columns():
+    import pyarrow as pa
+    from sqlalchemy import Numeric, column
+    from sqlalchemy.sql.expression import select
+
+    from src.database import export
+
+    sql = select(column("price", Numeric(10, 2)), column("ratio", Numeric()))
+    rows = [(Decimal("1.50"), Decimal("0.25")), (None, None)]
+
+    async def tuple_partitions(*args, **kwargs):
+        yield rows
+
+    async def run():
+        chunks = export._arrow_chunks(sql, export.ExportFormat.arrow, None, 2)
+        return b"".join([chunk async for chunk in chunks])
+
+    original = export.stream_partitions
+    export.stream_partitions = tuple_partitions
+    try:
+        table = pa.ipc.open_stream(asyncio.run(run())).read_all()
+    finally:
+        export.stream_partitions = original
+
+    assert table.schema.field("price").type == pa.decimal128(10, 2)
+    assert table.column("price").to_pylist() == [Decimal("1.50"), None]
+    # without a precision the values are floats
+    assert table.schema.field("ratio").type == pa.float64()
+    assert table.column("ratio").to_pylist() == [0.25, None]
+
+
+def test_arrow_export_closes_on_disconnect():
+    from sqlalchemy.sql.expression import select
+
+    from src.database import export
+    from src.database.models import Player
+
+    closed = []
+
+    async def tuple_partitions(*args, **kwargs):
+        try:
+            for i in range(3):
+                yield [(i,)]
+        finally:
+            closed.append(True)
+
+    async def run():
+        chunks = export._arrow_chunks(
+            select(Player.id), export.ExportFormat.parquet, None, 1
+        )
+        await chunks.__anext__()
+        # the client disconnected after the first chunk
+        await chunks.aclose()
+
+    original = export.stream_partitions
+    export.stream_partitions = tuple_partitions
+    try:
+        asyncio.run(run())
+    finally:
+        export.stream_partitions = original
+
+    assert closed == [True]
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import mysql
+from sqlalchemy.sql.expression import select
+
+from src.database.functions import parse_sql
+from src.database.models import Player
+from src.database.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+    next_cursor,
+)
+
+
+def test_cursor_roundtrip():
+    for value in [0, 123_456_789, "abc"]:
+        assert decode_cursor(encode_cursor(value)) == value
+    # an empty cursor is the first page
+    assert decode_cursor("") is None
+
+
+def test_invalid_cursor():
+    with pytest.raises(HTTPException) as e:
+        decode_cursor("not a cursor")
+    assert e.value.status_code == 422
+
+    # valid json, but not a key
+    for value in [[1, 2], {"id": 1}, None, True, 1.5]:
+        with pytest.raises(HTTPException) as e:
+            decode_cursor(encode_cursor(value))
+        assert e.value.status_code == 422
+
+
+def test_next_cursor():
+    rows = [{"id": 1}, {"id": 2}]
+    assert decode_cursor(next_cursor(rows, key="id", row_count=2)) == 2
+    # a partial page is the last page
+    assert next_cursor(rows, key="id", row_count=3) is None
+
+
+def test_keyset_paginate():
+    sql = keyset_paginate(select(Player), Player.id, encode_cursor(10), row_count=5)
+    compiled = sql.compile(
+        dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    compiled = str(compiled)
+
+    assert "WHERE `Players`.id > 10" in compiled
+    assert "ORDER BY `Players`.id" in compiled
+    assert "LIMIT 5" in compiled
+    assert "OFFSET" not in compiled
+
+
+def test_parse_sql_keyset():
+    async def run(sql, after):
+        param = {}
+        sql, has_return = await parse_sql(
+            sql, param, None, 100, 1, keyset="id", after=after
+        )
+        return str(sql), param
+
+    sql, param = asyncio.run(run("select * from Players", after=10))
+    assert sql == (
+        "select * from (select * from Players) as keyset_page "
+        "where id > :keyset_after order by id limit :row_count;"
+    )
+    assert param == {"keyset_after": 10, "row_count": 100}
+
+    # only a subquery has a where, the key is a column of the outer query
+    sql, param = asyncio.run(
+        run(
+            "select p.id from Players p join (select id from Labels where id > 1) l",
+            after=10,
+        )
+    )
+    assert sql.startswith("select * from (select p.id from Players p join (")
+    assert sql.endswith(
+        ") l) as keyset_page where id > :keyset_after order by id limit :row_count;"
+    )
+
+    sql, param = asyncio.run(
+        run("select * from Players where label_id = 1", after=None)
+    )
+    assert (
+        sql == "select * from Players where label_id = 1 order by id limit :row_count;"
+    )
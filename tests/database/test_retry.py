@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.database.retry import RETRY_STATS, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def deadlock():
+    return OperationalError("insert", {}, Exception("Deadlock found"))
+
+
+def flaky(failures: int):
+    calls = {"count": 0}
+
+    async def fn():
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise deadlock()
+        return "ok"
+
+    return fn, calls
+
+
+def test_retries_until_success():
+    clock = FakeClock()
+    policy = RetryPolicy(max_attempts=5, sleep=clock.sleep, timer=clock)
+    fn, calls = flaky(failures=2)
+
+    assert asyncio.run(policy.call("test.success", fn)) == "ok"
+    assert calls["count"] == 3
+    assert RETRY_STATS["test.success"]["retries"] == 2
+    assert RETRY_STATS["test.success"]["exhausted"] == 0
+    assert all(0.1 <= s <= policy.max_delay for s in clock.sleeps)
+
+
+def test_max_attempts():
+    clock = FakeClock()
+    policy = RetryPolicy(max_attempts=3, sleep=clock.sleep, timer=clock)
+    fn, calls = flaky(failures=10)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(policy.call("test.attempts", fn))
+
+    assert calls["count"] == 3
+    assert RETRY_STATS["test.attempts"]["exhausted"] == 1
+
+
+def test_deadline():
+    clock = FakeClock()
+    policy = RetryPolicy(
+        max_attempts=100,
+        base_delay=1,
+        max_delay=1,
+        deadline=3.5,
+        sleep=clock.sleep,
+        timer=clock,
+    )
+    fn, calls = flaky(failures=100)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(policy.call("test.deadline", fn))
+
+    # attempts at t=0, 1, 2, 3, the next one would start after the deadline
+    assert calls["count"] == 4
+    assert clock.now <= policy.deadline
+
+
+def test_other_errors_are_not_retried():
+    policy = RetryPolicy()
+
+    async def fn():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        asyncio.run(policy.call("test.other", fn))
+
+    assert RETRY_STATS["test.other"]["retries"] == 0
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of the row materialization paths on hiscore rows.
+
+    BENCHMARK=1 python -m pytest -s tests/database/test_rows_benchmark.py
+    python tests/database/test_rows_benchmark.py 100000
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from src.database.functions import core_result, core_select, sqlalchemy_result
+from src.database.models import PlayerHiscoreDataLatest
+
+TABLE = PlayerHiscoreDataLatest.__table__
+
+
+def hiscore_engine(rows: int):
+    engine = create_engine("sqlite://")
+    TABLE.create(engine)
+
+    columns = [
+        c.name for c in TABLE.columns if c.name not in ("id", "timestamp", "ts_date")
+    ]
+    data = [
+        {
+            name: i if name == "Player_id" else (i * 7 + n) % 100_000
+            for n, name in enumerate(columns)
+        }
+        for i in range(1, rows + 1)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(TABLE), data)
+    return engine
+
+
+def rows2dict_getattr(result) -> list[dict]:
+    # the previous sqlalchemy_result.rows2dict
+    rows = [row[0] for row in result]
+    return [
+        {col.name: getattr(row, col.name) for col in row.__table__.columns}
+        for row in rows
+    ]
+
+
+def materialize(engine) -> tuple[dict, dict]:
+    paths = {
+        "orm getattr": (select(PlayerHiscoreDataLatest), rows2dict_getattr),
+        "orm converter": (
+            select(PlayerHiscoreDataLatest),
+            lambda r: sqlalchemy_result(r).rows2dict(),
+        ),
+        "core dict": (
+            core_select(PlayerHiscoreDataLatest),
+            lambda r: core_result(r).rows2dict(),
+        ),
+        "core tuple": (
+            core_select(PlayerHiscoreDataLatest),
+            lambda r: core_result(r).rows2tuple(),
+        ),
+    }
+    timings, outputs = {}, {}
+    for name, (sql, convert) in paths.items():
+        with Session(engine) as session:
+            start = time.perf_counter()
+            outputs[name] = convert(session.execute(sql.order_by(TABLE.c.Player_id)))
+            timings[name] = time.perf_counter() - start
+    return timings, outputs
+
+
+def test_paths_return_the_same_rows():
+    engine = hiscore_engine(200)
+    _, outputs = materialize(engine)
+
+    expected = outputs["orm getattr"]
+    assert len(expected) == 200
+    assert outputs["orm converter"] == expected
+    assert outputs["core dict"] == expected
+    assert [r._asdict() for r in outputs["core tuple"]] == expected
+
+
+def test_rows2tuple_reuses_the_record_class():
+    engine = hiscore_engine(2)
+    with Session(engine) as session:
+        first = sqlalchemy_result(
+            session.execute(select(PlayerHiscoreDataLatest))
+        ).rows2tuple()
+        second = core_result(
+            session.execute(core_select(PlayerHiscoreDataLatest))
+        ).rows2tuple()
+    assert type(first[0]) is type(second[0])
+
+
+@pytest.mark.skipif(not os.environ.get("BENCHMARK"), reason="set BENCHMARK=1")
+def test_benchmark(rows: int = None):
+    rows = rows or int(os.environ.get("BENCHMARK_ROWS", 100_000))
+    engine = hiscore_engine(rows)
+    timings, _ = materialize(engine)
+
+    print(f"\n{rows} rows, {len(TABLE.columns)} columns")
+    for name, seconds in timings.items():
+        print(f"{name:>14}: {seconds:.3f}s")
+    assert timings["core dict"] < timings["orm getattr"]
+
+
+if __name__ == "__main__":
+    test_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,80 @@
+"""
+Statement registry, the benchmark compares a statement built per request
+with a prebuilt one (src.database.statements).
+
+    BENCHMARK=1 python -m pytest -s tests/database/test_statements.py
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.database import statements
+from src.database.statements import DIALECT, STATEMENTS, register
+
+
+def test_statements_are_measured_on_registration():
+    assert {"verify_token", "report_count", "player_ids"} <= set(STATEMENTS)
+    for statement in STATEMENTS.values():
+        stats = statement.stats()
+        assert stats["build_seconds"] > 0
+        assert stats["compile_seconds"] > 0
+
+
+def test_duplicate_name_is_rejected():
+    with pytest.raises(ValueError):
+        register("report_count", statements._report_count)
+
+
+def test_values_are_bind_parameters():
+    compiled = statements.REPORT_COUNT.sql.compile(dialect=DIALECT)
+    assert set(compiled.params) == {"name", "manual_detect"}
+
+    compiled = statements.PLAYER_IDS.sql.compile(dialect=DIALECT)
+    assert set(compiled.params) == {"names"}
+
+
+def test_cache_key_is_memoized():
+    sql = statements.VERIFY_TOKEN.sql
+    assert sql._generate_cache_key() is sql._generate_cache_key()
+
+
+def per_request(build, statement, n: int) -> tuple[float, float, float]:
+    # uncached: build & compile, rebuilt: build & cache key (engine cache hit),
+    # prebuilt: cache key of the registered statement
+    start = time.perf_counter()
+    for _ in range(n):
+        build().compile(dialect=DIALECT)
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n):
+        build()._generate_cache_key()
+    rebuilt = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n):
+        statement.sql._generate_cache_key()
+    prebuilt = time.perf_counter() - start
+    return uncached / n, rebuilt / n, prebuilt / n
+
+
+@pytest.mark.skipif(not os.environ.get("BENCHMARK"), reason="BENCHMARK=1")
+def test_prebuilt_statement_benchmark():
+    builds = {
+        "verify_token": statements._verify_token,
+        "report_count": statements._report_count,
+        "player_ids": statements._player_ids,
+    }
+    for name, build in builds.items():
+        uncached, rebuilt, prebuilt = per_request(build, STATEMENTS[name], 2000)
+        print(
+            f"{name}: build+compile {uncached * 1e6:.1f}us, "
+            f"build+cache key {rebuilt * 1e6:.1f}us, prebuilt {prebuilt * 1e6:.2f}us"
+        )
+        assert prebuilt < rebuilt < uncached
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi import HTTPException
+
+from src.database import functions
+from src.database.functions import (
+    TOKEN_CACHE,
+    UNKNOWN_TOKEN_CACHE,
+    invalidate_token_cache,
+)
+
+
+class UnknownTokenSession:
+    def __init__(self, engine: "UnknownTokenEngine"):
+        self.engine = engine
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def execute(self, sql, params):
+        self.engine.lookups += 1
+        return []
+
+
+class UnknownTokenEngine:
+    def __init__(self):
+        self.lookups = 0
+
+    @asynccontextmanager
+    async def get_session(self):
+        yield UnknownTokenSession(self)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    TOKEN_CACHE.clear()
+    UNKNOWN_TOKEN_CACHE.clear()
+    yield
+    TOKEN_CACHE.clear()
+    UNKNOWN_TOKEN_CACHE.clear()
+
+
+def test_unknown_tokens_do_not_evict_known_ones(monkeypatch):
+    engine = UnknownTokenEngine()
+    monkeypatch.setattr(functions, "PLAYERDATA_ENGINE", engine)
+    TOKEN_CACHE.set(("known", "request_highscores"), {"id": 1, "is_active": 1})
+
+    async def verify(token: str) -> int:
+        try:
+            await functions.verify_token(token, "request_highscores")
+        except HTTPException as e:
+            return e.status_code
+
+    async def flood(n: int) -> list[int]:
+        return [await verify(f"random-{i}") for i in range(n)]
+
+    n = UNKNOWN_TOKEN_CACHE.maxsize + 1
+    assert set(asyncio.run(flood(n))) == {401}
+    assert TOKEN_CACHE.get(("known", "request_highscores")) is not None
+    assert len(TOKEN_CACHE) == 1
+    assert len(UNKNOWN_TOKEN_CACHE) == UNKNOWN_TOKEN_CACHE.maxsize
+
+    # the last unknown token is answered from the cache
+    lookups = engine.lookups
+    assert asyncio.run(verify(f"random-{n - 1}")) == 401
+    assert engine.lookups == lookups
+
+
+def test_invalidate_token_cache():
+    TOKEN_CACHE.set(("a", "request_highscores"), {"id": 1, "is_active": 1})
+    TOKEN_CACHE.set(("a", "verify_ban"), {"id": 1, "is_active": 1})
+    TOKEN_CACHE.set(("b", "request_highscores"), {"id": 2, "is_active": 1})
+    UNKNOWN_TOKEN_CACHE.set(("c", "request_highscores"), None)
+
+    assert invalidate_token_cache(user_id=1) == 2
+    assert TOKEN_CACHE.get(("b", "request_highscores")) is not None
+
+    # a token that was just created
+    assert invalidate_token_cache(token="c") == 1
+    assert UNKNOWN_TOKEN_CACHE.get(("c", "request_highscores")) is None
+
+    assert invalidate_token_cache() == 1
+    assert len(TOKEN_CACHE) == 0
@@ -0,0 +1,293 @@
+"""
+HighscoreProcessor, the benchmark measures the decoding & validation
+of scraper messages in messages per second on one core.
+
+    BENCHMARK=1 python -m pytest -s tests/kafka/test_highscore.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.app.schemas.highscore import PlayerHiscoreData as SchemaHiscore
+from src.core import config
+from src.app.schemas.player import Player as SchemaPlayer
+from src.kafka.highscore import HighscoreProcessor
+from src.kafka.modules import codec
+from src.kafka.modules.kafka_consumer import ConsumedMessage
+from src.kafka.modules.memory import MemoryMessageProducer
+from src.kafka import worker
+from src.kafka.worker import health_app
+
+
+class FakeHiscoreRepo:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_if_not_exist(self, table, schema, unique_columns, values):
+        self.batches.append(values)
+
+
+class FakePlayerRepo:
+    def __init__(self):
+        self.batches = []
+
+    async def update(self, data):
+        self.batches.append(data)
+
+
+class SlowPlayerRepo:
+    def __init__(self):
+        self.writing: set[int] = set()
+        self.concurrent: list[set[int]] = []
+        self.order: list[str] = []
+
+    async def update(self, data):
+        ids = {p.id for p in data}
+        self.writing |= ids
+        self.concurrent.append(set(self.writing))
+        await asyncio.sleep(0.02)
+        self.order.extend(p.name for p in data)
+        self.writing -= ids
+
+
+class FakeConsumer:
+    def __init__(self):
+        self.commits: list[dict[int, int]] = []
+
+    async def commit(self, offsets):
+        self.commits.append(offsets)
+
+
+def message(player_id: int, name: str) -> str:
+    timestamp = datetime(2023, 8, 1, 12).isoformat()
+    player = {
+        "id": player_id,
+        "name": name,
+        "created_at": timestamp,
+        "updated_at": timestamp,
+        "possible_ban": False,
+        "confirmed_ban": False,
+        "confirmed_player": False,
+        "label_id": 0,
+        "label_jagex": 0,
+    }
+    hiscores = {k: 1 for k in SchemaHiscore.model_fields if k not in ("id", "ts_date")}
+    hiscores.update({"timestamp": timestamp, "Player_id": player_id})
+    return json.dumps({"player": player, "hiscores": hiscores})
+
+
+def make_processor(monkeypatch, topic: str, **kwargs) -> HighscoreProcessor:
+    # a topic per test, the queues of the memory broker are bound to an event loop
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    monkeypatch.setattr(config, "highscore_topic", topic)
+    processor = HighscoreProcessor(**kwargs)
+    processor.repo_highscore = FakeHiscoreRepo()
+    processor.repo_player = FakePlayerRepo()
+    return processor
+
+
+def test_batches_by_size_and_interval(monkeypatch):
+    processor = make_processor(
+        monkeypatch, "scraper-batch", batch_size=2, flush_interval=0.05
+    )
+
+    async def run():
+        producer = MemoryMessageProducer(None, "scraper-batch")
+        await producer.start()
+        await processor.start()
+        for i, name in enumerate(["bot 1", "bot 2", "bot 3", "a name too long"]):
+            await producer.publish(message(i + 1, name))
+        await asyncio.sleep(0.2)
+        ready = processor.ready()
+        await processor.stop()
+        return ready
+
+    assert asyncio.run(run())
+    players = [[p.name for p in batch] for batch in processor.repo_player.batches]
+    # batch_size of 2, the rest after flush_interval, long names are skipped
+    assert players == [["bot 1", "bot 2"], ["bot 3"]]
+    assert [len(b) for b in processor.repo_highscore.batches] == [2, 1]
+    assert processor.repo_highscore.batches[0][0].ts_date.isoformat() == "2023-08-01"
+
+    stats = processor.stats()
+    assert (stats["messages"], stats["batches"], stats["failed"]) == (4, 2, 0)
+    assert not stats["live"]
+
+
+def test_health_endpoints(monkeypatch):
+    processor = make_processor(monkeypatch, "scraper-health", flush_interval=0.05)
+
+    async def probe(app, path: str) -> int:
+        from aiohttp import ClientSession, web
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}{path}") as response:
+                    return response.status
+        finally:
+            await runner.cleanup()
+
+    async def run():
+        app = health_app(processor)
+        before = await probe(app, "/live")
+        await processor.start()
+        await asyncio.sleep(0.05)
+        after = [await probe(health_app(processor), p) for p in ("/live", "/ready")]
+        await processor.stop()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before == 503
+    assert after == [200, 200]
+
+
+def consumed(partition: int, offset: int, player_id: int) -> ConsumedMessage:
+    value = json.loads(message(player_id, f"p{partition} {offset}"))
+    return ConsumedMessage(value, partition, offset)
+
+
+def test_parallel_writers_keep_partition_order(monkeypatch):
+    processor = make_processor(monkeypatch, "scraper-parallel", parallelism=2)
+    processor.repo_player = SlowPlayerRepo()
+    processor.message_consumer = FakeConsumer()
+
+    async def run():
+        for offset in range(2):
+            # 4 partitions on 2 writers, a player per partition
+            processor.batch = [consumed(p, offset, p + 1) for p in range(4)]
+            await processor.flush()
+        await processor.wait_writers()
+
+    asyncio.run(run())
+
+    # partitions 0 & 2 on one writer, 1 & 3 on the other, writing at once
+    assert max(len(ids) for ids in processor.repo_player.concurrent) == 4
+    order = processor.repo_player.order
+    for p in range(4):
+        assert order.index(f"p{p} 0") < order.index(f"p{p} 1")
+    commits = processor.message_consumer.commits
+    assert sorted(commits, key=lambda c: sorted(c.items())) == [
+        {0: 0, 2: 0},
+        {0: 1, 2: 1},
+        {1: 0, 3: 0},
+        {1: 1, 3: 1},
+    ]
+
+
+def test_writers_do_not_share_players(monkeypatch):
+    processor = make_processor(monkeypatch, "scraper-keys", parallelism=2)
+    processor.repo_player = SlowPlayerRepo()
+    processor.message_consumer = FakeConsumer()
+
+    async def run():
+        # the same player on both writers
+        processor.batch = [consumed(0, 0, 1), consumed(1, 0, 1), consumed(1, 1, 2)]
+        await processor.flush()
+        await processor.wait_writers()
+
+    asyncio.run(run())
+
+    # the second writer waited for player 1
+    assert processor.repo_player.concurrent == [{1}, {1, 2}]
+    assert len(processor.message_consumer.commits) == 2
+
+
+def test_invalid_messages_are_skipped(monkeypatch):
+    processor = make_processor(monkeypatch, "scraper-invalid")
+    no_hiscores = json.loads(message(2, "no hiscores"))
+    no_hiscores["hiscores"] = {}
+    batch = [
+        json.loads(message(1, "bot 1")),
+        {"player": {"id": 3}},
+        # not valid json, see codec.loads_message
+        codec.loads_message(b"not json"),
+        no_hiscores,
+    ]
+
+    messages = processor.decode(batch)
+
+    assert [m.player.name for m in messages] == ["bot 1", "no hiscores"]
+    assert messages[1].hiscores is None
+    assert processor.invalid == 2
+    assert processor.keys(messages) == {1, 2}
+
+
+def per_message(rows: list[dict]) -> list:
+    # validation before the batch validation of HighscoreProcessor.decode
+    return [(SchemaPlayer(**r["player"]), SchemaHiscore(**r["hiscores"])) for r in rows]
+
+
+def rate(fn, batch: list, batches: int = 20) -> float:
+    # messages per second, the best of 3 runs
+    best = 0
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(batches):
+            fn(batch)
+        best = max(best, len(batch) * batches / (time.perf_counter() - start))
+    return best
+
+
+@pytest.mark.skipif(not os.environ.get("BENCHMARK"), reason="BENCHMARK=1")
+def test_decode_benchmark(monkeypatch):
+    processor = make_processor(monkeypatch, "scraper-benchmark")
+    batch = [message(i, f"bot {i}").encode() for i in range(1000)]
+    rows = [json.loads(value) for value in batch]
+
+    stdlib = rate(lambda b: [json.loads(v.decode("utf-8")) for v in b], batch)
+    decoded = rate(lambda b: [codec.loads(v) for v in b], batch)
+    before = rate(per_message, rows)
+    after = rate(processor.decode, rows)
+    print(
+        f"\njson {stdlib:,.0f}/s, {codec.BACKEND} {decoded:,.0f}/s, "
+        f"per message validation {before:,.0f}/s, batch validation {after:,.0f}/s, "
+        f"decode & validation {1 / (1 / stdlib + 1 / before):,.0f}/s "
+        f"-> {1 / (1 / decoded + 1 / after):,.0f}/s"
+    )
+    assert after > before
+
+
+def test_worker_cleans_up_a_failed_startup(monkeypatch):
+    import socket
+
+    from src.app.repositories.report import REPORT_WRITER
+
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    monkeypatch.setattr(config, "highscore_topic", "scraper-startup")
+    processors = []
+
+    def factory():
+        processors.append(HighscoreProcessor())
+        return processors[0]
+
+    monkeypatch.setitem(worker.PROCESSORS, "highscore", factory)
+
+    # the health port is taken, the worker fails to start
+    with socket.socket() as taken:
+        taken.bind(("0.0.0.0", 0))
+        taken.listen()
+        try:
+            asyncio.run(worker.run("highscore", port=taken.getsockname()[1]))
+        except OSError:
+            pass
+        else:
+            raise AssertionError("worker started on a taken port")
+
+    assert not processors[0].live()
+    # the highscore worker does not write reports
+    assert worker.WRITERS["highscore"] == []
+    assert not REPORT_WRITER.running
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.app.ingest.report import ReportBatch, from_message, to_message
+from src.core import config
+from src.kafka.modules import memory
+from src.kafka.modules.kafka_consumer import ConsumedMessage
+from src.kafka.modules.kafka_producer import KafkaMessageProducer
+from src.kafka.modules.memory import MemoryBroker, MemoryMessageProducer
+from src.kafka import report as kafka_report
+from src.kafka.report import ReportProcessor
+from src.api.v1 import report as report_route
+
+
+def make_batch(reporter: str) -> ReportBatch:
+    return ReportBatch(
+        reporter=reporter,
+        names={reporter, "player"},
+        detections=[("player", 1, 2, 3, 0, "2023-08-01 00:00:00", 0)],
+    )
+
+
+def test_message_round_trip():
+    batch = make_batch("reporter")
+    message = json.loads(json.dumps(to_message(batch, manual_detect=1)))
+
+    assert from_message(message) == (batch, 1)
+
+
+def test_memory_producer_requires_start():
+    producer = MemoryMessageProducer(None, "report", broker=MemoryBroker())
+    try:
+        asyncio.run(producer.publish("{}"))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("publish before start")
+
+
+def test_processor_writes_published_batches(monkeypatch):
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    written = []
+
+    async def write(batches):
+        written.append(batches)
+        return len(batches)
+
+    async def run():
+        # the consumers of the processor use the module level broker
+        producer = MemoryMessageProducer(None, config.report_topic)
+        await producer.start()
+        processor = ReportProcessor(batch_size=3, flush_interval=0.05, write=write)
+        await processor.start()
+
+        for i in range(5):
+            await producer.publish(json.dumps(to_message(make_batch(f"r{i}"))))
+        await asyncio.sleep(0.2)
+        await processor.stop()
+        return processor
+
+    processor = asyncio.run(run())
+
+    # batch_size of 3 & the remaining 2 after flush_interval
+    assert [len(batches) for batches in written] == [3, 2]
+    assert [b.reporter for batches in written for b, _ in batches] == [
+        f"r{i}" for i in range(5)
+    ]
+    assert processor.stats()["messages"] == 5
+
+
+def test_offsets_committed_after_write(monkeypatch):
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    monkeypatch.setattr(config, "report_topic", "report-replay")
+    key = (config.report_consumer_group, "report-replay")
+    written, committed = [], []
+
+    async def write(batches):
+        # the offsets of the batch are not committed while it is written
+        committed.append(memory.BROKER.committed.get(key, 0))
+        if len(committed) == 1:
+            raise RuntimeError("database unavailable")
+        written.append([b.reporter for b, _ in batches])
+        return len(batches)
+
+    async def run():
+        producer = MemoryMessageProducer(None, "report-replay")
+        await producer.start()
+        processor = ReportProcessor(batch_size=3, flush_interval=0.05, write=write)
+        processor.restart_delay = 0.01
+        for i in range(3):
+            await producer.publish(json.dumps(to_message(make_batch(f"r{i}"))))
+        await processor.start()
+        await asyncio.sleep(0.2)
+        await processor.stop()
+        return processor
+
+    processor = asyncio.run(run())
+
+    # the failed batch is delivered again from the committed offset
+    assert committed == [0, 0]
+    assert written == [["r0", "r1", "r2"]]
+    assert memory.BROKER.committed[key] == 3
+    stats = processor.stats()
+    assert (stats["failed"], stats["restarts"], stats["commits"]) == (3, 1, 1)
+
+
+def test_invalid_messages_are_skipped(monkeypatch):
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    monkeypatch.setattr(config, "report_topic", "report-invalid")
+    written = []
+
+    async def write(batches):
+        written.extend(b.reporter for b, _ in batches)
+        return len(batches)
+
+    async def run():
+        producer = MemoryMessageProducer(None, "report-invalid")
+        await producer.start()
+        processor = ReportProcessor(batch_size=2, flush_interval=0.05, write=write)
+        await processor.start()
+        await producer.publish(json.dumps({"reporter": "no names"}))
+        await producer.publish(json.dumps(to_message(make_batch("r0"))))
+        await asyncio.sleep(0.2)
+        await processor.stop()
+        return processor
+
+    processor = asyncio.run(run())
+
+    assert written == ["r0"]
+    key = (config.report_consumer_group, "report-invalid")
+    assert memory.BROKER.committed[key] == 2
+    assert processor.stats()["invalid"] == 1
+
+
+def test_fetches_split_into_batches(monkeypatch):
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    monkeypatch.setattr(config, "report_topic", "report-fetch")
+    written = []
+
+    async def write(batches):
+        written.append([b.reporter for b, _ in batches])
+        return len(batches)
+
+    async def run():
+        producer = MemoryMessageProducer(None, "report-fetch")
+        await producer.start()
+        for i in range(7):
+            await producer.publish(json.dumps(to_message(make_batch(f"r{i}"))))
+        processor = ReportProcessor(batch_size=3, flush_interval=0.1, write=write)
+        await processor.start()
+        # nothing arrives after the first fetches, the timer flushes the rest
+        await asyncio.sleep(0.3)
+        pending = processor.stats()["queue_depth"]
+        await processor.stop()
+        return pending
+
+    assert asyncio.run(run()) == 0
+    assert written == [["r0", "r1", "r2"], ["r3", "r4", "r5"], ["r6"]]
+
+
+def test_failed_drain_is_seen_by_the_processing_loop(monkeypatch):
+    monkeypatch.setattr(config, "kafka_backend", "memory")
+    commits = []
+
+    class Consumer:
+        async def commit(self, offsets):
+            commits.append(offsets)
+
+    async def write(batches):
+        raise RuntimeError("database unavailable")
+
+    async def run():
+        processor = ReportProcessor(write=write)
+        processor.message_consumer = Consumer()
+        processor.batch = [
+            ConsumedMessage(to_message(make_batch(f"r{i}")), 0, i) for i in range(2)
+        ]
+        # the drain of a rebalance
+        try:
+            await processor.drain()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("drain failed silently")
+
+        # the failed batch stays until the consumer restarts
+        try:
+            processor.raise_writer_errors()
+        except RuntimeError:
+            return processor
+        raise AssertionError("failed batch forgotten")
+
+    processor = asyncio.run(run())
+    assert commits == []
+    assert processor.stats()["failed"] == 2
+
+
+def test_broker_down_producer_not_started():
+    # nothing listens on port 1
+    producer = KafkaMessageProducer("127.0.0.1:1", "report")
+
+    async def main():
+        try:
+            await producer.start()
+        except Exception:
+            pass
+        assert producer.producer is None
+        try:
+            await producer.publish("{}")
+        except RuntimeError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+
+
+def test_broker_down_report_written(monkeypatch):
+    written = []
+
+    async def write_reports(batches):
+        written.extend(batches)
+        return True
+
+    monkeypatch.setattr(config, "report_ingest_mode", "kafka")
+    monkeypatch.setattr(config, "shadow_report_url", "")
+    # the broker was down when the producer was started
+    monkeypatch.setattr(
+        kafka_report,
+        "REPORT_PRODUCER",
+        KafkaMessageProducer("127.0.0.1:1", config.report_topic),
+    )
+    monkeypatch.setattr(report_route, "write_reports", write_reports)
+    batch = make_batch("reporter")
+    monkeypatch.setattr(report_route.report_ingest, "prepare", lambda _: batch)
+
+    result = asyncio.run(report_route.insert_report([], manual_detect=0))
+
+    assert result == {"detail": "ok"}
+    assert written == [(batch, 0)]
@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.utils.cache import MISSING, LRUCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # touch a, so b is the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_expiration():
+    timer = FakeTimer()
+    cache = LRUCache(maxsize=10, ttl=5, timer=timer)
+    cache.set("token", None)
+
+    # a cached None is a hit, not a miss
+    assert cache.get("token", MISSING) is None
+    timer.now = 6
+    assert cache.get("token", MISSING) is MISSING
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_invalidate():
+    cache = LRUCache(maxsize=10)
+    cache.set(("token1", "verify_ban"), {"id": 1})
+    cache.set(("token1", "verify_players"), {"id": 1})
+    cache.set(("token2", "verify_ban"), {"id": 2})
+
+    removed = cache.invalidate(lambda key, value: value["id"] == 1)
+
+    assert removed == 2
+    assert len(cache) == 1
+    assert ("token2", "verify_ban") in cache
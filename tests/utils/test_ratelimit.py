@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.utils.ratelimit import RateLimiter
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_is_enforced():
+    async def run():
+        limiter = RateLimiter(window=60, timer=FakeTimer())
+        results = [await limiter.hit("user", limit=3) for _ in range(5)]
+        return results, limiter
+
+    results, limiter = asyncio.run(run())
+    assert results == [True, True, True, False, False]
+    assert limiter.rejected == 2
+
+
+def test_unlimited():
+    async def run():
+        limiter = RateLimiter(window=60, timer=FakeTimer())
+        return [await limiter.hit("user", limit=-1) for _ in range(100)]
+
+    assert all(asyncio.run(run()))
+
+
+def test_sliding_window_weights_previous_window():
+    async def run():
+        timer = FakeTimer()
+        limiter = RateLimiter(window=60, timer=timer)
+        for _ in range(10):
+            await limiter.hit("user", limit=10)
+
+        # halfway the next window, half of the previous window still counts
+        timer.now = 90
+        allowed = [await limiter.hit("user", limit=10) for _ in range(6)]
+
+        # two windows later the old hits are gone
+        timer.now = 200
+        after = await limiter.hit("user", limit=1)
+        return allowed, after
+
+    allowed, after = asyncio.run(run())
+    assert allowed == [True, True, True, True, True, False]
+    assert after
+
+
+def test_seed_only_unknown_keys():
+    async def run():
+        limiter = RateLimiter(window=60, timer=FakeTimer())
+        seeded = await limiter.seed("user", 5)
+        reseeded = await limiter.seed("user", 0)
+        allowed = await limiter.hit("user", limit=5)
+        return seeded, reseeded, allowed
+
+    assert asyncio.run(run()) == (True, False, False)